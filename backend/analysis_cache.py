@@ -0,0 +1,108 @@
+"""
+File analysis cache
+Slicer/mesh analysis results are stored in `file_analysis_cache`
+(migration_021), keyed by the file's SHA-256, the parser name and that
+parser's PARSER_VERSION. Re-uploads of the same content (see blob_store) are
+answered without reopening the file, and bumping one parser's version only
+misses that parser's entries. Rows not hit for _EVICT_DAYS are evicted by the
+daily cleanup job, which also clears out entries for superseded versions.
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from database import db
+
+_EVICT_DAYS = 30
+
+
+class _Counters:
+    """Per-parser hit/miss counters for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits   = {}
+        self._misses = {}
+
+    def record(self, parser: str, hit: bool) -> None:
+        with self._lock:
+            bucket = self._hits if hit else self._misses
+            bucket[parser] = bucket.get(parser, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            parsers = set(self._hits) | set(self._misses)
+            out = {}
+            for p in sorted(parsers):
+                hits, misses = self._hits.get(p, 0), self._misses.get(p, 0)
+                out[p] = {
+                    'hits':     hits,
+                    'misses':   misses,
+                    'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+                }
+            return out
+
+
+_counters = _Counters()
+
+
+def lookup(parser: str, version: int, sha256: str, params: str = '') -> Optional[Dict[str, Any]]:
+    """Return the cached result for (sha256, parser, version, params), or None (counted as a miss)."""
+    row = db.fetch_one(
+        "SELECT result_json FROM file_analysis_cache "
+        "WHERE sha256 = %s AND parser = %s AND parser_version = %s AND params = %s",
+        (sha256, parser, version, params)
+    )
+    if row:
+        try:
+            result = json.loads(row['result_json'])
+        except (TypeError, ValueError):
+            result = None
+        if result is not None:
+            _counters.record(parser, hit=True)
+            db.execute_update(
+                "UPDATE file_analysis_cache SET hit_count = hit_count + 1, last_hit_at = NOW() "
+                "WHERE sha256 = %s AND parser = %s AND parser_version = %s AND params = %s",
+                (sha256, parser, version, params)
+            )
+            return result
+    _counters.record(parser, hit=False)
+    return None
+
+
+def store(parser: str, version: int, sha256: str, result: Dict[str, Any], params: str = '') -> None:
+    """Cache a parser result. Only success=True results are kept — failures
+    (missing file, corrupt archive) are cheap to recompute and may not be permanent."""
+    if result.get('success'):
+        db.execute_query(
+            "INSERT INTO file_analysis_cache "
+            "(sha256, parser, parser_version, params, result_json, last_hit_at) "
+            "VALUES (%s, %s, %s, %s, %s, NOW()) "
+            "ON DUPLICATE KEY UPDATE result_json = VALUES(result_json), last_hit_at = NOW()",
+            (sha256, parser, version, params, json.dumps(result, default=str))
+        )
+
+
+def get_or_compute(parser: str, version: int, sha256: str,
+                   compute: Callable[[], Dict[str, Any]], params: str = '') -> Dict[str, Any]:
+    """Return the cached result or compute it inline and store it."""
+    result = lookup(parser, version, sha256, params)
+    if result is None:
+        result = compute()
+        store(parser, version, sha256, result, params)
+    return result
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counts and hit rate per parser since this process started."""
+    return _counters.snapshot()
+
+
+def evict_stale(days: int = _EVICT_DAYS) -> int:
+    """Drop entries that have not been hit for `days` days (incl. old parser versions)."""
+    deleted = db.execute_update(
+        "DELETE FROM file_analysis_cache WHERE last_hit_at < DATE_SUB(NOW(), INTERVAL %s DAY)",
+        (days,)
+    )
+    return max(deleted or 0, 0)
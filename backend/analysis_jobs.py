@@ -0,0 +1,322 @@
+"""
+Background analysis jobs
+Slicer-file parsing and DXF rendering run in a ProcessPoolExecutor instead of
+the gunicorn request thread. submit() returns a job id immediately; a
+dispatcher thread feeds at most ANALYSIS_WORKERS jobs to the pool at a time so
+each job's timeout is measured from when it actually starts.
+
+Containment:
+  - every worker process runs under an address-space cap (analysis_worker.init_worker)
+  - a job past its timeout (ANALYSIS_JOB_TIMEOUT_SECONDS by default) is failed and the pool's processes
+    are terminated and replaced
+  - a crashed worker breaks only the pool; jobs in flight are re-queued and
+    retried one at a time, so a file that kills its worker on its own is failed
+    without taking other users' jobs down with it
+
+Job state lives in process memory, like the change bus — the app runs as one
+gunicorn worker (see Procfile). Finished jobs are kept for _JOB_TTL_SECONDS.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+
+from config import Config
+from analysis_worker import init_worker, run_parser
+
+_JOB_TTL_SECONDS = 3600
+_TICK_SECONDS    = 0.5
+
+
+class AnalysisJobs:
+    """In-memory job table + dispatcher thread in front of a process pool."""
+
+    def __init__(self):
+        self._jobs    = {}
+        self._running = {}            # job_id -> (Future, pool)
+        self._held    = None          # isolated job waiting for the pool to drain
+        self._queue   = queue.Queue()
+        self._cond    = threading.Condition()
+        self._pool    = None
+        self._retired = []            # pools to terminate from the dispatcher thread
+        self._thread  = None
+        self._pid     = None
+
+    # ------------------------------------------------------------------
+    # public API
+    # ------------------------------------------------------------------
+    def submit(self, parser: str, file_path: str, owner: str,
+               finish: Optional[Callable[[dict], dict]] = None,
+               timeout: Optional[int] = None, options: Optional[dict] = None) -> str:
+        """Queue `parser` on `file_path`. `finish(result)` turns the raw parser
+        result into the job's final body (runs in the web process). `timeout`
+        overrides ANALYSIS_JOB_TIMEOUT_SECONDS for this job; `options` are passed
+        to the parser as keyword arguments."""
+        job_id = uuid.uuid4().hex
+        with self._cond:
+            self._jobs[job_id] = {
+                'job_id':     job_id,
+                'parser':     parser,
+                'file_path':  file_path,
+                'options':    options or {},
+                'owner':      owner,
+                'finish':     finish,
+                'timeout':    timeout or Config.ANALYSIS_JOB_TIMEOUT_SECONDS,
+                'status':     'queued',
+                'attempts':   0,
+                'isolate':    False,
+                'result':     None,
+                'created_at': time.time(),
+                'started_at': None,
+                'ended_at':   None,
+            }
+        self._queue.put(job_id)
+        self._ensure_dispatcher()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Public view of a job: job_id, parser, owner, status, result."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            return {k: job[k] for k in ('job_id', 'parser', 'owner', 'status', 'result')}
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """Block until the job is done/failed or timeout elapses; returns get()."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._jobs.get(job_id, {}).get('status') in (None, 'done', 'failed'),
+                timeout
+            )
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+    # ------------------------------------------------------------------
+    # dispatcher
+    # ------------------------------------------------------------------
+    def _ensure_dispatcher(self):
+        # Threads and pools don't survive gunicorn's --preload fork; start lazily per process
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid     = os.getpid()
+            self._pool    = None
+            self._retired = []
+            self._running = {}
+            self._held    = None
+            self._thread  = threading.Thread(target=self._run, name='analysis-jobs', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        last_expiry = time.time()
+        while True:
+            try:
+                self._reap_overdue()
+                self._check_workers()
+                self._shutdown_retired()
+                if time.time() - last_expiry > 60:
+                    self._expire_finished()
+                    last_expiry = time.time()
+                if not self._can_start():
+                    time.sleep(_TICK_SECONDS)
+                    continue
+                if self._held is not None:
+                    job_id, self._held = self._held, None
+                else:
+                    try:
+                        job_id = self._queue.get(timeout=_TICK_SECONDS)
+                    except queue.Empty:
+                        continue
+                    with self._cond:
+                        job = self._jobs.get(job_id)
+                        if job and job['isolate'] and self._running:
+                            self._held = job_id   # wait for the pool to drain
+                            continue
+                self._start(job_id)
+            except Exception as e:
+                print(f"[analysis] Dispatcher error: {e}")
+                time.sleep(_TICK_SECONDS)
+
+    def _can_start(self) -> bool:
+        with self._cond:
+            if any(self._jobs[jid]['isolate'] for jid in self._running):
+                return False
+            if self._held is not None:
+                return not self._running
+            return len(self._running) < Config.ANALYSIS_WORKERS
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a threaded web process can deadlock the child
+            self._pool = ProcessPoolExecutor(
+                max_workers=Config.ANALYSIS_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(Config.ANALYSIS_MEMORY_LIMIT_MB,),
+            )
+        return self._pool
+
+    def _start(self, job_id: str):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] != 'queued':
+                return
+            job['attempts']  += 1
+            job['status']     = 'running'
+            job['started_at'] = time.time()
+        pool = self._get_pool()
+        try:
+            future = pool.submit(run_parser, job['parser'], job['file_path'], job['options'])
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            self._shutdown_retired()
+            pool = self._get_pool()
+            future = pool.submit(run_parser, job['parser'], job['file_path'], job['options'])
+        with self._cond:
+            self._running[job_id] = (future, pool)
+        future.add_done_callback(lambda f, jid=job_id: self._on_future_done(jid, f))
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Forget a pool (if it is still current) so the next job builds a new one.
+        Shutdown is left to the dispatcher: this also runs from future callbacks, which
+        execute on the pool's own manager thread while it holds the shutdown lock."""
+        with self._cond:
+            if self._pool is pool:
+                self._pool = None
+            if pool not in self._retired:
+                self._retired.append(pool)
+
+    def _shutdown_retired(self):
+        with self._cond:
+            retired, self._retired = self._retired, []
+        for pool in retired:
+            # Survivors of a broken pool keep running their parse unless killed
+            for proc in list((getattr(pool, '_processes', None) or {}).values()):
+                proc.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _take_running(self, job_id: str, future=None):
+        """Remove job_id from the in-flight set (only if it is still on `future`);
+        returns (job, pool) or (None, None)."""
+        with self._cond:
+            entry = self._running.get(job_id)
+            if entry is None or (future is not None and entry[0] is not future):
+                return None, None
+            del self._running[job_id]
+            return self._jobs.get(job_id), entry[1]
+
+    def _requeue_after_crash(self, job: Dict):
+        """A worker died under this job. We can't tell whose parse killed it, so the
+        job is retried alone; if it breaks the pool on its own, it is the culprit."""
+        if job['isolate']:
+            self._complete(job, {'success': False,
+                                 'message': 'Analysis worker crashed while reading this file'})
+            return
+        with self._cond:
+            job['isolate'] = True
+            job['status']  = 'queued'
+        self._queue.put(job['job_id'])
+
+    def _on_future_done(self, job_id: str, future):
+        job, pool = self._take_running(job_id, future)
+        if job is None:
+            return  # already handled by the reaper / worker check
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            self._requeue_after_crash(job)
+            return
+        except Exception as e:
+            result = {'success': False, 'message': f'Analysis failed: {e}'}
+        self._complete(job, result)
+
+    def _check_workers(self):
+        """Detect a dead worker the executor itself missed. (Python 3.11's on-demand
+        spawning can leave a freshly started process out of the manager thread's
+        wait set, so its futures never fail.)"""
+        with self._cond:
+            pools = {id(pool): pool for _, pool in self._running.values()}
+        for pool in pools.values():
+            procs = list((getattr(pool, '_processes', None) or {}).values())
+            if not any(proc.exitcode is not None for proc in procs):
+                continue
+            self._discard_pool(pool)
+            with self._cond:
+                victims = [jid for jid, (_, p) in self._running.items() if p is pool]
+            for jid in victims:
+                job, _ = self._take_running(jid)
+                if job is not None:
+                    self._requeue_after_crash(job)
+
+    def _reap_overdue(self):
+        now = time.time()
+        with self._cond:
+            overdue = [jid for jid in self._running
+                       if now - self._jobs[jid]['started_at'] > self._jobs[jid]['timeout']]
+        if not overdue:
+            return
+        # A hung parser can't be cancelled — kill the pool's processes and start fresh.
+        # Jobs that were merely sharing the pool are re-queued as they were.
+        with self._cond:
+            pools = {id(self._running[jid][1]): self._running[jid][1] for jid in overdue}
+            bystanders = [jid for jid, (_, p) in self._running.items()
+                          if jid not in overdue and id(p) in pools]
+        for pool in pools.values():
+            self._discard_pool(pool)
+        for jid in overdue:
+            job, _ = self._take_running(jid)
+            if job is None:
+                continue
+            print(f"[analysis] Job {jid} timed out; worker processes restarted")
+            self._complete(job, {
+                'success': False,
+                'message': f"Analysis timed out after {job['timeout']}s",
+            })
+        for jid in bystanders:
+            job, _ = self._take_running(jid)
+            if job is not None:
+                with self._cond:
+                    job['status'] = 'queued'
+                self._queue.put(jid)
+
+    def _complete(self, job: Dict, result: dict):
+        finish = job['finish']
+        if finish is not None:
+            try:
+                result = finish(result)
+            except Exception as e:
+                print(f"[analysis] finish() for job {job['job_id']} failed: {e}")
+                result = {'success': False, 'message': f'Analysis failed: {e}'}
+        with self._cond:
+            job['result']   = result
+            job['status']   = 'done' if result.get('success') else 'failed'
+            job['ended_at'] = time.time()
+            job['finish']   = None
+            self._cond.notify_all()
+
+    def _expire_finished(self):
+        cutoff = time.time() - _JOB_TTL_SECONDS
+        with self._cond:
+            for jid in [j for j, job in self._jobs.items()
+                        if job['ended_at'] and job['ended_at'] < cutoff]:
+                del self._jobs[jid]
+
+
+# Single global instance
+analysis_jobs = AnalysisJobs()
@@ -0,0 +1,40 @@
+"""
+Analysis worker process entry points
+Runs inside the ProcessPoolExecutor started by analysis_jobs. Kept free of
+Flask / database imports so spawned workers start quickly and never open
+MySQL connections; parser modules are imported lazily per job.
+"""
+
+import importlib
+from typing import Optional
+
+# parser name -> (module, function); every function takes the file path (plus
+# optional keyword options) and returns a dict
+PARSERS = {
+    'ufp':          ('ufp_analysis',     'analyze_ufp'),
+    '3mf':          ('threemf_analysis', 'analyze_3mf'),
+    'stl':          ('stl_analysis',     'analyze_stl'),
+    'dxf_preview':  ('dxf_preview',      'build_preview'),
+    'mesh_preview': ('mesh_preview',     'build_mesh'),
+    'thumbnails':   ('thumbnails',       'build_thumbnails'),
+}
+
+
+def init_worker(memory_limit_mb: int) -> None:
+    """Pool initializer: cap this process's address space so a runaway parse
+    raises MemoryError here instead of exhausting the web container."""
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass  # not supported on this platform — timeouts still apply
+
+
+def run_parser(parser: str, file_path: str, options: Optional[dict] = None) -> dict:
+    module_name, func_name = PARSERS[parser]
+    func = getattr(importlib.import_module(module_name), func_name)
+    try:
+        return func(file_path, **(options or {}))
+    except MemoryError:
+        return {'success': False, 'message': 'File is too complex to analyze (memory limit reached)'}
@@ -5,12 +5,16 @@ import decimal
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from database import db
+from db_pool import PoolTimeout
 from auth_service import AuthService
 from config import Config
+from upload_store import StreamingUploadRequest, discard_pending_uploads, MAX_REQUEST_BYTES
 
 app = Flask(__name__)
+app.request_class = StreamingUploadRequest  # file parts stream straight into UPLOAD_FOLDER
 CORS(app)  # Enable CORS for frontend requests
 
 # Custom JSON serializer -- handles datetime / date / Decimal
@@ -27,8 +31,12 @@ app.json = _AppEncoder(app)
 
 # Configure upload folder
 app.config["UPLOAD_FOLDER"] = Config.UPLOAD_FOLDER
-app.config["MAX_CONTENT_LENGTH"] = Config.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+# Per-file limits (Config.MAX_UPLOAD_SIZE_MB, larger for .ufp/.3mf) are enforced while streaming
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+# send_file emits X-Sendfile instead of streaming when the proxy supports it
+app.config["USE_X_SENDFILE"] = Config.UPLOAD_SENDFILE_MODE == 'x-sendfile'
 os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+app.teardown_request(discard_pending_uploads)
 
 # Register blueprints
 from routes.pages import pages_bp
@@ -42,7 +50,7 @@ app.register_blueprint(print_bp)
 app.register_blueprint(admin_bp)
 
 # Cron / manual cleanup routes (import functions from jobs package)
-from jobs.cleanup import _cleanup_old_files, _cleanup_unverified, start_jobs
+from jobs.cleanup import _cleanup_old_files, _cleanup_unverified, _reconcile_rollups, start_jobs
 
 
 @app.route("/api/admin/cleanup", methods=["POST"])
@@ -72,6 +80,7 @@ def cron_cleanup():
 
     _cleanup_old_files()
     _cleanup_unverified()
+    _reconcile_rollups()
     return jsonify({"success": True, "message": "Cron cleanup completed"}), 200
 
 
@@ -81,18 +90,59 @@ def before_request():
         db.connect()
 
 
+@app.teardown_appcontext
+def release_db_connection(exc):
+    # Return the connection this request pinned (see database.py) to the pool
+    db.release_request_connection()
+
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"success": False, "message": "Endpoint not found"}), 404
 
 
+@app.errorhandler(RequestEntityTooLarge)
+def too_large(error):
+    message = error.description if error.description != RequestEntityTooLarge.description else "File too large"
+    return jsonify({"success": False, "message": message}), 413
+
+
+@app.errorhandler(PoolTimeout)
+def database_busy(error):
+    print(f"[WARN] {error}")
+    return jsonify({"success": False, "message": "Server is busy, please try again"}), 503
+
+
 @app.errorhandler(500)
 def internal_error(error):
     return jsonify({"success": False, "message": "Internal server error"}), 500
 
 
-# Start background cleanup jobs
-start_jobs()
+from email_outbox import outbox
+from email_service import get_transport
+from request_stats import rollup
+
+_background_pid = None
+
+
+def start_background_services():
+    """Start the cleanup timers, the email outbox worker and the rollup worker.
+
+    Nothing here may run at import: gunicorn --preload imports this module in
+    the master, where threads (and the DB connections they open) would not be
+    inherited by — or would be shared with — the forked worker. gunicorn.conf.py
+    calls this from post_fork; the dev server below calls it directly.
+    """
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    _background_pid = os.getpid()
+    # Background cleanup jobs
+    start_jobs()
+    # Outbound email worker (also resumes messages left pending before a restart)
+    outbox.start(get_transport())
+    # Keep the daily_request_stats rollup in step with print_requests changes
+    rollup.start()
 
 
 if __name__ == "__main__":
@@ -101,4 +151,5 @@ if __name__ == "__main__":
     print(f"Database: {Config.DB_NAME}")
     print(f"Server running on: http://localhost:{port}")
     db.connect()
+    start_background_services()
     app.run(host="0.0.0.0", port=port, debug=True)
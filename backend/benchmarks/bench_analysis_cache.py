@@ -0,0 +1,159 @@
+"""
+Analysis cache: cold parser calls vs warm analysis_cache hits.
+
+Writes a corpus of sample uploads: Cura 5 UFPs (slicemetadata.json plus an
+embedded G-code, as in bench_ufp_header.py), Bambu Studio 3MFs
+(slice_info.config, project_settings.config and a mesh) and LightBurn-style
+G-code files. Per kind:
+  cold   analyze_ufp / analyze_3mf / _parse_gcode_time on the file
+  warm   analysis_cache.get_or_compute answered from file_analysis_cache
+         (one SELECT and the hit_count UPDATE, with --rtt-ms per statement)
+
+Then replays an upload sequence where every file is sent --uploads times
+(revisions re-sending the same file) and reports analysis_cache.stats().
+
+    python benchmarks/bench_analysis_cache.py [--files 10] [--gcode-mb 5] [--uploads 5] [--rtt-ms 1]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import tempfile
+import zipfile
+
+from common import fresh_db, measure, print_table
+
+import analysis_cache
+import threemf_analysis
+import ufp_analysis
+from routes import print_requests
+
+
+def _moves(rng, size):
+    lines, total = [], 0
+    while total < size:
+        line = (f'G1 F{rng.randint(1200, 3600)} X{rng.uniform(0, 330):.3f} '
+                f'Y{rng.uniform(0, 240):.3f} E{rng.uniform(0, 9999):.5f}\n')
+        lines.append(line)
+        total += len(line)
+    return ''.join(lines).encode()
+
+
+def build_ufp(path, rng, gcode_mb):
+    seconds = rng.randint(600, 36000)
+    metadata = {'metadata': {'global': {'print_time': seconds,
+                                        'material_weight': round(rng.uniform(5, 200), 1),
+                                        'material_type': 'PLA'}}}
+    block = _moves(rng, 1 << 20)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('/Cura/slicemetadata.json', json.dumps(metadata))
+        with zf.open('/3D/model.gcode', 'w', force_zip64=True) as member:
+            member.write(f';FLAVOR:Griffin\n;TIME:{seconds}\n'.encode())
+            for _ in range(gcode_mb):
+                member.write(block)
+
+
+def build_3mf(path, rng, mesh_mb):
+    slice_info = (
+        '<config><plate>'
+        '<metadata key="index" value="1"/>'
+        f'<metadata key="prediction" value="{rng.randint(600, 36000)}"/>'
+        f'<metadata key="weight" value="{rng.uniform(5, 200):.2f}"/>'
+        f'<filament id="1" type="PLA" used_m="{rng.uniform(1, 60):.2f}"/>'
+        '</plate></config>')
+    vertices, size = [], 0
+    while size < mesh_mb << 20:
+        vertex = (f'<vertex x="{rng.uniform(0, 100):.4f}" y="{rng.uniform(0, 100):.4f}" '
+                  f'z="{rng.uniform(0, 100):.4f}"/>')
+        vertices.append(vertex)
+        size += len(vertex)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('3D/3dmodel.model', '<model><mesh><vertices>'
+                                        + ''.join(vertices) + '</vertices></mesh></model>')
+        zf.writestr('Metadata/slice_info.config', slice_info)
+        # Bambu Studio writes every process / filament / machine setting here
+        settings = {f'setting_{i}': [f'{rng.random():.6f}'] * 4 for i in range(4000)}
+        settings.update({'printer_model': 'Bambu Lab X1 Carbon', 'layer_height': '0.2',
+                         'sparse_infill_density': '15%'})
+        zf.writestr('Metadata/project_settings.config', json.dumps(settings, indent=4))
+
+
+def build_gcode(path, rng, gcode_mb):
+    # The time comment sits at the end of the 400-line window _parse_gcode_time reads
+    preamble = ''.join(f'; setting_{i} = {rng.random():.6f}\n' for i in range(390))
+    with open(path, 'wb') as f:
+        f.write(preamble.encode())
+        f.write(f'; Total estimated time: 0:{rng.randint(1, 59):02d}:{rng.randint(0, 59):02d}\n'.encode())
+        f.write(_moves(rng, gcode_mb << 20))
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_corpus(tmp, files, gcode_mb):
+    rng = random.Random(0)
+    kinds = {
+        'ufp':        ('.ufp',   lambda p: build_ufp(p, rng, gcode_mb), ufp_analysis.PARSER_VERSION,
+                       ufp_analysis.analyze_ufp),
+        '3mf':        ('.3mf',   lambda p: build_3mf(p, rng, gcode_mb), threemf_analysis.PARSER_VERSION,
+                       threemf_analysis.analyze_3mf),
+        'gcode_time': ('.gcode', lambda p: build_gcode(p, rng, gcode_mb), print_requests._GCODE_PARSER_VERSION,
+                       lambda p: {'success': True, 'estimated_time': print_requests._parse_gcode_time(p)}),
+    }
+    corpus = {}
+    for parser, (ext, build, version, analyze) in kinds.items():
+        paths = [os.path.join(tmp, f'{parser}-{n}{ext}') for n in range(files)]
+        for path in paths:
+            build(path)
+        corpus[parser] = (version, analyze, [(path, _sha256(path)) for path in paths])
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=10, help='files per kind')
+    parser.add_argument('--gcode-mb', type=int, default=5, help='embedded G-code / mesh size per file')
+    parser.add_argument('--uploads', type=int, default=5, help='times each file is uploaded')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rtt-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = build_corpus(tmp, args.files, args.gcode_mb)
+        fresh_db()
+
+        rows = []
+        for name, (version, analyze, files) in corpus.items():
+            for path, sha in files:
+                analysis_cache.store(name, version, sha, analyze(path))
+            _, cold = measure(lambda: [analyze(path) for path, _ in files], args.repeat)
+            statements, warm = measure(
+                lambda: [analysis_cache.get_or_compute(name, version, sha, lambda: analyze(path))
+                         for path, sha in files],
+                args.repeat, args.rtt_ms)
+            rows.append((name, len(files), f'{cold / len(files):.3f}', f'{warm / len(files):.3f}',
+                         statements // len(files), f'{cold / warm:.1f}x'))
+        print_table(('parser', 'files', 'cold ms/file', 'warm ms/file', 'stmts/hit', 'speedup'), rows)
+
+        # Upload replay on an empty cache: the first upload of each file misses
+        fresh_db()
+        analysis_cache._counters = analysis_cache._Counters()
+        for _ in range(args.uploads):
+            for name, (version, analyze, files) in corpus.items():
+                for path, sha in files:
+                    analysis_cache.get_or_compute(name, version, sha, lambda: analyze(path))
+        print(f'\n{args.uploads} uploads of each file:')
+        print_table(('parser', 'hits', 'misses', 'hit rate'),
+                    [(name, s['hits'], s['misses'], s['hit_rate'])
+                     for name, s in analysis_cache.stats().items()])
+
+
+if __name__ == '__main__':
+    main()
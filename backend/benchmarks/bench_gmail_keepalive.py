@@ -0,0 +1,143 @@
+"""
+Per-message Gmail API latency with and without keep-alive connections.
+
+Starts a local HTTPS stand-in for oauth2.googleapis.com / gmail.googleapis.com
+(self-signed certificate made with the openssl CLI, HTTP/1.1 keep-alive) and
+sends messages through email_service three ways:
+  per-message   a new TLS connection for every message, as before (pool with
+                max_idle=0, so every connection is closed after use)
+  keep-alive    _send_via_gmail_api through the shared connection pool
+  batch         _send_batch_via_gmail_api, all messages on one connection
+
+Localhost has no network latency, so --rtt-ms adds a simulated round trip:
+two on each connect (TCP + TLS 1.3 handshake) and one per request.
+
+    python benchmarks/bench_gmail_keepalive.py [--messages 50] [--rtt-ms 20]
+"""
+
+import argparse
+import http.client
+import http.server
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+from common import print_table
+
+import email_service
+
+
+class _StandIn(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'       # keep connections open between requests
+    disable_nagle_algorithm = True      # headers and body go out as separate writes
+    rtt = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(self.rtt)
+        if self.path == '/token':
+            body = {'access_token': 'bench-token', 'expires_in': 3600}
+        else:
+            body = {'id': 'msg-%d' % time.monotonic_ns()}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _self_signed(tmp):
+    cert, key = os.path.join(tmp, 'cert.pem'), os.path.join(tmp, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+                    '-keyout', key, '-out', cert], check=True, capture_output=True)
+    return cert, key
+
+
+def start_stand_in(tmp, rtt):
+    cert, key = _self_signed(tmp)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _StandIn)
+    server.daemon_threads = True
+    server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ctx.load_cert_chain(cert, key)
+    server.socket = server_ctx.wrap_socket(server.socket, server_side=True)
+    _StandIn.rtt = rtt
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Trust the stand-in's certificate (http.client's default-context hook) and
+    # pay the simulated handshake on every new connection
+    client_ctx = ssl.create_default_context(cafile=cert)
+    ssl._create_default_https_context = lambda: client_ctx
+    connect = http.client.HTTPSConnection.connect
+
+    def slow_connect(conn):
+        time.sleep(2 * rtt)
+        connect(conn)
+
+    http.client.HTTPSConnection.connect = slow_connect
+
+    # Route both Google hosts to the stand-in
+    address = f'127.0.0.1:{server.server_address[1]}'
+    email_service._OAUTH_HOST = email_service._GMAIL_HOST = address
+    return server
+
+
+def per_message(n, send):
+    timings = []
+    for i in range(n):
+        started = time.perf_counter()
+        send(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), sum(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--rtt-ms', type=float, default=20.0,
+                        help='simulated network round trip to Google')
+    args = parser.parse_args()
+
+    message = ('student@bench.edu', 'Your print is ready', '<p>' + 'x' * 2000 + '</p>')
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_stand_in(tmp, args.rtt_ms / 1000)
+        email_service._token_cache.get()       # token caching is measured separately
+
+        def run(name, pool, send):
+            email_service._http_pool = pool
+            median, total = per_message(args.messages, send)
+            rows.append((name, f'{median:.1f}', f'{total:.0f}',
+                         pool.stats()['opened'], pool.stats()['reused']))
+            pool.close()
+
+        run('per-message', email_service._HttpsConnectionPool(max_idle=0),
+            lambda i: email_service._send_via_gmail_api(*message))
+        run('keep-alive', email_service._HttpsConnectionPool(),
+            lambda i: email_service._send_via_gmail_api(*message))
+
+        batch_pool = email_service._HttpsConnectionPool()
+        email_service._http_pool = batch_pool
+        started = time.perf_counter()
+        results = email_service._send_batch_via_gmail_api([message] * args.messages)
+        total = (time.perf_counter() - started) * 1000
+        assert not [r for r in results if isinstance(r, Exception)], results
+        rows.append(('batch', f'{total / args.messages:.1f} (mean)', f'{total:.0f}',
+                     batch_pool.stats()['opened'], len(results) - 1))
+        server.shutdown()
+
+    print(f'{args.messages} messages, {args.rtt_ms:g} ms simulated round trip\n')
+    print_table(('mode', 'ms / message', 'total ms', 'connections', 'reused'), rows)
+
+
+if __name__ == '__main__':
+    main()
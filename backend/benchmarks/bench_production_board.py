@@ -0,0 +1,72 @@
+"""
+Production board: queries issued and latency as the printer count grows.
+
+Seeds N printers x M queued jobs and builds the board two ways:
+  per-printer   the old shape: printers, then one print_jobs JOIN per printer
+  set-based     routes.admin._build_production_board (one jobs query in total)
+
+    python benchmarks/bench_production_board.py [--jobs 8] [--rtt-ms 1]
+"""
+
+import argparse
+
+from common import fresh_db, measure, print_table, seed_printers, seed_queue, seed_users
+
+from database import db
+from routes.admin import _build_production_board
+
+_JOBS_FOR_PRINTER = """
+    SELECT pj.job_id, pj.request_id, pj.queue_position, pj.status AS job_status,
+           pj.attempt_number, pj.assigned_by, pj.assigned_at, pj.estimated_start,
+           pj.estimated_end, pj.started_at, pj.staff_notified,
+           COALESCE(pj.print_end_expected,
+                    CASE WHEN pj.status = 'printing' AND pj.started_at IS NOT NULL
+                         THEN DATE_ADD(pj.started_at, INTERVAL pr.ufp_print_time_minutes MINUTE)
+                         ELSE NULL END) AS print_end_expected,
+           pj.completed_at, pj.notes AS job_notes, pr.project_name, pr.student_email,
+           pr.reviewed_by, s.full_name AS student_name, pr.material_type, pr.priority,
+           pr.deadline_date, pr.ufp_print_time_minutes, pr.ufp_material_g,
+           ab.full_name AS assigned_by_name, rb.full_name AS reviewed_by_name
+    FROM print_jobs pj
+    JOIN print_requests pr ON pr.request_id = pj.request_id
+    LEFT JOIN students s   ON s.email = pr.student_email
+    LEFT JOIN admins ab    ON ab.email = pj.assigned_by
+    LEFT JOIN admins rb    ON rb.email = pr.reviewed_by
+    WHERE pj.printer_id = %s
+      AND pj.status NOT IN ('completed', 'cancelled', 'failed')
+    ORDER BY pj.queue_position ASC
+"""
+
+
+def per_printer_board():
+    """The pre-change query pattern (N + 2 statements)."""
+    db.fetch_all("SELECT request_id FROM print_requests WHERE status = 'approved'")
+    printers = db.fetch_all("SELECT printer_id FROM printers ORDER BY printer_name") or []
+    return [db.fetch_all(_JOBS_FOR_PRINTER, (p['printer_id'],)) for p in printers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--printers', type=int, nargs='+', default=[1, 5, 10, 20, 40, 80])
+    parser.add_argument('--jobs', type=int, default=8, help='queued jobs per printer')
+    parser.add_argument('--rtt-ms', type=float, default=1.0,
+                        help='simulated database round trip per statement')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.printers:
+        db_ = fresh_db()
+        seed_users(db_)
+        for printer_id in seed_printers(db_, n):
+            seed_queue(db_, printer_id, args.jobs)
+        old_q, old_ms = measure(per_printer_board, args.repeat, args.rtt_ms)
+        new_q, new_ms = measure(_build_production_board, args.repeat, args.rtt_ms)
+        rows.append((n, n * args.jobs, old_q, f'{old_ms:.1f}', new_q, f'{new_ms:.1f}'))
+
+    print(f'{args.jobs} jobs per printer, {args.rtt_ms:g} ms simulated round trip\n')
+    print_table(('printers', 'jobs', 'old queries', 'old ms', 'new queries', 'new ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
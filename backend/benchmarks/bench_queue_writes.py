@@ -0,0 +1,84 @@
+"""
+Queue reorder / reschedule latency as the printer queue grows.
+
+For each queue depth, one printer is seeded with that many queued jobs and
+each write is timed:
+  reschedule   per-row  one UPDATE per job (the old loop)
+               case     db.update_case, one UPDATE ... CASE statement
+  reorder      per-row  one UPDATE queue_position per job (the old loop)
+               case     queue_ranks.rebalance (full order, one statement)
+               move     queue_ranks.place: one job to the middle of the queue,
+                        only its row written (sparse ranks)
+
+    python benchmarks/bench_queue_writes.py [--depths 10 100 1000] [--rtt-ms 1]
+"""
+
+import argparse
+import datetime
+
+from common import fresh_db, measure, print_table, seed_printers, seed_queue, seed_users
+
+import queue_ranks
+from database import db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--depths', type=int, nargs='+', default=[10, 50, 100, 250, 500, 1000])
+    parser.add_argument('--rtt-ms', type=float, default=1.0,
+                        help='simulated database round trip')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for depth in args.depths:
+        db_ = fresh_db()
+        seed_users(db_)
+        printer_id = seed_printers(db_, 1)[0]
+        job_ids = seed_queue(db_, printer_id, depth)
+        start = datetime.datetime(2026, 1, 5, 9, 0)
+        schedule = [{'job_id': job_id,
+                     'estimated_start': start + datetime.timedelta(hours=i),
+                     'estimated_end': start + datetime.timedelta(hours=i + 1)}
+                    for i, job_id in enumerate(job_ids)]
+        reversed_order = job_ids[::-1]
+        middle = job_ids[depth // 2]
+
+        def reschedule_per_row():
+            for j in schedule:
+                db.execute_query(
+                    "UPDATE print_jobs SET estimated_start = %s, estimated_end = %s WHERE job_id = %s",
+                    (j['estimated_start'], j['estimated_end'], j['job_id']))
+
+        def reschedule_case():
+            db.update_case('print_jobs', 'job_id', schedule, ['estimated_start', 'estimated_end'])
+
+        def reorder_per_row():
+            for position, job_id in enumerate(reversed_order, start=1):
+                db.execute_query(
+                    "UPDATE print_jobs SET queue_position = %s WHERE job_id = %s AND printer_id = %s",
+                    (position, job_id, printer_id))
+
+        def reorder_case():
+            queue_ranks.rebalance(printer_id, reversed_order)
+
+        def move_one():
+            with db.transaction():
+                queue_ranks.place(job_ids[0], after_job_id=middle)
+                queue_ranks.place(job_ids[0], before_job_id=job_ids[1])
+
+        for op, method, fn, per_call in (
+                ('reschedule', 'per-row', reschedule_per_row, 1),
+                ('reschedule', 'case', reschedule_case, 1),
+                ('reorder', 'per-row', reorder_per_row, 1),
+                ('reorder', 'case', reorder_case, 1),
+                ('reorder', 'move', move_one, 2)):
+            statements, ms = measure(fn, args.repeat, args.rtt_ms)
+            rows.append((depth, op, method, statements // per_call, f'{ms / per_call:.1f}'))
+
+    print(f'{args.rtt_ms:g} ms simulated round trip\n')
+    print_table(('depth', 'operation', 'method', 'statements', 'median ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
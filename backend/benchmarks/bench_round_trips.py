@@ -0,0 +1,121 @@
+"""
+Database round trips per operation: assign a request to a printer, then move
+the job to printing and to completed, through the Flask endpoints.
+
+Each operation runs twice:
+  unpinned   every helper call outside db.transaction() borrows and returns
+             its own pooled connection, as before request pinning. This
+             understates the old cost: the old code had no transactions, so
+             every call checked out a connection, and each write sent its
+             own COMMIT
+  pinned     the current behaviour: one connection per request
+
+Counted per operation: Database._run calls, pool checkouts, and round trips
+(statements + COMMITs + session resets on return to the pool).
+
+    python benchmarks/bench_round_trips.py [--ops 50] [--rtt-ms 1]
+"""
+
+import argparse
+import statistics
+import time
+
+from common import CountingCursor, fresh_db, print_table, seed_printers, seed_users
+
+import database
+from app import app
+from auth_service import AuthService
+from email_outbox import outbox
+
+
+class RunCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def __enter__(self):
+        self._saved = database.Database._run
+        counter, run = self, self._saved
+
+        def _run(db_self, fn):
+            counter.calls += 1
+            return run(db_self, fn)
+
+        database.Database._run = _run
+        return self
+
+    def __exit__(self, *exc):
+        database.Database._run = self._saved
+
+
+def _seed(ops):
+    db = fresh_db()
+    seed_users(db)
+    printers = seed_printers(db, ops)
+    db.execute_many(
+        "INSERT INTO print_requests (student_email, project_name, status, ufp_file_path, "
+        "ufp_print_time_minutes) VALUES ('student@bench.edu', %s, 'approved', 'x.ufp', 60)",
+        [(f'part {i}',) for i in range(ops)])
+    requests = [r['request_id'] for r in db.fetch_all(
+        "SELECT request_id FROM print_requests ORDER BY request_id")]
+    return printers, requests
+
+
+def run(ops, rtt_ms):
+    printers, requests = _seed(ops)
+    headers = {'Authorization': 'Bearer ' + AuthService.generate_jwt_token('admin@bench.edu', 'admin')}
+    client = app.test_client()
+    results = {}
+
+    def measure(name, call):
+        pool = database._get_pool()
+        before = pool.metrics()['checkouts']
+        timings = []
+        with RunCounter() as runs, CountingCursor(rtt_ms) as trips:
+            for i in range(ops):
+                started = time.perf_counter()
+                r = call(i)
+                timings.append((time.perf_counter() - started) * 1000)
+                assert r.status_code in (200, 201), (name, r.status_code, r.get_json())
+        results[name] = (runs.calls / ops, (pool.metrics()['checkouts'] - before) / ops,
+                         trips.round_trips / ops, statistics.median(timings))
+
+    job_ids = {}
+
+    def assign(i):
+        r = client.post(f'/api/admin/print-requests/{requests[i]}/assign',
+                        json={'printer_id': printers[i]}, headers=headers)
+        job_ids[i] = r.get_json().get('job_id')
+        return r
+
+    measure('assign', assign)
+    measure('status -> printing', lambda i: client.patch(
+        f'/api/admin/jobs/{job_ids[i]}/status', json={'status': 'printing'}, headers=headers))
+    measure('status -> completed', lambda i: client.patch(
+        f'/api/admin/jobs/{job_ids[i]}/status', json={'status': 'completed'}, headers=headers))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ops', type=int, default=50)
+    parser.add_argument('--rtt-ms', type=float, default=1.0,
+                        help='simulated database round trip')
+    args = parser.parse_args()
+
+    # Keep the outbox worker from sharing the database while counting
+    outbox._ensure_worker = lambda: None
+
+    rows = []
+    saved_can_pin = database.Database._can_pin
+    for mode in ('unpinned', 'pinned'):
+        database.Database._can_pin = saved_can_pin if mode == 'pinned' else (lambda self, st: False)
+        for name, (runs, checkouts, trips, ms) in run(args.ops, args.rtt_ms).items():
+            rows.append((name, mode, f'{runs:.1f}', f'{checkouts:.1f}', f'{trips:.1f}', f'{ms:.1f}'))
+    database.Database._can_pin = saved_can_pin
+
+    print(f'{args.ops} operations each, {args.rtt_ms:g} ms simulated round trip\n')
+    print_table(('operation', 'mode', '_run calls', 'checkouts', 'round trips', 'median ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+STL parsing throughput: stl_analysis vs the numpy-stl path it replaced.
+
+Writes binary STLs of random triangles and times, per size:
+  numpy-stl     mesh.Mesh.from_file + get_mass_properties / min_ / max_ / areas
+                (the pre-change code; skipped when numpy-stl isn't installed,
+                it is no longer in requirements.txt)
+  mmap          _mesh_properties over the mmap'd records, i.e. the same
+                volume / bounding box / area outputs
+  analyze_stl   the full analysis including the layer-sliced estimate
+
+Peak memory is the tracemalloc peak of a separate run (numpy buffers are
+traced; pages of the mmap itself are not).
+
+    python benchmarks/bench_stl_parse.py [--sizes 10000 100000 1000000 5000000]
+"""
+
+import argparse
+import logging
+import mmap
+import os
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+import common  # noqa: F401  (puts backend/ on sys.path)
+import stl_analysis
+from common import print_table
+
+try:
+    from stl import mesh as stl_mesh
+except ImportError:        # numpy-stl is optional here
+    stl_mesh = None
+
+
+def write_binary_stl(path, triangles, chunk=1_000_000):
+    rng = np.random.default_rng(0)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 80 + int(triangles).to_bytes(4, 'little'))
+        for start in range(0, triangles, chunk):
+            n = min(chunk, triangles - start)
+            records = np.zeros(n, dtype=stl_analysis._STL_RECORD)
+            # Small facets scattered through a 100 mm cube, like a finely tessellated part
+            centers = rng.uniform(0, 100, (n, 1, 3))
+            records['vertices'] = (centers + rng.uniform(-0.5, 0.5, (n, 3, 3))).astype(np.float32)
+            f.write(records.tobytes())
+
+
+def numpy_stl_properties(path):
+    # As the old code did: silence numpy-stl's "mesh is not closed" warning
+    logging.getLogger('stl').setLevel(logging.ERROR)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        m = stl_mesh.Mesh.from_file(path)
+        volume, _cog, _inertia = m.get_mass_properties()
+    return volume, m.min_, m.max_, float(m.areas.sum())
+
+
+def mmap_properties(path):
+    count = (os.path.getsize(path) - stl_analysis._STL_HEADER_SIZE) // stl_analysis._STL_RECORD.itemsize
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        records = np.frombuffer(mm, dtype=stl_analysis._STL_RECORD, count=count,
+                                offset=stl_analysis._STL_HEADER_SIZE)
+        props = stl_analysis._mesh_properties(records['vertices'])
+        del records
+    return props
+
+
+def run(fn, path):
+    """Wall time of an untraced call, then peak traced memory of a second call
+    (tracemalloc slows pure-Python code down too much to time under it)."""
+    started = time.perf_counter()
+    fn(path)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn(path)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--numpy-stl-max', type=int, default=1_000_000,
+                        help='skip the numpy-stl path above this many triangles '
+                             '(it needs ~2 GB and ~30 s per million)')
+    args = parser.parse_args()
+    if stl_mesh is None:
+        print('numpy-stl not installed: old-path columns skipped (pip install numpy-stl==3.1.2)\n')
+
+    paths = {'numpy-stl': numpy_stl_properties, 'mmap': mmap_properties,
+             'analyze_stl': stl_analysis.analyze_stl}
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f'{size}.stl')
+            write_binary_stl(path, size)
+            for name, fn in paths.items():
+                if name == 'numpy-stl' and (stl_mesh is None or size > args.numpy_stl_max):
+                    continue
+                elapsed, peak_mb = run(fn, path)
+                rows.append((f'{size:,}', name, f'{elapsed * 1000:.0f}',
+                             f'{size / elapsed / 1e6:.2f}', f'{peak_mb:.0f}'))
+            os.remove(path)
+    print_table(('triangles', 'path', 'ms', 'Mtri/s', 'peak MB'), rows)
+
+
+if __name__ == '__main__':
+    main()
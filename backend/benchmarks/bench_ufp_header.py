@@ -0,0 +1,96 @@
+"""
+Peak RSS and latency of analyze_ufp on a UFP with ~200 MB of embedded G-code.
+
+Builds a synthetic Cura 5 UFP (slicemetadata.json + a large /3D/model.gcode)
+and analyses it in a fresh child process per run, reporting wall time and the
+child's peak RSS (ru_maxrss) over an interpreter that only imported the module:
+  read-whole   zf.read(member)[:4096], the pre-change header read
+  read-head    ufp_analysis.read_member_head (ZipFile.open, lazy inflate)
+
+    python benchmarks/bench_ufp_header.py [--gcode-mb 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import common  # noqa: F401  (puts backend/ on sys.path)
+from common import print_table
+
+_HEADER = (';FLAVOR:Griffin\n;TIME:7932\n;Filament used: 12.41m\n'
+           ';Layer height: 0.2\n;MINX:10.2\n;MINY:11.7\n;MINZ:0.2\n')
+
+
+def build_ufp(path, gcode_mb):
+    rng = random.Random(0)
+    # 1 MB of varied moves, repeated: deflate only sees a 32 KB window, so the
+    # compression ratio stays close to real G-code
+    lines, size = [], 0
+    while size < 1 << 20:
+        line = (f'G1 F{rng.randint(1200, 3600)} X{rng.uniform(0, 330):.3f} '
+                f'Y{rng.uniform(0, 240):.3f} E{rng.uniform(0, 9999):.5f}\n')
+        lines.append(line)
+        size += len(line)
+    block = ''.join(lines).encode()
+    metadata = {'metadata': {'global': {'print_time': 7932, 'material_weight': 36.7,
+                                        'material_type': 'PLA'}}}
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('/Cura/slicemetadata.json', json.dumps(metadata))
+        with zf.open('/3D/model.gcode', 'w', force_zip64=True) as member:
+            member.write(_HEADER.encode())
+            for _ in range(gcode_mb):
+                member.write(block)
+
+
+def child(mode, path):
+    import ufp_analysis
+    if mode == 'read-whole':
+        ufp_analysis.read_member_head = lambda zf, name, limit: zf.read(name)[:limit]
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    result = ufp_analysis.analyze_ufp(path) if mode != 'baseline' else {'success': True}
+    elapsed = time.perf_counter() - started
+    assert result['success'], result
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'ms': elapsed * 1000, 'rss_kb': peak, 'rss_before_kb': before}))
+
+
+def run_child(mode, path):
+    out = subprocess.run([sys.executable, __file__, '--child', mode, path],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--gcode-mb', type=int, default=200)
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic.ufp')
+        build_ufp(path, args.gcode_mb)
+        info = zipfile.ZipFile(path).getinfo('/3D/model.gcode')
+        print(f'G-code {info.file_size / 2**20:.0f} MB uncompressed, '
+              f'{info.compress_size / 2**20:.0f} MB in the archive\n')
+        baseline = run_child('baseline', path)['rss_kb']
+        rows = []
+        for mode in ('read-whole', 'read-head'):
+            r = run_child(mode, path)
+            rows.append((mode, f"{r['ms']:.1f}", f"{r['rss_kb'] / 1024:.1f}",
+                         f"{(r['rss_kb'] - baseline) / 1024:.1f}"))
+    print_table(('mode', 'ms', 'peak RSS MB', 'over baseline MB'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+The benchmarks run against the SQLite backend (sqlite_backend.py) on an
+in-memory database, so they need no MySQL server:
+
+    cd backend && python benchmarks/bench_production_board.py
+
+An in-process SQLite query costs microseconds where an RDS round trip costs
+about a millisecond, so CountingCursor can add a fixed delay per round trip
+(--rtt-ms) to make round-trip-bound code paths show up in the latency.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('DB_BACKEND', 'sqlite')
+os.environ.setdefault('SQLITE_PATH', ':memory:')
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-with-enough-length')
+os.environ.setdefault('EMAIL_TRANSPORT', 'fake')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database        # noqa: E402
+import sqlite_backend  # noqa: E402
+
+
+def fresh_db():
+    """Drop the current in-memory database and return db on a new, empty one."""
+    database.db.release_request_connection()
+    database._pool = None
+    return database.db
+
+
+class CountingCursor:
+    """Counts what would be a database round trip on MySQL while active:
+    statements, COMMITs and the session reset done when a connection goes back
+    to the pool. Optionally sleeps rtt_ms for each. Use as a context manager."""
+
+    def __init__(self, rtt_ms: float = 0.0):
+        self.rtt = rtt_ms / 1000.0
+        self.statements = 0
+        self.commits = 0
+        self.resets = 0
+        self._saved = None
+
+    @property
+    def round_trips(self):
+        return self.statements + self.commits + self.resets
+
+    def __enter__(self):
+        cur, conn = sqlite_backend.SQLiteCursor, sqlite_backend.SQLiteConnection
+        self._saved = (cur.execute, cur.executemany, conn.commit, conn.reset_session)
+        execute, executemany, commit, reset_session = self._saved
+        counter = self
+
+        def counting(fn, field):
+            def _wrapped(*args):
+                setattr(counter, field, getattr(counter, field) + 1)
+                if counter.rtt:
+                    time.sleep(counter.rtt)
+                return fn(*args)
+            return _wrapped
+
+        cur.execute = counting(execute, 'statements')
+        cur.executemany = counting(executemany, 'statements')
+        conn.commit = counting(commit, 'commits')
+        conn.reset_session = counting(reset_session, 'resets')
+        return self
+
+    def __exit__(self, *exc):
+        cur, conn = sqlite_backend.SQLiteCursor, sqlite_backend.SQLiteConnection
+        cur.execute, cur.executemany, conn.commit, conn.reset_session = self._saved
+
+
+def measure(fn, repeat: int = 5, rtt_ms: float = 0.0):
+    """Run fn repeat times; returns (statements per call, median ms per call)."""
+    timings = []
+    with CountingCursor(rtt_ms) as counter:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+    return counter.statements // repeat, statistics.median(timings)
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(v).rjust(w) for v, w in zip(row, widths)))
+
+
+# ── Seeding ───────────────────────────────────────────────────────────────────
+
+def seed_users(db):
+    db.execute_query(
+        "INSERT INTO admins (email, password_hash, full_name, email_verified, role) "
+        "VALUES ('admin@bench.edu', 'x', 'Admin', 1, 'admin')")
+    db.execute_query(
+        "INSERT INTO students (email, password_hash, full_name, email_verified) "
+        "VALUES ('student@bench.edu', 'x', 'Student', 1)")
+
+
+def seed_printers(db, count):
+    db.execute_many(
+        "INSERT INTO printers (printer_name, status) VALUES (%s, 'active')",
+        [(f'P{i:03d}',) for i in range(count)])
+    return [r['printer_id'] for r in db.fetch_all("SELECT printer_id FROM printers ORDER BY printer_id")]
+
+
+def seed_queue(db, printer_id, jobs, rank_gap=1 << 16):
+    """Give printer_id `jobs` queued jobs, each with its own approved request."""
+    first = (db.fetch_one("SELECT COALESCE(MAX(request_id), 0) AS m FROM print_requests") or {})['m'] or 0
+    db.execute_many(
+        "INSERT INTO print_requests (student_email, project_name, status, ufp_file_path, "
+        "ufp_print_time_minutes) VALUES ('student@bench.edu', %s, 'queued', 'x.ufp', 60)",
+        [(f'part {printer_id}-{j}',) for j in range(jobs)])
+    db.execute_many(
+        "INSERT INTO print_jobs (request_id, printer_id, queue_position, status, assigned_by) "
+        "VALUES (%s, %s, %s, 'queued', 'admin@bench.edu')",
+        [(first + j + 1, printer_id, (j + 1) * rank_gap) for j in range(jobs)])
+    return [r['job_id'] for r in db.fetch_all(
+        "SELECT job_id FROM print_jobs WHERE printer_id = %s ORDER BY queue_position", (printer_id,))]
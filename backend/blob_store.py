@@ -0,0 +1,118 @@
+"""
+Content-addressed upload blobs
+Uploads are stored in UPLOAD_FOLDER as '<sha256><ext>', so identical files
+share one blob and the name itself is the content key that print_requests
+columns (stl_file_path, ufp_file_path) point at. The `file_blobs` table
+(migration_020) tracks how many request columns reference each blob:
+
+    acquire(name)  — a request column now points at the blob
+    release(name)  — a request column stopped pointing at it
+
+Blob files are only removed by purge_unreferenced() (called from the daily
+cleanup job) once their refcount is zero and they have not been uploaded again
+for a grace period, so a fresh upload awaiting submission is never swept.
+
+Files saved before migration_020 keep their uuid names and have no row;
+release() returns False for them and callers delete them the old way.
+"""
+
+import os
+import re
+from typing import Optional
+
+from database import db
+from config import Config
+
+_BLOB_NAME_RE = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{1,8}$')
+_GRACE_HOURS  = 24
+
+
+def blob_name(sha256: str, ext: str) -> str:
+    return f"{sha256}{ext}"
+
+
+def is_blob_name(name: Optional[str]) -> bool:
+    return bool(name) and bool(_BLOB_NAME_RE.match(name))
+
+
+def register(sha256: str, ext: str, size: int) -> None:
+    """Record an uploaded blob (or refresh last_uploaded_at when it already exists)."""
+    db.execute_query(
+        "INSERT INTO file_blobs (blob_key, sha256, ext, size_bytes, refcount, last_uploaded_at) "
+        "VALUES (%s, %s, %s, %s, 0, NOW()) "
+        "ON DUPLICATE KEY UPDATE last_uploaded_at = NOW()",
+        (blob_name(sha256, ext), sha256, ext, size)
+    )
+
+
+def acquire(name: Optional[str]) -> None:
+    """Add a reference from a print_requests column to `name`."""
+    if is_blob_name(name):
+        db.execute_update(
+            "UPDATE file_blobs SET refcount = refcount + 1 WHERE blob_key = %s",
+            (name,)
+        )
+
+
+def release(name: Optional[str]) -> bool:
+    """Drop a reference to `name`. Returns False if it is not a tracked blob."""
+    if not is_blob_name(name):
+        return False
+    db.execute_update(
+        "UPDATE file_blobs SET refcount = GREATEST(refcount - 1, 0) WHERE blob_key = %s",
+        (name,)
+    )
+    # rowcount can't tell "unchanged" from "missing", so check for the row itself
+    return is_tracked(name)
+
+
+def is_tracked(name: Optional[str]) -> bool:
+    return is_blob_name(name) and db.fetch_one(
+        "SELECT 1 AS found FROM file_blobs WHERE blob_key = %s", (name,)
+    ) is not None
+
+
+def replace(old_name: Optional[str], new_name: Optional[str]) -> None:
+    """Move a column's reference from old_name to new_name; removes an untracked old file."""
+    if old_name == new_name:
+        return
+    acquire(new_name)
+    if old_name and not release(old_name):
+        remove_legacy_file(old_name)
+
+
+def remove_legacy_file(name: str) -> None:
+    """Delete a pre-content-addressing upload that no other request can share."""
+    path = os.path.join(Config.UPLOAD_FOLDER, os.path.basename(name))
+    try:
+        if os.path.isfile(path):
+            os.remove(path)
+    except OSError as e:
+        print(f"Warning: could not delete file {path}: {e}")
+
+
+def purge_unreferenced(grace_hours: int = _GRACE_HOURS) -> int:
+    """Delete blobs whose refcount is zero and that were last uploaded > grace_hours ago."""
+    rows = db.fetch_all(
+        "SELECT blob_key FROM file_blobs "
+        "WHERE refcount = 0 AND last_uploaded_at < DATE_SUB(NOW(), INTERVAL %s HOUR)",
+        (grace_hours,)
+    ) or []
+    purged = 0
+    for row in rows:
+        # Re-check under the delete so a concurrent acquire() wins
+        deleted = db.execute_update(
+            "DELETE FROM file_blobs WHERE blob_key = %s AND refcount = 0 "
+            "AND last_uploaded_at < DATE_SUB(NOW(), INTERVAL %s HOUR)",
+            (row['blob_key'], grace_hours)
+        )
+        if not deleted or deleted < 1:
+            continue
+        path = os.path.join(Config.UPLOAD_FOLDER, row['blob_key'])
+        try:
+            if os.path.isfile(path):
+                os.remove(path)
+        except OSError as e:
+            print(f"[cleanup] Could not delete blob {path}: {e}")
+        purged += 1
+    return purged
@@ -0,0 +1,81 @@
+"""
+In-process change bus
+Mutation paths publish a small event whenever print_jobs / print_requests rows
+change. Readers (the /api/admin/stream SSE endpoint, cached snapshots) compare
+the monotonic version number to decide whether anything needs re-querying.
+
+The bus lives in process memory — it relies on the app running as a single
+gunicorn worker (see Procfile). EPOCH changes on every restart so clients can
+tell a resumed version number apart from one issued by a previous process.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+_HISTORY_SIZE = 256   # recent events kept for resuming clients
+
+EPOCH = format(int(time.time()), 'x')
+
+
+class ChangeBus:
+    """Monotonic version counter + bounded event history + wake-up condition."""
+
+    def __init__(self, history_size: int = _HISTORY_SIZE):
+        self._cond    = threading.Condition()
+        self._version = 0
+        self._events  = deque(maxlen=history_size)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def publish(self, kind: str, **data) -> int:
+        """Record a change and wake every waiting reader. Returns the new version."""
+        with self._cond:
+            self._version += 1
+            self._events.append({'version': self._version, 'kind': kind, **data})
+            self._cond.notify_all()
+            return self._version
+
+    def events_since(self, version: int) -> Tuple[List[Dict], bool]:
+        """Return (events newer than version, complete).
+
+        complete is False when the history no longer reaches back to version,
+        i.e. the caller missed events and should resync from a full snapshot.
+        """
+        with self._cond:
+            events = [e for e in self._events if e['version'] > version]
+            if version > self._version:
+                return [], False
+            oldest = self._events[0]['version'] if self._events else self._version + 1
+            return events, oldest <= version + 1 or version == self._version
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Block until the version moves past `version` or timeout elapses."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > version, timeout)
+            return self._version
+
+
+def format_event_id(version: int) -> str:
+    """SSE event id: '<epoch>:<version>'."""
+    return f"{EPOCH}:{version}"
+
+
+def parse_event_id(event_id: Optional[str]) -> Optional[int]:
+    """Return the version from an event id issued by this process, else None."""
+    if not event_id or ':' not in event_id:
+        return None
+    epoch, _, version = event_id.partition(':')
+    if epoch != EPOCH:
+        return None
+    try:
+        return int(version)
+    except ValueError:
+        return None
+
+
+# Single global instance
+change_bus = ChangeBus()
@@ -4,12 +4,22 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
-    # Database
+    # Database — DB_BACKEND 'sqlite' runs on a local SQLite file (SQLITE_PATH,
+    # or ':memory:') instead of MySQL, for offline runs and benchmarks
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', ':memory:')
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_PORT = int(os.getenv('DB_PORT', '3306') or '3306')
     DB_USER = os.getenv('DB_USER', 'dgspace_user')
     DB_PASSWORD = os.getenv('DB_PASSWORD')
     DB_NAME = os.getenv('DB_NAME', 'DGSpace')
+    # Connections in the pool: each in-flight request pins one (see database.py),
+    # so keep this above the gunicorn thread count plus background workers
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '20') or '20')
+    # Extra connections opened under bursts (closed again when returned), and how
+    # long a checkout waits for a free connection before the request gets a 503
+    DB_POOL_OVERFLOW = int(os.getenv('DB_POOL_OVERFLOW', '10') or '10')
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10') or '10')
     
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
@@ -21,6 +31,10 @@ class Config:
     GMAIL_REFRESH_TOKEN = os.getenv('GMAIL_REFRESH_TOKEN')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER')
 
+    # Outbound email queue: 'gmail' (default) or 'fake' (keeps mail in memory, for local dev)
+    EMAIL_TRANSPORT = os.getenv('EMAIL_TRANSPORT', 'gmail')
+    EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+
     # Verification
     VERIFICATION_CODE_EXPIRATION_MINUTES = 15
 
@@ -30,12 +44,43 @@ class Config:
     # Server
     PORT = int(os.getenv('PORT', '5000') or '5000')
 
+    # Seconds the student-facing /api/printers/status snapshot is reused before re-querying
+    PRINTER_STATUS_CACHE_SECONDS = float(os.getenv('PRINTER_STATUS_CACHE_SECONDS', '5') or '5')
+
+    # Request list endpoints: largest ?limit= page, and how long a page's cached
+    # 'total' may be reused when no request changed in-app
+    REQUEST_LIST_MAX_LIMIT = 200
+    REQUEST_COUNT_CACHE_SECONDS = float(os.getenv('REQUEST_COUNT_CACHE_SECONDS', '60') or '60')
+
+    # Live production board stream (/api/admin/stream). Each open stream holds a
+    # gunicorn thread, so streams are capped and end after SSE_MAX_STREAM_SECONDS
+    # (the browser reconnects automatically). Set SSE_ENABLED=False to force polling.
+    SSE_ENABLED = os.getenv('SSE_ENABLED', 'True') == 'True'
+    SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', '8') or '8')
+    SSE_MAX_STREAM_SECONDS = 240
+
+    # Background file analysis (analysis_jobs). Parsers run in a process pool so a
+    # slow or crashing archive can't stall the single gunicorn worker.
+    ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2') or '2')
+    ANALYSIS_JOB_TIMEOUT_SECONDS = int(os.getenv('ANALYSIS_JOB_TIMEOUT_SECONDS', '120') or '120')
+    ANALYSIS_MEMORY_LIMIT_MB = int(os.getenv('ANALYSIS_MEMORY_LIMIT_MB', '1024') or '1024')
+    # DXF previews are rendered once per file (dxf_preview) — cap each render
+    DXF_PREVIEW_TIMEOUT_SECONDS = int(os.getenv('DXF_PREVIEW_TIMEOUT_SECONDS', '45') or '45')
+    DXF_PREVIEW_MAX_ENTITIES = int(os.getenv('DXF_PREVIEW_MAX_ENTITIES', '200000') or '200000')
+    # How long a list-view thumbnail request waits for a first-time extraction
+    THUMBNAIL_WAIT_SECONDS = 5
+
     # File uploads
     # On Railway, set UPLOAD_FOLDER env var to the volume mount path (e.g. /data)
     # Locally, falls back to backend/uploads/
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads'))
     MAX_UPLOAD_SIZE_MB = 50  # 50 MB limit for STL files
     ALLOWED_EXTENSIONS = {'stl'}
+    # How /api/uploads hands bytes to the client: '' = Flask streams the file,
+    # 'x-sendfile' = Apache/lighttpd X-Sendfile, 'x-accel' = nginx X-Accel-Redirect
+    # to an `internal` location at UPLOAD_ACCEL_PREFIX aliased to UPLOAD_FOLDER
+    UPLOAD_SENDFILE_MODE = os.getenv('UPLOAD_SENDFILE_MODE', '').strip().lower()
+    UPLOAD_ACCEL_PREFIX = os.getenv('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
 
     # Railway Cron Job secret — set CRON_SECRET env var in Railway dashboard
     CRON_SECRET = os.getenv('CRON_SECRET', '')
\ No newline at end of file
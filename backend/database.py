@@ -1,23 +1,35 @@
+import datetime
+import os
+import threading
+from contextlib import contextmanager
+
 import mysql.connector
-from mysql.connector import Error, pooling
+from flask import g, has_app_context
+from mysql.connector import Error
 from config import Config
+from db_pool import BlockingPool, PoolTimeout
 
 # ---------------------------------------------------------------------------
 # Connection-pool based Database helper
 #
-# Each public method borrows a connection from the pool, uses it, and returns
-# it immediately — so the pool is never exhausted and stale-connection errors
-# are handled transparently with one automatic retry.
+# Outside a request, each public method borrows a connection from the pool,
+# uses it, and returns it immediately — so background threads never hold one.
+# Inside a Flask request the first query pins a pooled connection to `g` and
+# every later query in that request reuses it; app.py returns it on teardown.
+# That saves a checkout + session reset per statement. Connections run in
+# autocommit mode, so a lone statement behaves exactly as before;
+# db.transaction() groups several into one atomic commit.
+# Stale-connection errors are retried once with a fresh connection.
+# When every connection is busy a checkout waits (db_pool.BlockingPool) and
+# raises PoolTimeout after Config.DB_POOL_TIMEOUT — app.py answers 503 — rather
+# than failing at once and looking like an empty result.
 # ---------------------------------------------------------------------------
 
-_POOL_SIZE = 5          # simultaneous connections kept open
 _POOL_NAME = "dgspace_pool"
+_STALE_ERRNOS = (2006, 2013, 2055)   # CR_SERVER_GONE / LOST / DISCONNECTED
 
-def _make_pool():
-    return pooling.MySQLConnectionPool(
-        pool_name=_POOL_NAME,
-        pool_size=_POOL_SIZE,
-        pool_reset_session=True,
+def _connect():
+    return mysql.connector.connect(
         host=Config.DB_HOST,
         port=Config.DB_PORT,
         user=Config.DB_USER,
@@ -26,18 +38,65 @@ def _make_pool():
         ssl_disabled=True,
         auth_plugin='mysql_native_password',
         connection_timeout=10,
+        autocommit=True,
+    )
+
+def _make_pool():
+    """Connection source for Config.DB_BACKEND: 'mysql', or 'sqlite' for local
+    runs without a database server (see sqlite_backend.py)."""
+    if Config.DB_BACKEND == 'sqlite':
+        import sqlite_backend
+        return sqlite_backend.make_pool(Config.SQLITE_PATH)
+    if Config.DB_BACKEND != 'mysql':
+        raise ValueError(f"Unknown DB_BACKEND {Config.DB_BACKEND!r}, expected 'mysql' or 'sqlite'")
+    return BlockingPool(
+        _connect,
+        size=Config.DB_POOL_SIZE,
+        overflow=Config.DB_POOL_OVERFLOW,
+        timeout=Config.DB_POOL_TIMEOUT,
+        name=_POOL_NAME,
     )
 
 _pool = None
+_pool_lock = threading.Lock()
 
 def _get_pool():
     global _pool
     if _pool is None:
-        _pool = _make_pool()
-        print(f"[OK] MySQL connection pool '{_POOL_NAME}' created (size={_POOL_SIZE})")
+        with _pool_lock:
+            if _pool is None:
+                _pool = _make_pool()
+                print(f"[OK] Database connection pool '{_pool.name}' created "
+                      f"(size={_pool.size}, overflow={_pool.overflow}, timeout={_pool.timeout:g}s)")
     return _pool
 
 
+# A forked child (gunicorn worker under --preload) must not reuse connections
+# opened by the parent: both processes would talk over the same socket. Drop
+# the parent's pool in the child without closing it — closing would send
+# COM_QUIT on the parent's connections — and keep a reference so the objects
+# are never garbage-collected (and closed) here either.
+_inherited_pools = []
+
+def _reset_pool_after_fork():
+    global _pool, _pool_lock
+    if _pool is not None:
+        _inherited_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+# Per-thread state for code running outside a request (background jobs)
+_local = threading.local()
+
+def _state():
+    """Where the current connection / transaction depth live: Flask g, else thread-local."""
+    return g if has_app_context() else _local
+
+
 class Database:
     """Thin wrapper around a MySQLConnectionPool.
 
@@ -64,18 +123,124 @@ class Database:
         pass   # pool manages its own connections
 
     # ------------------------------------------------------------------
-    # internal: borrow a connection, run fn(conn), return connection
-    # One automatic retry on OperationalError (e.g. stale pooled connection).
+    # Request pinning / transactions
+    # ------------------------------------------------------------------
+    def in_transaction(self):
+        return getattr(_state(), '_db_tx_depth', 0) > 0
+
+    def release_request_connection(self):
+        """Return the connection pinned to this request (app.py teardown)."""
+        st = _state()
+        conn = getattr(st, '_db_conn', None)
+        st._db_conn = None
+        st._db_tx_depth = 0
+        if conn is not None:
+            try:
+                conn.close()    # returns connection back to pool
+            except Exception:
+                pass
+
+    def pool_metrics(self):
+        """Connection pool counters (see db_pool.BlockingPool.metrics)."""
+        return _get_pool().metrics()
+
+    def disable_pinning(self):
+        """Stop pinning for the rest of this request (long-lived streams)."""
+        self.release_request_connection()
+        _state()._db_no_pin = True
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed db calls on one connection as a single transaction.
+
+            with db.transaction():
+                db.execute_query(...)
+                db.execute_query(...)
+
+        Commits when the block exits normally and rolls back if it raises.
+        Inside the block the helpers raise on SQL errors instead of returning
+        None / -1, so a failed statement aborts the whole unit. Nested blocks
+        join the outer transaction.
+        """
+        st = _state()
+        if getattr(st, '_db_tx_depth', 0):
+            st._db_tx_depth += 1
+            try:
+                yield self
+            finally:
+                st._db_tx_depth -= 1
+            return
+
+        pinned = getattr(st, '_db_conn', None) is not None or self._can_pin(st)
+        conn = self._connection(st)
+        try:
+            conn.start_transaction()
+        except Error as e:
+            if e.errno not in _STALE_ERRNOS:
+                raise
+            conn = self._replace_connection(st, conn)
+            conn.start_transaction()
+        st._db_tx_depth = 1
+        try:
+            yield self
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            st._db_tx_depth = 0
+            if not pinned:
+                # Outside a request: the connection was borrowed for this block only
+                st._db_conn = None
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def _can_pin(self, st):
+        return has_app_context() and not getattr(st, '_db_no_pin', False)
+
+    def _connection(self, st):
+        """The pinned / transaction connection, checking one out if needed."""
+        conn = getattr(st, '_db_conn', None)
+        if conn is None:
+            conn = _get_pool().get_connection()
+            st._db_conn = conn
+        return conn
+
+    def _replace_connection(self, st, conn):
+        conn.discard()
+        st._db_conn = None
+        return self._connection(st)
+
+    # ------------------------------------------------------------------
+    # internal: run fn(conn) on the pinned / transaction connection, or on
+    # one borrowed just for this call. One automatic retry on a stale
+    # pooled connection (never inside a transaction — earlier statements
+    # of the unit would be lost).
     # ------------------------------------------------------------------
     def _run(self, fn):
+        st = _state()
+        if getattr(st, '_db_conn', None) is not None or self._can_pin(st):
+            conn = self._connection(st)
+            try:
+                return fn(conn)
+            except Error as e:
+                if e.errno in _STALE_ERRNOS and not self.in_transaction():
+                    return fn(self._replace_connection(st, conn))
+                raise
+
         pool = _get_pool()
         conn = pool.get_connection()
         try:
             return fn(conn)
         except Error as e:
             # If the pooled connection was stale, retry once with a fresh one
-            if e.errno in (2006, 2013, 2055):   # CR_SERVER_GONE / LOST / DISCONNECTED
-                conn.close()
+            if e.errno in _STALE_ERRNOS:
+                conn.discard()
                 conn = pool.get_connection()
                 return fn(conn)
             raise
@@ -85,6 +250,16 @@ class Database:
             except Exception:
                 pass
 
+    def _call(self, fn, default, label):
+        try:
+            return self._run(fn)
+        except Exception as e:
+            # Pool timeouts propagate: a busy server is not an empty result
+            if self.in_transaction() or isinstance(e, PoolTimeout):
+                raise
+            print(f"[ERROR] {label}: {e}")
+            return default
+
     # ------------------------------------------------------------------
     # Public API (unchanged signatures)
     # ------------------------------------------------------------------
@@ -94,19 +269,10 @@ class Database:
             cursor = conn.cursor()
             try:
                 cursor.execute(query, params or ())
-                conn.commit()
                 return cursor.lastrowid
-            except Error as e:
-                conn.rollback()
-                print(f"[ERROR] execute_query: {e}")
-                return None
             finally:
                 cursor.close()
-        try:
-            return self._run(_fn)
-        except Exception as e:
-            print(f"[ERROR] execute_query (pool): {e}")
-            return None
+        return self._call(_fn, None, 'execute_query')
 
     def execute_update(self, query, params=None):
         """Execute UPDATE / DELETE. Returns number of affected rows, or -1 on error."""
@@ -114,37 +280,67 @@ class Database:
             cursor = conn.cursor()
             try:
                 cursor.execute(query, params or ())
-                conn.commit()
                 return cursor.rowcount
-            except Error as e:
-                conn.rollback()
-                print(f"[ERROR] execute_update: {e}")
-                return -1
             finally:
                 cursor.close()
-        try:
-            return self._run(_fn)
-        except Exception as e:
-            print(f"[ERROR] execute_update (pool): {e}")
-            return -1
+        return self._call(_fn, -1, 'execute_update')
+
+    def execute_many(self, query, seq_params):
+        """Execute one statement for each params tuple on a single connection.
+        Returns total affected rows, or -1 on error. Multi-row INSERTs are
+        batched into one statement by the connector."""
+        seq_params = list(seq_params)
+        if not seq_params:
+            return 0
+        def _fn(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(query, seq_params)
+                return cursor.rowcount
+            finally:
+                cursor.close()
+        return self._call(_fn, -1, 'execute_many')
+
+    def update_case(self, table, key_column, rows, columns, where='', where_params=()):
+        """Update many rows with different values in one statement.
+
+            db.update_case('print_jobs', 'job_id',
+                           [{'job_id': 7, 'queue_position': 1}, ...],
+                           ['queue_position'], 'printer_id = %s', (3,))
+
+        becomes UPDATE print_jobs SET queue_position = CASE job_id WHEN %s THEN
+        %s ... ELSE queue_position END WHERE job_id IN (...) AND printer_id = %s.
+        table / column names are interpolated and must come from code, never
+        from the request. Returns affected rows, or -1 on error.
+        """
+        if not rows:
+            return 0
+        sets, params = [], []
+        for column in columns:
+            whens = ' '.join(['WHEN %s THEN %s'] * len(rows))
+            sets.append(f"{column} = CASE {key_column} {whens} ELSE {column} END")
+            for row in rows:
+                params.extend((row[key_column], row[column]))
+        keys = [row[key_column] for row in rows]
+        query = (f"UPDATE {table} SET {', '.join(sets)} "
+                 f"WHERE {key_column} IN ({', '.join(['%s'] * len(keys))})")
+        params.extend(keys)
+        if where:
+            query += f" AND {where}"
+            params.extend(where_params)
+        return self.execute_update(query, tuple(params))
 
     def fetch_one(self, query, params=None):
         """Fetch a single row as dict, or None."""
         def _fn(conn):
-            cursor = conn.cursor(dictionary=True)
+            # buffered: leftover rows would block the next query on a pinned connection
+            cursor = conn.cursor(dictionary=True, buffered=True)
             try:
                 cursor.execute(query, params or ())
                 return cursor.fetchone()
-            except Error as e:
-                print(f"[ERROR] fetch_one: {e}")
-                return None
             finally:
                 cursor.close()
-        try:
-            return self._run(_fn)
-        except Exception as e:
-            print(f"[ERROR] fetch_one (pool): {e}")
-            return None
+        return self._call(_fn, None, 'fetch_one')
 
     def fetch_all(self, query, params=None):
         """Fetch all rows as list of dicts, or None."""
@@ -153,17 +349,31 @@ class Database:
             try:
                 cursor.execute(query, params or ())
                 return cursor.fetchall()
-            except Error as e:
-                print(f"[ERROR] fetch_all: {e}")
-                return None
             finally:
                 cursor.close()
-        try:
-            return self._run(_fn)
-        except Exception as e:
-            print(f"[ERROR] fetch_all (pool): {e}")
-            return None
+        return self._call(_fn, None, 'fetch_all')
 
 
 # Single global instance — usage is identical to before
 db = Database()
+
+
+def day_range(column, from_date, to_date):
+    """WHERE fragment + params selecting whole days from_date..to_date (inclusive).
+
+    Emits a half-open timestamp range (column >= start AND column < day after
+    to_date) rather than DATE(column) BETWEEN ..., so MySQL can use an index
+    on the column. Dates are 'YYYY-MM-DD' strings or date objects; a malformed
+    string raises ValueError.
+    """
+    def _as_date(value):
+        if isinstance(value, datetime.date):
+            return value
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+    start = datetime.datetime.combine(_as_date(from_date), datetime.time())
+    end   = datetime.datetime.combine(_as_date(to_date), datetime.time()) + datetime.timedelta(days=1)
+    return f"{column} >= %s AND {column} < %s", (start, end)
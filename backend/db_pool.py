@@ -0,0 +1,179 @@
+"""
+Blocking MySQL connection pool
+mysql-connector's MySQLConnectionPool raises PoolError the moment every
+connection is checked out, so a burst of requests got errors (surfacing as
+empty results) instead of waiting a few milliseconds for a connection to come
+back. BlockingPool keeps up to `size` idle connections, opens up to `overflow`
+extra ones under load (closed when returned to an already full idle set), and
+beyond that makes callers wait up to `timeout` seconds before raising
+PoolTimeout.
+
+metrics() reports active / idle counts, a checkout wait-time histogram, the
+number of checkouts that found the pool exhausted, timeouts and stale
+connections replaced (errno 2006 / 2013 / 2055, see Database._run).
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last is open-ended
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class PooledConnection:
+    """A checked-out connection. close() hands it back to the pool; every
+    other attribute is the underlying MySQLConnection's."""
+
+    def __init__(self, pool, cnx):
+        self._pool = pool
+        self._cnx  = cnx
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+    def close(self):
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool._release(cnx)
+
+    def discard(self):
+        """Close the underlying connection instead of returning it (it went stale)."""
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool._drop(cnx, stale=True)
+
+
+class BlockingPool:
+    """Fixed-size pool with bounded overflow and a bounded wait for a free slot."""
+
+    def __init__(self, connect: Callable, size: int, overflow: int = 0,
+                 timeout: float = 10.0, name: str = 'pool'):
+        self.name     = name
+        self.size     = size
+        self.overflow = overflow
+        self.timeout  = timeout
+        self._connect = connect
+        self._cond    = threading.Condition()
+        self._idle    = deque()     # open connections waiting to be reused
+        self._open    = 0           # connections open, idle or checked out
+        self._waiting = 0
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._checkouts       = 0
+        self._wait_total_ms   = 0.0
+        self._wait_max_ms     = 0.0
+        self._exhausted       = 0
+        self._timeouts        = 0
+        self._stale_reconnects = 0
+
+    def get_connection(self, timeout: float = None) -> PooledConnection:
+        """Check out a connection, waiting up to timeout (default: pool timeout)."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._cond:
+            if not self._idle and self._open >= self.size + self.overflow:
+                self._exhausted += 1
+            self._waiting += 1
+            try:
+                while not self._idle and self._open >= self.size + self.overflow:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"No database connection free after {timeout:g}s "
+                            f"({self._open} open, {self._waiting} waiting)")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            cnx = self._idle.popleft() if self._idle else None
+            if cnx is None:
+                self._open += 1     # reserve the slot before connecting outside the lock
+
+        if cnx is None:
+            try:
+                cnx = self._connect()
+            except BaseException:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+        self._record_wait((time.monotonic() - started) * 1000)
+        return PooledConnection(self, cnx)
+
+    def metrics(self) -> Dict:
+        with self._cond:
+            idle = len(self._idle)
+            checkouts = self._checkouts
+            return {
+                'name':             self.name,
+                'size':             self.size,
+                'overflow':         self.overflow,
+                'timeout_seconds':  self.timeout,
+                'open':             self._open,
+                'active':           self._open - idle,
+                'idle':             idle,
+                'waiting':          self._waiting,
+                'checkouts':        checkouts,
+                'wait_ms_avg':      round(self._wait_total_ms / checkouts, 3) if checkouts else 0.0,
+                'wait_ms_max':      round(self._wait_max_ms, 3),
+                'wait_ms_histogram': {
+                    **{f'le_{b}': n for b, n in zip(WAIT_BUCKETS_MS, self._buckets)},
+                    f'gt_{WAIT_BUCKETS_MS[-1]}': self._buckets[-1],
+                },
+                'exhausted':        self._exhausted,
+                'timeouts':         self._timeouts,
+                'stale_reconnects': self._stale_reconnects,
+            }
+
+    # ------------------------------------------------------------------
+    # internal
+    # ------------------------------------------------------------------
+    def _record_wait(self, wait_ms: float):
+        bucket = next((i for i, b in enumerate(WAIT_BUCKETS_MS) if wait_ms <= b),
+                      len(WAIT_BUCKETS_MS))
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total_ms += wait_ms
+            self._wait_max_ms = max(self._wait_max_ms, wait_ms)
+            self._buckets[bucket] += 1
+
+    def _release(self, cnx):
+        try:
+            # Same as pool_reset_session: clear session state, re-apply autocommit.
+            # Done before taking the lock; a connection that fails it is dropped.
+            cnx.reset_session()
+        except Exception:
+            self._drop(cnx)
+            return
+        with self._cond:
+            # Decide and append in one critical section so concurrent releases
+            # can never grow the idle set past size; overflow beyond it is closed
+            keep = len(self._idle) < self.size
+            if keep:
+                self._idle.append(cnx)
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not keep:
+            self._close_quietly(cnx)
+
+    def _drop(self, cnx, stale: bool = False):
+        self._close_quietly(cnx)
+        with self._cond:
+            self._open -= 1
+            if stale:
+                self._stale_reconnects += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(cnx):
+        try:
+            cnx.close()
+        except Exception:
+            pass
@@ -0,0 +1,71 @@
+"""
+Files rendered next to an upload
+The DXF preview, the STL viewer mesh and the slicer thumbnails are each stored
+beside the upload they were rendered from, as
+
+    '<stored name>.<tag>-v<version><part><ext>'     e.g. 'x.stl.mesh-v1.lod0.bin.gz'
+    '<stored name>.<tag>.failed'                    a failed render
+
+DerivedFiles holds that naming for one renderer, so the cleanup job can tell
+current outputs from ones a version bump left behind, and keeps the failure
+markers: a failed render is not retried for _FAILED_TTL_SECONDS, so every
+viewer of a file that cannot render doesn't start a new job.
+"""
+
+import os
+import re
+import time
+import uuid
+from typing import Optional
+
+_FAILED_TTL_SECONDS = 3600
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    # Readers only ever see a complete file: write aside, then rename over.
+    # The '.upload-' prefix lets the cleanup job sweep it if we die mid-write.
+    tmp = os.path.join(os.path.dirname(path), f'.upload-{uuid.uuid4().hex}.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class DerivedFiles:
+    """Names and failure markers of one renderer's output files."""
+
+    def __init__(self, tag: str, version: int, ext: str, failure_message: str):
+        self.tag = tag
+        self.version = version
+        self.ext = ext
+        self.failure_message = failure_message
+        self._failed_suffix = f'.{tag}.failed'
+        self._current = re.compile(rf'\.{re.escape(tag)}-v{version}[.-]')
+
+    def path(self, file_path: str, part: str = '') -> str:
+        return f'{file_path}.{self.tag}-v{self.version}{part}{self.ext}'
+
+    def is_derived_file(self, name: str) -> bool:
+        """True for any output or failure marker, whatever its version."""
+        return (name.endswith(self._failed_suffix)
+                or (f'.{self.tag}-v' in name and name.endswith(self.ext)))
+
+    def source_of(self, name: str) -> str:
+        """Upload name an output/marker file belongs to."""
+        return name.split(f'.{self.tag}', 1)[0]
+
+    def is_current(self, name: str) -> bool:
+        return name.endswith(self._failed_suffix) or bool(self._current.search(name))
+
+    def recent_failure(self, file_path: str) -> Optional[str]:
+        """Message of a render failure within _FAILED_TTL_SECONDS, if any."""
+        marker = file_path + self._failed_suffix
+        try:
+            if time.time() - os.path.getmtime(marker) > _FAILED_TTL_SECONDS:
+                return None
+            with open(marker, 'r', encoding='utf-8') as f:
+                return f.read() or self.failure_message
+        except OSError:
+            return None
+
+    def mark_failed(self, file_path: str, message: str) -> None:
+        write_atomic(file_path + self._failed_suffix, message.encode('utf-8'))
@@ -0,0 +1,92 @@
+"""
+DXF → SVG preview rendering
+Renders a laser-cut design with ezdxf's SVG backend for the request detail page.
+Runs in an analysis worker process (see analysis_worker.PARSERS).
+
+The SVG is rendered once per file and stored gzip-compressed next to the
+upload as '<stored name>.preview-v<PREVIEW_VERSION>.svg.gz'; preview_design
+serves that file directly. Bumping PREVIEW_VERSION re-renders on next view and
+lets the cleanup job sweep the old files. A failed render leaves a short-lived
+'.preview.failed' marker (see derived_files).
+"""
+
+import gzip
+import os
+from typing import Any, Dict, Optional
+
+from derived_files import DerivedFiles, write_atomic
+
+PREVIEW_VERSION = 1
+
+_files = DerivedFiles('preview', PREVIEW_VERSION, '.svg.gz', 'DXF preview failed')
+
+is_derived_file = _files.is_derived_file
+source_of       = _files.source_of
+is_current      = _files.is_current
+recent_failure  = _files.recent_failure
+mark_failed     = _files.mark_failed
+
+
+def preview_path(file_path: str) -> str:
+    return _files.path(file_path)
+
+
+def build_preview(file_path: str, max_entities: Optional[int] = None) -> Dict[str, Any]:
+    """Render `file_path` and store the gzipped SVG. Returns {'success', 'preview', 'bytes'}."""
+    out = preview_path(file_path)
+    if os.path.exists(out):
+        return {'success': True, 'preview': out, 'bytes': os.path.getsize(out)}
+    result = render_dxf_svg(file_path, max_entities)
+    if not result['success']:
+        return result
+    # mtime=0 keeps the bytes (and so the ETag) identical across re-renders
+    data = gzip.compress(result['svg'].encode('utf-8'), compresslevel=6, mtime=0)
+    write_atomic(out, data)
+    return {'success': True, 'preview': out, 'bytes': len(data)}
+
+
+def render_dxf_svg(file_path: str, max_entities: Optional[int] = None) -> Dict[str, Any]:
+    """Return {'success': True, 'svg': str} or {'success': False, 'message': str}."""
+    try:
+        import ezdxf
+        from ezdxf.addons.drawing import RenderContext, Frontend
+        from ezdxf.addons.drawing.svg import SVGBackend
+
+        doc = ezdxf.readfile(file_path)
+        msp = doc.modelspace()
+
+        if max_entities:
+            # Block definitions count too: one INSERT can expand into thousands of entities
+            entities = len(msp) + sum(len(block) for block in doc.blocks)
+            if entities > max_entities:
+                return {
+                    'success': False,
+                    'message': f'DXF preview skipped: {entities} entities exceeds the limit of {max_entities}',
+                }
+
+        ctx = RenderContext(doc)
+
+        # Suppress font errors (no system fonts on Railway)
+        config = None
+        try:
+            from ezdxf.addons.drawing.config import Configuration, TextPolicy
+            for policy_name in ('IGNORE', 'SUBSTITUTE', 'REPLACE', 'FILLING'):
+                policy = getattr(TextPolicy, policy_name, None)
+                if policy is not None:
+                    config = Configuration.defaults().with_changes(text_policy=policy)
+                    break
+        except Exception:
+            pass
+
+        backend = SVGBackend()
+        frontend = Frontend(ctx, backend, config=config) if config else Frontend(ctx, backend)
+
+        # draw_layout renders geometry and calls backend.finalize() (finalize=True by default)
+        frontend.draw_layout(msp)
+
+        # Page(width_mm, height_mm) — A3 landscape, Settings go to get_string separately
+        from ezdxf.addons.drawing.layout import Page, Settings
+        page = Page(420, 297)
+        return {'success': True, 'svg': backend.get_string(page, settings=Settings(fit_page=True))}
+    except Exception as exc:
+        return {'success': False, 'message': f'DXF preview failed: {exc}'}
@@ -0,0 +1,204 @@
+"""
+Outbound email queue
+Notification emails are handed to enqueue(), which writes the message to the
+`email_outbox` table (migration_019) — one INSERT, no network call — and wakes
+a daemon worker thread. The worker only drains that table: it delivers due rows
+through a pluggable transport and retries failures with exponential backoff,
+so a message survives a restart as soon as enqueue() returns. If the INSERT
+itself fails (database down, pool exhausted) the message is held in memory
+and the worker keeps trying to persist it.
+
+Transports are any object with send(to_email, subject, html_body) -> message id;
+see GmailApiTransport / FakeTransport in email_service.py. A transport may also
+offer send_batch([(to, subject, html), ...]) -> [message id or exception, ...]
+to deliver everything due in one pass over a single connection.
+"""
+
+import os
+import queue
+import random
+import threading
+
+from database import db
+from config import Config
+
+_BATCH_SIZE          = 20     # due rows claimed per worker pass
+_IDLE_POLL_SECONDS   = 30     # how often the DB is re-checked when nothing is enqueued
+_BACKOFF_BASE_SECONDS = 30
+_BACKOFF_MAX_SECONDS  = 3600
+_STALE_SENDING_MINUTES = 10   # 'sending' rows older than this were orphaned by a crash
+
+
+def backoff_seconds(attempts: int) -> int:
+    """Delay before retry number `attempts` (1-based): 30s, 60s, 120s … capped at 1h, ±10 % jitter."""
+    delay = min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return int(delay * random.uniform(0.9, 1.1))
+
+
+class EmailOutbox:
+    """Persisted email_outbox table plus the worker thread that drains it."""
+
+    def __init__(self):
+        self._wake      = threading.Event()
+        self._unsaved   = queue.Queue()   # messages whose INSERT failed, retried by the worker
+        self._transport = None
+        self._thread    = None
+        self._pid       = None
+        self._lock      = threading.Lock()
+
+    def set_transport(self, transport):
+        self._transport = transport
+
+    def enqueue(self, to_email: str, subject: str, html_body: str) -> None:
+        """Persist a message for background delivery. Never waits on the mail server."""
+        item = (to_email, subject, html_body)
+        if not self._persist(item):
+            self._unsaved.put(item)
+        self._ensure_worker()
+        self._wake.set()
+
+    def start(self, transport=None):
+        """Start the worker in this process (also drains rows left from a previous run)."""
+        if transport is not None:
+            self._transport = transport
+        self._ensure_worker()
+        self._wake.set()
+
+    # ------------------------------------------------------------------
+    # internal
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        # Threads don't survive fork: app.start_background_services() starts
+        # the worker after gunicorn forks, and enqueue() restarts it in
+        # whichever process it finds without one.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(_IDLE_POLL_SECONDS)
+            self._wake.clear()
+            # Any error (incl. PoolTimeout) only skips this pass; the loop must survive
+            try:
+                self._requeue_stale()
+                self._persist_unsaved()
+                self._deliver_due()
+            except Exception as e:
+                print(f"[EMAIL] Outbox worker error: {e}")
+
+    def _requeue_stale(self):
+        # Rows left in 'sending' by a crash mid-delivery go back to pending
+        db.execute_update(
+            "UPDATE email_outbox SET status = 'pending' "
+            "WHERE status = 'sending' AND updated_at < DATE_SUB(NOW(), INTERVAL %s MINUTE)",
+            (_STALE_SENDING_MINUTES,)
+        )
+
+    def _persist(self, item) -> bool:
+        to_email, subject, html_body = item
+        try:
+            outbox_id = db.execute_query(
+                "INSERT INTO email_outbox (to_email, subject, html_body, status, attempts, next_attempt_at) "
+                "VALUES (%s, %s, %s, 'pending', 0, NOW())",
+                (to_email, subject, html_body)
+            )
+        except Exception as e:
+            print(f"[EMAIL] Could not persist outbox message to {to_email}: {e}")
+            return False
+        if outbox_id is None:
+            print(f"[EMAIL] Could not persist outbox message to {to_email}; will retry")
+            return False
+        return True
+
+    def _persist_unsaved(self):
+        pending = []
+        while True:
+            try:
+                pending.append(self._unsaved.get_nowait())
+            except queue.Empty:
+                break
+        for i, item in enumerate(pending):
+            if not self._persist(item):
+                # Keep this and everything after it for the next pass
+                for rest in pending[i:]:
+                    self._unsaved.put(rest)
+                return
+
+    def _deliver_due(self):
+        rows = db.fetch_all(
+            "SELECT outbox_id, to_email, subject, html_body, attempts FROM email_outbox "
+            "WHERE status = 'pending' AND next_attempt_at <= NOW() "
+            "ORDER BY next_attempt_at ASC LIMIT %s",
+            (_BATCH_SIZE,)
+        ) or []
+        # Atomically claim each row so a second process never double-sends it
+        claimed_rows = []
+        for row in rows:
+            claimed = db.execute_update(
+                "UPDATE email_outbox SET status = 'sending' WHERE outbox_id = %s AND status = 'pending'",
+                (row['outbox_id'],)
+            )
+            if claimed and claimed > 0:
+                claimed_rows.append(row)
+        if not claimed_rows:
+            return
+
+        transport = self._transport_or_default()
+        messages = [(r['to_email'], r['subject'], r['html_body']) for r in claimed_rows]
+        if len(messages) > 1 and hasattr(transport, 'send_batch'):
+            try:
+                results = transport.send_batch(messages)
+            except Exception as e:
+                results = [e] * len(messages)
+        else:
+            results = []
+            for message in messages:
+                try:
+                    results.append(transport.send(*message))
+                except Exception as e:
+                    results.append(e)
+
+        for row, result in zip(claimed_rows, results):
+            attempts = (row['attempts'] or 0) + 1
+            if isinstance(result, Exception):
+                self._record_failure(row['outbox_id'], attempts, result)
+                continue
+            msg_id = result
+            db.execute_update(
+                "UPDATE email_outbox SET status = 'sent', attempts = %s, sent_at = NOW(), "
+                "message_id = %s, last_error = NULL WHERE outbox_id = %s",
+                (attempts, msg_id, row['outbox_id'])
+            )
+            print(f"[EMAIL] Outbox message {row['outbox_id']} sent to {row['to_email']}, id={msg_id}")
+
+    def _record_failure(self, outbox_id, attempts, error):
+        if attempts >= Config.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            db.execute_update(
+                "UPDATE email_outbox SET status = 'failed', attempts = %s, last_error = %s WHERE outbox_id = %s",
+                (attempts, str(error)[:1000], outbox_id)
+            )
+            print(f"[ERROR] Outbox message {outbox_id} failed permanently after {attempts} attempts: {error}")
+            return
+        delay = backoff_seconds(attempts)
+        db.execute_update(
+            "UPDATE email_outbox SET status = 'pending', attempts = %s, last_error = %s, "
+            "next_attempt_at = DATE_ADD(NOW(), INTERVAL %s SECOND) WHERE outbox_id = %s",
+            (attempts, str(error)[:1000], delay, outbox_id)
+        )
+        print(f"[EMAIL] Outbox message {outbox_id} attempt {attempts} failed, retrying in {delay}s: {error}")
+
+    def _transport_or_default(self):
+        if self._transport is None:
+            from email_service import get_transport
+            self._transport = get_transport()
+        return self._transport
+
+
+# Single global instance
+outbox = EmailOutbox()
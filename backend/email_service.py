@@ -1,15 +1,112 @@
 import os
 import json
+import time
 import base64
+import threading
+import http.client
 import urllib.parse
-import urllib.request
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from config import Config
+from email_outbox import outbox
 
 
-def _get_access_token():
-    """Exchange refresh token for a short-lived access token via OAuth2."""
+_OAUTH_HOST = "oauth2.googleapis.com"
+_GMAIL_HOST = "gmail.googleapis.com"
+_GMAIL_SEND_PATH = "/gmail/v1/users/me/messages/send"
+
+
+class GmailApiError(RuntimeError):
+    """Non-2xx response from a Google API endpoint."""
+
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:500]}")
+        self.status = status
+
+
+class _HttpsConnectionPool:
+    """Keep-alive HTTPS connections per host, reused across API calls.
+
+    Each request checks a connection out, so concurrent senders never share
+    one; idle connections beyond `max_idle` per host are closed.
+    """
+
+    def __init__(self, max_idle=4, timeout=30):
+        self._idle     = {}
+        self._lock     = threading.Lock()
+        self._max_idle = max_idle
+        self._timeout  = timeout
+        self.opened    = 0
+        self.reused    = 0
+
+    def checkout(self, host):
+        with self._lock:
+            conns = self._idle.get(host)
+            if conns:
+                self.reused += 1
+                return conns.pop(), True
+            self.opened += 1
+        return http.client.HTTPSConnection(host, timeout=self._timeout), False
+
+    def checkin(self, host, conn):
+        with self._lock:
+            conns = self._idle.setdefault(host, [])
+            if len(conns) < self._max_idle:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def request(self, host, method, path, body=None, headers=None, conn=None):
+        """Send one request and return (status, body bytes).
+
+        Pass `conn` to issue several requests on a connection the caller has
+        checked out itself; otherwise one is borrowed and returned here.
+        """
+        own = conn is None
+        reused = True
+        if own:
+            conn, reused = self.checkout(host)
+        try:
+            try:
+                status, data = self._roundtrip(conn, method, path, body, headers)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Server closed an idle keep-alive connection; reconnect once
+                if not reused:
+                    raise
+                conn.close()
+                status, data = self._roundtrip(conn, method, path, body, headers)
+        except Exception:
+            conn.close()
+            raise
+        if own:
+            self.checkin(host, conn)
+        return status, data
+
+    @staticmethod
+    def _roundtrip(conn, method, path, body, headers):
+        conn.request(method, path, body=body, headers=headers or {})
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def stats(self):
+        return {'opened': self.opened, 'reused': self.reused}
+
+
+_http_pool = _HttpsConnectionPool()
+
+
+def _fetch_access_token():
+    """Exchange refresh token for a short-lived access token via OAuth2.
+
+    Returns (access_token, expires_in_seconds).
+    """
     token_data = urllib.parse.urlencode({
         "client_id":     Config.GMAIL_CLIENT_ID,
         "client_secret": Config.GMAIL_CLIENT_SECRET,
@@ -17,27 +114,75 @@ def _get_access_token():
         "grant_type":    "refresh_token",
     }).encode()
 
-    req = urllib.request.Request(
-        "https://oauth2.googleapis.com/token",
-        data=token_data,
-        method="POST",
+    status, data = _http_pool.request(
+        _OAUTH_HOST, "POST", "/token", body=token_data,
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
     )
-    req.add_header("Content-Type", "application/x-www-form-urlencoded")
-
-    with urllib.request.urlopen(req) as resp:
-        tokens = json.loads(resp.read().decode())
+    if status >= 400:
+        raise GmailApiError(status, data.decode(errors="replace"))
+    tokens = json.loads(data.decode())
 
     access_token = tokens.get("access_token")
     if not access_token:
         raise RuntimeError(f"[EMAIL] Failed to get access token: {tokens}")
-    return access_token
+    return access_token, int(tokens.get("expires_in") or 3600)
 
 
-def _send_via_gmail_api(to_email, subject, html_body):
-    """Send an email using the Gmail REST API with OAuth2."""
-    access_token = _get_access_token()
+class _AccessTokenCache:
+    """Thread-safe cache for the Gmail OAuth2 access token.
+
+    The token is reused until `refresh_margin` seconds before it expires.
+    Refreshes are single-flight: concurrent senders that find the token stale
+    queue on one lock, the first performs the exchange and the rest reuse it.
+    """
+
+    def __init__(self, fetch=_fetch_access_token, refresh_margin=60, clock=time.monotonic):
+        self._fetch          = fetch
+        self._refresh_margin = refresh_margin
+        self._clock          = clock
+        self._lock           = threading.Lock()
+        self._token          = None
+        self._expires_at     = 0.0
+        self.hits            = 0
+        self.misses          = 0
+
+    def _fresh(self):
+        return self._token is not None and self._clock() < self._expires_at - self._refresh_margin
+
+    def get(self):
+        if self._fresh():
+            self.hits += 1
+            return self._token
+        with self._lock:
+            if self._fresh():          # another thread refreshed while we waited
+                self.hits += 1
+                return self._token
+            self.misses += 1
+            token, expires_in = self._fetch()
+            self._token      = token
+            self._expires_at = self._clock() + expires_in
+            return token
+
+    def invalidate(self):
+        """Forget the cached token (e.g. after the API rejected it with 401)."""
+        with self._lock:
+            self._token      = None
+            self._expires_at = 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'cached': self._fresh()}
 
-    # Build the MIME message
+
+_token_cache = _AccessTokenCache()
+
+
+def _get_access_token():
+    """Return a valid access token, exchanging the refresh token only when needed."""
+    return _token_cache.get()
+
+
+def _build_raw_message(to_email, subject, html_body):
+    """Gmail API request body for one HTML message."""
     msg = MIMEMultipart("alternative")
     msg["From"]    = Config.MAIL_DEFAULT_SENDER
     msg["To"]      = to_email
@@ -46,20 +191,96 @@ def _send_via_gmail_api(to_email, subject, html_body):
 
     # Gmail API expects base64url-encoded raw message
     raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-    body = json.dumps({"raw": raw}).encode()
+    return json.dumps({"raw": raw}).encode()
+
+
+def _post_message(body, conn=None):
+    """POST one prepared message to the Gmail send endpoint, return its id."""
+    for attempt in (1, 2):
+        headers = {
+            "Authorization": f"Bearer {_get_access_token()}",
+            "Content-Type":  "application/json",
+        }
+        status, data = _http_pool.request(_GMAIL_HOST, "POST", _GMAIL_SEND_PATH,
+                                          body=body, headers=headers, conn=conn)
+        if status == 401 and attempt == 1:
+            # Token revoked / expired early — drop it and retry once with a fresh one
+            _token_cache.invalidate()
+            continue
+        if status >= 400:
+            raise GmailApiError(status, data.decode(errors="replace"))
+        return json.loads(data.decode()).get("id")
+
+
+def _send_via_gmail_api(to_email, subject, html_body):
+    """Send an email using the Gmail REST API with OAuth2."""
+    return _post_message(_build_raw_message(to_email, subject, html_body))
+
+
+def _send_batch_via_gmail_api(messages):
+    """Send several (to_email, subject, html_body) messages over one connection.
+
+    Returns a list aligned with `messages` holding each message id, or the
+    exception raised for that message, so one bad recipient doesn't fail the rest.
+    """
+    _get_access_token()  # refresh before holding a Gmail connection
+    conn, _ = _http_pool.checkout(_GMAIL_HOST)
+    results = []
+    for to_email, subject, html_body in messages:
+        try:
+            results.append(_post_message(_build_raw_message(to_email, subject, html_body), conn=conn))
+        except (GmailApiError, ValueError) as e:
+            results.append(e)
+        except Exception as e:
+            # Connection-level failure: it has been closed, start a fresh one
+            results.append(e)
+            conn, _ = _http_pool.checkout(_GMAIL_HOST)
+    _http_pool.checkin(_GMAIL_HOST, conn)
+    return results
+
+
+# ── Delivery transports ──────────────────────────────────────────────────────
+# Anything with send(to_email, subject, html_body) -> message id can deliver
+# mail; Config.EMAIL_TRANSPORT picks one for the outbox worker.
+
+class GmailApiTransport:
+    """Deliver through the Gmail REST API (production)."""
+
+    def send(self, to_email, subject, html_body):
+        return _send_via_gmail_api(to_email, subject, html_body)
+
+    def send_batch(self, messages):
+        return _send_batch_via_gmail_api(messages)
 
-    req = urllib.request.Request(
-        "https://gmail.googleapis.com/gmail/v1/users/me/messages/send",
-        data=body,
-        method="POST",
-    )
-    req.add_header("Authorization", f"Bearer {access_token}")
-    req.add_header("Content-Type", "application/json")
 
-    with urllib.request.urlopen(req) as resp:
-        result = json.loads(resp.read().decode())
+class FakeTransport:
+    """Keep messages in memory instead of sending them (local dev / tests).
 
-    return result.get("id")
+    fail_times makes the first N sends raise, to exercise the retry path.
+    """
+
+    def __init__(self, fail_times=0):
+        self.sent       = []
+        self.fail_times = fail_times
+
+    def send(self, to_email, subject, html_body):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("FakeTransport: simulated delivery failure")
+        self.sent.append({'to': to_email, 'subject': subject, 'html': html_body})
+        print(f"[EMAIL][fake] {subject} -> {to_email}")
+        return f"fake-{len(self.sent)}"
+
+
+_TRANSPORTS = {
+    'gmail': GmailApiTransport,
+    'fake':  FakeTransport,
+}
+
+
+def get_transport():
+    """Instantiate the transport named by Config.EMAIL_TRANSPORT (default gmail)."""
+    return _TRANSPORTS.get(Config.EMAIL_TRANSPORT, GmailApiTransport)()
 
 
 class EmailService:
@@ -167,7 +388,7 @@ class EmailService:
 
     @staticmethod
     def send_print_completed_email(to_email, full_name, project_name, request_id, service_type='3dprint'):
-        """Send print completion notification email via Gmail API"""
+        """Queue the print completion notification email (delivered by the outbox worker)"""
         try:
             pickup_link = f"https://dgspace-project-production.up.railway.app/print-requests/{request_id}/"
             accent = '#e53935' if service_type == 'laser' else '#28a745'
@@ -208,15 +429,15 @@ class EmailService:
             </body>
             </html>
             """
-            msg_id = _send_via_gmail_api(
+            outbox.enqueue(
                 to_email,
                 f"{'Your Laser Cut is Ready' if service_type == 'laser' else 'Your 3D Print is Ready'} - {project_name}",
                 html_body,
             )
-            print(f"[EMAIL] Print completed email sent to {to_email}, id={msg_id}")
-            return {'success': True, 'message': 'Print completed email sent'}
+            print(f"[EMAIL] Print completed email queued for {to_email}")
+            return {'success': True, 'message': 'Print completed email queued'}
         except Exception as e:
-            print(f"[ERROR] Error sending print completed email: {e}")
+            print(f"[ERROR] Error queueing print completed email: {e}")
             return {'success': False, 'message': str(e)}
 
     @staticmethod
@@ -0,0 +1,8 @@
+# gunicorn reads ./gunicorn.conf.py automatically; command-line flags (Procfile)
+# still take precedence for the settings they name.
+
+
+def post_fork(server, worker):
+    # Background threads have to start in the worker, not in the --preload master
+    from app import start_background_services
+    start_background_services()
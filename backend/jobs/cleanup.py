@@ -1,7 +1,16 @@
 import os
+import time
 import threading
 from database import db
 from config import Config
+from change_bus import change_bus
+import blob_store
+import analysis_cache
+import dxf_preview
+import mesh_preview
+import queue_ranks
+import thumbnails
+from request_stats import rollup
 
 
 def _cleanup_old_files():
@@ -9,6 +18,7 @@ def _cleanup_old_files():
     Runs every 24 h in a background daemon thread.
     - UFP + STL: purge for completed/failed/revision_requested/cancelled/rejected
     Sets file_deleted = 1 so record stays in DB.
+    - Content-addressed blobs are released, and deleted only once their refcount is zero.
     """
     try:
         upload_dir = Config.UPLOAD_FOLDER
@@ -27,7 +37,7 @@ def _cleanup_old_files():
         for row in (eligible or []):
             for col in ('ufp_file_path', 'stl_file_path'):
                 path = row.get(col)
-                if path:
+                if path and not blob_store.release(path):
                     full_path = os.path.join(upload_dir, os.path.basename(path))
                     try:
                         if os.path.exists(full_path):
@@ -40,10 +50,42 @@ def _cleanup_old_files():
             )
             purged += 1
         print(f"[cleanup] Terminal purge — {purged} record(s).")
+        if purged:
+            change_bus.publish('files_purged', count=purged)
 
         # Batch 2: active statuses (approved/queued/printing) — keep both STL and UFP
         print(f"[cleanup] Active requests skipped — STL and UFP retained.")
 
+        # Batch 3: blobs no request references any more
+        blobs = blob_store.purge_unreferenced()
+        print(f"[cleanup] Unreferenced blobs deleted — {blobs}.")
+        evicted = analysis_cache.evict_stale()
+        print(f"[cleanup] Stale analysis cache entries evicted — {evicted}.")
+
+        # Batch 4: partial uploads orphaned by a crashed worker (see upload_store)
+        cutoff = time.time() - 3600
+        for name in os.listdir(upload_dir):
+            if name.startswith('.upload-'):
+                full_path = os.path.join(upload_dir, name)
+                try:
+                    if os.path.getmtime(full_path) < cutoff:
+                        os.remove(full_path)
+                except OSError:
+                    pass
+
+            # DXF previews / viewer meshes / thumbnails whose upload is gone or
+            # that an older renderer produced
+            else:
+                for renderer in (dxf_preview, mesh_preview, thumbnails):
+                    if not renderer.is_derived_file(name):
+                        continue
+                    source = os.path.join(upload_dir, renderer.source_of(name))
+                    if not renderer.is_current(name) or not os.path.exists(source):
+                        try:
+                            os.remove(os.path.join(upload_dir, name))
+                        except OSError:
+                            pass
+
     except Exception as e:
         print(f"[cleanup] Error: {e}")
 
@@ -65,13 +107,38 @@ def _cleanup_unverified():
         print(f"[cleanup_unverified] {e}")
 
 
+def _reconcile_rollups():
+    """Nightly: repair daily_request_stats days that drifted from print_requests."""
+    try:
+        result = rollup.reconcile()
+        print(f"[rollup] Reconciled {result['days_checked']} day(s) — {result['repaired']} repaired.")
+    except Exception as e:
+        print(f"[rollup] Reconcile error: {e}")
+
+
+def _rebalance_queues():
+    """Hourly: re-space printer queues whose ranks have been squeezed together."""
+    try:
+        count = queue_ranks.rebalance_crowded()
+        if count:
+            print(f"[queue_ranks] Rebalanced {count} printer queue(s).")
+            change_bus.publish('queue_reordered')
+    except Exception as e:
+        print(f"[queue_ranks] Rebalance error: {e}")
+
+
 def _run_periodically(fn, interval_seconds, initial_delay=0):
-    """Run fn in a daemon thread, then reschedule itself after interval_seconds."""
+    """Run fn in a daemon thread, then reschedule itself after interval_seconds.
+    An exception escaping fn (e.g. PoolTimeout) is logged and never stops the schedule."""
     def _wrapper():
-        fn()
-        t = threading.Timer(interval_seconds, _wrapper)
-        t.daemon = True
-        t.start()
+        try:
+            fn()
+        except Exception as e:
+            print(f"[cleanup] {fn.__name__} error: {e}")
+        finally:
+            t = threading.Timer(interval_seconds, _wrapper)
+            t.daemon = True
+            t.start()
     t = threading.Timer(initial_delay, _wrapper)
     t.daemon = True
     t.start()
@@ -81,3 +148,5 @@ def start_jobs():
     """Start background cleanup jobs. Call once at application startup."""
     _run_periodically(_cleanup_old_files,  interval_seconds=86400, initial_delay=120)  # every 24h, first run after 2min
     _run_periodically(_cleanup_unverified, interval_seconds=300,   initial_delay=60)   # every 5min, first run after 1min
+    _run_periodically(_reconcile_rollups,  interval_seconds=86400, initial_delay=600)  # every 24h, first run after 10min
+    _run_periodically(_rebalance_queues,   interval_seconds=3600,  initial_delay=900)  # every 1h, first run after 15min
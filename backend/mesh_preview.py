@@ -0,0 +1,154 @@
+"""
+Compact mesh for the browser STL viewer
+Converts an uploaded STL (read through stl_analysis) into an indexed, 16-bit
+quantized binary mesh, so the detail page downloads a fraction of the raw STL's
+50 bytes per triangle. Runs once per file in an analysis worker process (see
+analysis_worker.PARSERS); the original STL stays available for download.
+
+Steps, all vectorized:
+  1. quantize every vertex to 16 bits per axis within the bounding box
+  2. weld identical quantized vertices with np.unique on a packed 48-bit key
+  3. drop triangles that collapsed to a line or point
+  4. for large meshes, add coarser LODs by vertex clustering on 2^bits grids
+
+Each level is stored gzip-compressed next to the upload as
+'<stored name>.mesh-v<MESH_VERSION>.lod<N>.bin.gz' (0 = full detail). Level 0
+is written last, so its presence means the set is complete.
+
+Binary layout (little-endian): a 44-byte header
+    magic 'DGM1', uint16 version, uint16 flags (bit 0: uint32 indices),
+    uint8 lod, uint8 lod_count, 2 pad bytes, uint32 vertex_count,
+    uint32 triangle_count, float32 min[3], float32 max[3]
+then uint16 positions (vertex_count * 3, padded to 4 bytes) and the
+uint16/uint32 triangle indices (triangle_count * 3). A quantized value q maps
+back to min + q / 65535 * (max - min).
+"""
+
+import gzip
+import os
+import struct
+from typing import Any, Dict
+
+import numpy as np
+
+from derived_files import DerivedFiles, write_atomic
+from stl_analysis import read_triangles
+
+MESH_VERSION = 1
+
+LOD_MIN_TRIANGLES    = 100_000          # smaller meshes only get level 0
+LOD_TARGET_TRIANGLES = 50_000           # stop adding levels once this small
+_LOD_GRID_BITS       = (9, 8, 7, 6)     # clustering grid per coarser level
+
+_QUANT_MAX          = 0xFFFF
+_HEADER             = struct.Struct('<4sHHBBxxII3f3f')
+_FLAG_WIDE_INDICES  = 1
+
+_files = DerivedFiles('mesh', MESH_VERSION, '.bin.gz', 'Mesh conversion failed')
+
+is_derived_file = _files.is_derived_file
+source_of       = _files.source_of
+is_current      = _files.is_current
+recent_failure  = _files.recent_failure
+mark_failed     = _files.mark_failed
+
+
+def preview_path(file_path: str, lod: int = 0) -> str:
+    return _files.path(file_path, f'.lod{lod}')
+
+
+def lod_count(file_path: str) -> int:
+    """Number of stored levels (0 when the mesh has not been built yet)."""
+    if not os.path.exists(preview_path(file_path, 0)):
+        return 0
+    count = 1
+    while os.path.exists(preview_path(file_path, count)):
+        count += 1
+    return count
+
+
+def _quantize(triangles: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """(n, 3, 3) float triangles -> (n * 3, 3) uint16 grid coordinates."""
+    extent = np.where(hi > lo, hi - lo, 1.0)
+    q = np.empty((len(triangles) * 3, 3), dtype=np.uint16)
+    for start in range(0, len(triangles), 1_000_000):
+        pts = triangles[start:start + 1_000_000].reshape(-1, 3).astype(np.float64)
+        q[start * 3:start * 3 + len(pts)] = np.rint((pts - lo) / extent * _QUANT_MAX)
+    return q
+
+
+def _pack(q: np.ndarray, shift: int = 0) -> np.ndarray:
+    """One sortable uint64 key per row of uint16 coordinates (optionally coarsened)."""
+    q = q.astype(np.uint64) >> np.uint64(shift)
+    return (q[:, 0] << np.uint64(32)) | (q[:, 1] << np.uint64(16)) | q[:, 2]
+
+
+def _drop_degenerate(tris: np.ndarray) -> np.ndarray:
+    keep = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])
+    return tris[keep]
+
+
+def _weld(q: np.ndarray):
+    """Merge identical vertices: returns (vertices (m, 3) uint16, triangles (k, 3) int64)."""
+    _, first, inverse = np.unique(_pack(q), return_index=True, return_inverse=True)
+    return q[first], _drop_degenerate(inverse.reshape(-1, 3))
+
+
+def _cluster(vertices: np.ndarray, tris: np.ndarray, grid_bits: int):
+    """Vertex-clustering decimation: vertices sharing a 2^grid_bits grid cell collapse
+    to their mean; triangles that degenerate or duplicate another are dropped."""
+    _, cell = np.unique(_pack(vertices, 16 - grid_bits), return_inverse=True)
+    counts = np.bincount(cell)
+    merged = np.stack([np.bincount(cell, weights=vertices[:, axis]) / counts
+                       for axis in range(3)], axis=1)
+    tris = _drop_degenerate(cell[tris])
+    # Faces folded onto each other by the collapse: keep one of each
+    _, first = np.unique(np.sort(tris, axis=1), axis=0, return_index=True)
+    tris = tris[np.sort(first)]
+    # Renumber so only referenced cells remain
+    used, tris = np.unique(tris, return_inverse=True)
+    return np.rint(merged[used]).astype(np.uint16), tris.reshape(-1, 3)
+
+
+def _encode(vertices: np.ndarray, tris: np.ndarray, lod: int, count: int,
+            lo: np.ndarray, hi: np.ndarray) -> bytes:
+    wide = len(vertices) > 0xFFFF
+    header = _HEADER.pack(b'DGM1', MESH_VERSION, _FLAG_WIDE_INDICES if wide else 0,
+                          lod, count, len(vertices), len(tris), *lo, *hi)
+    positions = vertices.astype('<u2').tobytes()
+    indices = tris.astype('<u4' if wide else '<u2').tobytes()
+    return header + positions + b'\0' * (-len(positions) % 4) + indices
+
+
+def build_mesh(file_path: str) -> Dict[str, Any]:
+    """Convert an STL and store its levels. Returns {'success', 'lod_count', 'lods'}."""
+    if os.path.exists(preview_path(file_path, 0)):
+        return {'success': True, 'lod_count': lod_count(file_path), 'lods': []}
+    try:
+        triangles = read_triangles(file_path)
+        pts = triangles.reshape(-1, 3)
+        lo, hi = pts.min(axis=0).astype(np.float64), pts.max(axis=0).astype(np.float64)
+        source_triangles = len(triangles)
+
+        vertices, tris = _weld(_quantize(triangles, lo, hi))
+        del triangles, pts
+        levels = [(vertices, tris)]
+        if len(tris) > LOD_MIN_TRIANGLES:
+            for bits in _LOD_GRID_BITS:
+                v, t = _cluster(vertices, tris, bits)
+                if len(t) and len(t) <= len(levels[-1][1]) // 2:
+                    levels.append((v, t))
+                if len(levels[-1][1]) <= LOD_TARGET_TRIANGLES:
+                    break
+    except Exception as e:
+        return {'success': False, 'message': f'Mesh conversion failed: {e}'}
+
+    lods = []
+    # Coarsest first: level 0 appearing marks the whole set as ready
+    for lod in reversed(range(len(levels))):
+        v, t = levels[lod]
+        data = gzip.compress(_encode(v, t, lod, len(levels), lo, hi), compresslevel=6, mtime=0)
+        write_atomic(preview_path(file_path, lod), data)
+        lods.append({'lod': lod, 'vertices': len(v), 'triangles': len(t), 'bytes': len(data)})
+    return {'success': True, 'source_triangles': source_triangles,
+            'lod_count': len(levels), 'lods': lods[::-1]}
@@ -2,12 +2,181 @@
 3D Print Request Service
 Handles business logic for 3D print request management
 """
-from database import db
+from database import db, day_range
 from datetime import datetime
 from typing import Dict, List, Optional
 import os
 from config import Config
 from email_service import EmailService
+from change_bus import change_bus
+import base64
+import threading
+import time
+import blob_store
+import request_stats
+import thumbnails
+from request_stats import rollup
+
+
+# ── Request list helpers ──────────────────────────────────────────────────────
+# The list endpoints build their SELECT from the requested output fields, so
+# list views can leave out large text columns (fields=...). With a limit they
+# page by keyset on (created_at, request_id) instead of OFFSET: the cursor is
+# the last row's sort key, so each page is an index range scan however deep
+# the caller has paged.
+
+# Output field -> SELECT expression (the row key is the field name)
+_LIST_COLUMNS = {
+    'student_name':  "COALESCE(s.full_name, a.full_name, pr.student_email) AS student_name",
+    'thumbnail_url': "pr.ufp_file_path AS thumbnail_url",
+}
+_LIST_FLOAT_FIELDS = {
+    'estimated_weight_grams', 'estimated_print_time_hours',
+    'slicer_time_minutes', 'slicer_material_g',
+    'ufp_print_time_minutes', 'ufp_material_g',
+}
+STUDENT_LIST_FIELDS = (
+    'project_name', 'description', 'material_type', 'color_preference',
+    'estimated_weight_grams', 'estimated_print_time_hours',
+    'priority', 'status', 'admin_notes', 'reviewed_by', 'reviewed_at',
+    'created_at', 'updated_at', 'completed_at', 'deadline_date',
+    'slicer_time_minutes', 'slicer_material_g',
+    'ufp_print_time_minutes', 'ufp_material_g',
+    'stl_file_path', 'stl_original_name',
+    'service_type', 'laser_options', 'thumbnail_url',
+)
+ADMIN_LIST_FIELDS = (
+    'student_email', 'student_name', 'project_name', 'description',
+    'material_type', 'priority', 'status', 'created_at',
+    'reviewed_by', 'reviewed_at', 'deadline_date',
+    'slicer_time_minutes', 'slicer_material_g',
+    'ufp_print_time_minutes', 'ufp_material_g',
+    'service_type', 'thumbnail_url',
+)
+
+
+def _select_fields(fields: Optional[List[str]], allowed: tuple) -> List[str]:
+    """Validate a fields= projection; None/empty means every allowed field."""
+    if not fields:
+        return list(allowed)
+    unknown = [f for f in fields if f not in allowed and f not in ('id', 'request_id')]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return [f for f in allowed if f in fields]
+
+
+def _format_list_row(row: Dict, fields: List[str]) -> Dict:
+    item = {'id': row['request_id'], 'request_id': row['request_id']}
+    for field in fields:
+        value = row[field]
+        if field in _LIST_FLOAT_FIELDS:
+            value = float(value) if value else None
+        elif field == 'service_type':
+            value = value or '3dprint'
+        elif field == 'thumbnail_url':
+            value = thumbnails.thumbnail_url(value)
+        elif hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        item[field] = value
+    return item
+
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque page cursor: the (created_at, request_id) sort key of a row."""
+    raw = f"{row['created_at'].isoformat()}|{row['request_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, request_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(request_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def list_args(args) -> tuple:
+    """(fields, limit, cursor) from list query args: ?fields=a,b&limit=N&cursor=...
+
+    Raises ValueError for a malformed limit. The limit is capped at
+    Config.REQUEST_LIST_MAX_LIMIT; no limit means an unpaginated list.
+    """
+    fields = [f.strip() for f in (args.get('fields') or '').split(',') if f.strip()] or None
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if limit < 1:
+            raise ValueError('limit must be at least 1')
+        limit = min(limit, Config.REQUEST_LIST_MAX_LIMIT)
+    return fields, limit, args.get('cursor') or None
+
+
+def _list_requests(fields: List[str], where: List[str], params: List,
+                   limit: Optional[int], cursor: Optional[str]) -> Dict:
+    """Run a request list query. Without a limit every matching row is returned."""
+    columns = ['pr.request_id', 'pr.created_at'] + [
+        _LIST_COLUMNS.get(f, f'pr.{f}') for f in fields if f != 'created_at'
+    ]
+    query = f"SELECT {', '.join(columns)} FROM print_requests pr"
+    if 'student_name' in fields:
+        query += (" LEFT JOIN students s ON pr.student_email = s.email"
+                  " LEFT JOIN admins a ON pr.student_email = a.email")
+    where, params = list(where), list(params)
+    if cursor:
+        created_at, request_id = decode_cursor(cursor)
+        where.append("(pr.created_at < %s OR (pr.created_at = %s AND pr.request_id < %s))")
+        params.extend([created_at, created_at, request_id])
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY pr.created_at DESC, pr.request_id DESC"
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit + 1)   # one extra row tells us whether a next page exists
+
+    rows = db.fetch_all(query, tuple(params) if params else None) or []
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    return {'requests': [_format_list_row(r, fields) for r in rows], 'next_cursor': next_cursor}
+
+
+# ── Cached list totals ────────────────────────────────────────────────────────
+# Paged list responses include the total number of matching requests. COUNT(*)
+# over the whole filter is the expensive part of a page, so totals are cached
+# per filter like the printer status snapshot (routes/admin.py): an entry is
+# reused until a print_requests mutation moves the change_bus version or
+# REQUEST_COUNT_CACHE_SECONDS pass (edits made outside the app).
+
+_count_lock  = threading.Lock()
+_count_cache = {}   # (where sql, params) -> (bus_version, fetched_at_monotonic, count)
+_COUNT_CACHE_MAX_ENTRIES = 256
+
+
+def _cached_count(where: List[str], params: List) -> int:
+    key = (' AND '.join(where), tuple(str(p) for p in params))
+    version = change_bus.version
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if (hit and hit[0] == version
+                and time.monotonic() - hit[1] < Config.REQUEST_COUNT_CACHE_SECONDS):
+            return hit[2]
+    query = "SELECT COUNT(*) AS n FROM print_requests pr"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    row = db.fetch_one(query, tuple(params) if params else None)
+    count = int(row['n']) if row else 0
+    with _count_lock:
+        if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.clear()
+        _count_cache[key] = (version, time.monotonic(), count)
+    return count
+
 
 class PrintService:
     """Service for managing 3D print requests"""
@@ -95,6 +264,8 @@ class PrintService:
                 VALUES (%s, 'pending', %s)
             """
             db.execute_query(history_query, (request_id, student_email))
+            blob_store.acquire(stl_file_path)
+            change_bus.publish('request_created', request_id=request_id)
             
             return {
                 'success': True,
@@ -110,86 +281,43 @@ class PrintService:
             }
     
     @staticmethod
-    def get_student_requests(student_email: str, status: Optional[str] = None) -> Dict:
+    def get_student_requests(student_email: str, status: Optional[str] = None,
+                             fields: Optional[List[str]] = None, limit: Optional[int] = None,
+                             cursor: Optional[str] = None) -> Dict:
         """
-        Get all print requests for a specific student
+        Get print requests for a specific student, newest first
         
         Args:
             student_email: Email of the student
             status: Optional filter by status
+            fields: Optional subset of STUDENT_LIST_FIELDS to return (id/request_id always included)
+            limit:  Optional page size; without it every matching request is returned
+            cursor: next_cursor from the previous page
         
         Returns:
-            Dict with success status and list of requests
+            Dict with success status and list of requests; paged calls also
+            carry 'total' and 'next_cursor' (None on the last page)
         """
         try:
+            fields = _select_fields(fields, STUDENT_LIST_FIELDS)
+            where, params = ["pr.student_email = %s"], [student_email]
             if status:
-                query = """
-                    SELECT request_id, project_name, description, material_type, 
-                           color_preference, estimated_weight_grams, estimated_print_time_hours,
-                           priority, status, admin_notes, reviewed_by, reviewed_at,
-                           created_at, updated_at, completed_at, deadline_date,
-                           slicer_time_minutes, slicer_material_g,
-                           ufp_print_time_minutes, ufp_material_g,
-                           stl_file_path, stl_original_name,
-                           service_type, laser_options
-                    FROM print_requests 
-                    WHERE student_email = %s AND status = %s
-                    ORDER BY created_at DESC
-                """
-                results = db.fetch_all(query, (student_email, status))
-            else:
-                query = """
-                    SELECT request_id, project_name, description, material_type, 
-                           color_preference, estimated_weight_grams, estimated_print_time_hours,
-                           priority, status, admin_notes, reviewed_by, reviewed_at,
-                           created_at, updated_at, completed_at, deadline_date,
-                           slicer_time_minutes, slicer_material_g,
-                           ufp_print_time_minutes, ufp_material_g,
-                           stl_file_path, stl_original_name,
-                           service_type, laser_options
-                    FROM print_requests 
-                    WHERE student_email = %s
-                    ORDER BY created_at DESC
-                """
-                results = db.fetch_all(query, (student_email,))
-            
-            requests = []
-            if results:
-                for row in results:
-                    requests.append({
-                        'id': row['request_id'],
-                        'request_id': row['request_id'],
-                        'project_name': row['project_name'],
-                        'description': row['description'],
-                        'material_type': row['material_type'],
-                        'color_preference': row['color_preference'],
-                        'estimated_weight_grams': float(row['estimated_weight_grams']) if row['estimated_weight_grams'] else None,
-                        'estimated_print_time_hours': float(row['estimated_print_time_hours']) if row['estimated_print_time_hours'] else None,
-                        'priority': row['priority'],
-                        'status': row['status'],
-                        'admin_notes': row['admin_notes'],
-                        'reviewed_by': row['reviewed_by'],
-                        'reviewed_at': row['reviewed_at'].isoformat() if row['reviewed_at'] else None,
-                        'created_at': row['created_at'].isoformat() if row['created_at'] else None,
-                        'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None,
-                        'completed_at': row['completed_at'].isoformat() if row['completed_at'] else None,
-                        'deadline_date': row['deadline_date'].isoformat() if row['deadline_date'] else None,
-                        'slicer_time_minutes': float(row['slicer_time_minutes']) if row['slicer_time_minutes'] else None,
-                        'slicer_material_g': float(row['slicer_material_g']) if row['slicer_material_g'] else None,
-                        'ufp_print_time_minutes': float(row['ufp_print_time_minutes']) if row['ufp_print_time_minutes'] else None,
-                        'ufp_material_g': float(row['ufp_material_g']) if row['ufp_material_g'] else None,
-                        'stl_file_path': row['stl_file_path'],
-                        'stl_original_name': row['stl_original_name'],
-                        'service_type': row['service_type'] or '3dprint',
-                        'laser_options': row['laser_options'],
-                    })
-            
-            return {
+                where.append("pr.status = %s")
+                params.append(status)
+
+            page = _list_requests(fields, where, params, limit, cursor)
+            result = {
                 'success': True,
-                'requests': requests,
-                'count': len(requests)
+                'requests': page['requests'],
+                'count': len(page['requests'])
             }
+            if limit:
+                result['total'] = _cached_count(where, params)
+                result['next_cursor'] = page['next_cursor']
+            return result
             
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
         except Exception as e:
             print(f"Error getting student requests: {e}")
             return {
@@ -302,9 +430,9 @@ class PrintService:
             Dict with success status and message
         """
         try:
-            # Verify ownership and status — also grab stl_file_path for cleanup
+            # Verify ownership and status — also grab file paths for cleanup
             check_query = """
-                SELECT student_email, status, stl_file_path FROM print_requests
+                SELECT student_email, status, stl_file_path, ufp_file_path, created_at FROM print_requests
                 WHERE request_id = %s
             """
             row = db.fetch_one(check_query, (request_id,))
@@ -334,9 +462,15 @@ class PrintService:
                 "DELETE FROM print_requests WHERE request_id = %s",
                 (request_id,)
             )
-
-            # Delete the uploaded STL file from disk (if one exists)
-            if stl_file_path:
+            # The row is gone, so tell the rollup (request_stats) which day it was on
+            change_bus.publish('request_deleted', request_id=request_id,
+                               day=row['created_at'].date().isoformat() if row['created_at'] else None)
+
+            # Drop this request's blob references; the cleanup job deletes
+            # blobs nothing else points at
+            blob_store.release(row['ufp_file_path'])
+            if stl_file_path and not blob_store.release(stl_file_path):
+                # Pre-content-addressing upload: owned by this request alone
                 file_path = os.path.join(Config.UPLOAD_FOLDER, stl_file_path)
                 try:
                     if os.path.isfile(file_path):
@@ -357,9 +491,11 @@ class PrintService:
     @staticmethod
     def get_all_requests(status: Optional[str] = None, priority: Optional[str] = None,
                          week: Optional[str] = None,
-                         from_date: Optional[str] = None, to_date: Optional[str] = None) -> Dict:
+                         from_date: Optional[str] = None, to_date: Optional[str] = None,
+                         fields: Optional[List[str]] = None, limit: Optional[int] = None,
+                         cursor: Optional[str] = None) -> Dict:
         """
-        Get all print requests (admin view)
+        Get all print requests (admin view), newest first
         
         Args:
             status:    Optional filter by status
@@ -367,82 +503,55 @@ class PrintService:
             week:      Optional ISO week string 'YYYY-WW' — filters by created_at falling in that week
             from_date: Optional start date 'YYYY-MM-DD' for custom date range
             to_date:   Optional end date 'YYYY-MM-DD' for custom date range
+            fields:    Optional subset of ADMIN_LIST_FIELDS to return (id/request_id always included)
+            limit:     Optional page size; without it every matching request is
+                       returned (CSV export / weekly report)
+            cursor:    next_cursor from the previous page
         
         Returns:
-            Dict with success status and list of all requests
+            Dict with success status and list of requests; paged calls also
+            carry 'total' and 'next_cursor' (None on the last page)
         """
         try:
-            query = """
-                SELECT pr.request_id, pr.student_email,
-                       COALESCE(s.full_name, a.full_name, pr.student_email) AS full_name,
-                       pr.project_name,
-                       pr.description, pr.material_type, pr.priority, pr.status,
-                       pr.created_at, pr.reviewed_by, pr.reviewed_at, pr.deadline_date,
-                       pr.slicer_time_minutes, pr.slicer_material_g,
-                       pr.ufp_print_time_minutes, pr.ufp_material_g,
-                       pr.service_type
-                FROM print_requests pr
-                LEFT JOIN students s ON pr.student_email = s.email
-                LEFT JOIN admins a ON pr.student_email = a.email
-                WHERE 1=1
-            """
-            params = []
+            fields = _select_fields(fields, ADMIN_LIST_FIELDS)
+            where, params = [], []
             
             if status:
-                query += " AND pr.status = %s"
+                where.append("pr.status = %s")
                 params.append(status)
             
             if priority:
-                query += " AND pr.priority = %s"
+                where.append("pr.priority = %s")
                 params.append(priority)
 
             if from_date and to_date:
                 # Custom date range takes priority over week param
-                query += " AND DATE(pr.created_at) BETWEEN %s AND %s"
-                params.extend([from_date, to_date])
+                clause, bounds = day_range('pr.created_at', from_date, to_date)
+                where.append(clause)
+                params.extend(bounds)
             elif week:
                 # week is 'YYYY-WW'; derive the Monday–Sunday boundaries
                 import datetime
                 year, wnum = int(week.split('-')[0]), int(week.split('-')[1])
                 monday = datetime.datetime.strptime(f'{year}-W{wnum:02d}-1', '%G-W%V-%u').date()
                 sunday = monday + datetime.timedelta(days=6)
-                query += " AND DATE(pr.created_at) BETWEEN %s AND %s"
-                params.extend([monday.isoformat(), sunday.isoformat()])
+                clause, bounds = day_range('pr.created_at', monday, sunday)
+                where.append(clause)
+                params.extend(bounds)
 
-            query += " ORDER BY pr.created_at DESC"
-            
-            results = db.fetch_all(query, tuple(params) if params else None)
-            
-            requests = []
-            if results:
-                for row in results:
-                    requests.append({
-                        'id': row['request_id'],
-                        'request_id': row['request_id'],
-                        'student_email': row['student_email'],
-                        'student_name': row['full_name'],
-                        'project_name': row['project_name'],
-                        'description': row['description'],
-                        'material_type': row['material_type'],
-                        'priority': row['priority'],
-                        'status': row['status'],
-                        'created_at': row['created_at'].isoformat() if row['created_at'] else None,
-                        'reviewed_by': row['reviewed_by'],
-                        'reviewed_at': row['reviewed_at'].isoformat() if row['reviewed_at'] else None,
-                        'deadline_date': row['deadline_date'].isoformat() if row['deadline_date'] else None,
-                        'slicer_time_minutes': float(row['slicer_time_minutes']) if row['slicer_time_minutes'] else None,
-                        'slicer_material_g': float(row['slicer_material_g']) if row['slicer_material_g'] else None,
-                        'ufp_print_time_minutes': float(row['ufp_print_time_minutes']) if row['ufp_print_time_minutes'] else None,
-                        'ufp_material_g': float(row['ufp_material_g']) if row['ufp_material_g'] else None,
-                        'service_type': row['service_type'] or '3dprint',
-                    })
-            
-            return {
+            page = _list_requests(fields, where, params, limit, cursor)
+            result = {
                 'success': True,
-                'requests': requests,
-                'count': len(requests)
+                'requests': page['requests'],
+                'count': len(page['requests'])
             }
+            if limit:
+                result['total'] = _cached_count(where, params)
+                result['next_cursor'] = page['next_cursor']
+            return result
             
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
         except Exception as e:
             print(f"Error getting all requests: {e}")
             return {
@@ -503,6 +612,7 @@ class PrintService:
                 VALUES (%s, %s, %s, %s, %s)
             """
             db.execute_query(history_query, (request_id, old_status, new_status, admin_email, change_reason))
+            change_bus.publish('request_status', request_id=request_id, status=new_status)
             
             # If completed, set completed_at timestamp and notify student
             if new_status == 'completed':
@@ -553,6 +663,7 @@ class PrintService:
                 "UPDATE print_requests SET priority = %s WHERE request_id = %s",
                 (priority, request_id)
             )
+            change_bus.publish('request_priority', request_id=request_id, priority=priority)
             return {'success': True, 'message': f'Priority updated to {priority}', 'priority': priority}
         except Exception as e:
             print(f"Error updating priority: {e}")
@@ -615,6 +726,7 @@ class PrintService:
                    VALUES (%s, %s, 'revision_requested', %s, %s)""",
                 (request_id, old_status, admin_email, reason.strip())
             )
+            change_bus.publish('request_status', request_id=request_id, status='revision_requested')
 
             return {
                 'success': True,
@@ -684,15 +796,12 @@ class PrintService:
         try:
             stats = {}
 
-            # Total requests
-            row = db.fetch_one("SELECT COUNT(*) AS cnt FROM print_requests", ())
-            stats['total_requests'] = (row or {}).get('cnt', 0)
+            # Status / priority counts come from the daily rollup (request_stats)
+            rollup.sync()
+            by_status = request_stats.counts_by('status')
+            stats['total_requests'] = sum(by_status.values())
 
             # Requests by status — returns dict keyed by status name
-            rows = db.fetch_all(
-                "SELECT status, COUNT(*) AS cnt FROM print_requests GROUP BY status", ()
-            ) or []
-            by_status = {r['status']: r['cnt'] for r in rows}
             stats['by_status'] = by_status
 
             # "In Progress" = queued + printing (actively being worked on)
@@ -704,20 +813,21 @@ class PrintService:
             stats['by_status']['in_progress'] = in_progress
 
             # Requests by priority
-            rows = db.fetch_all(
-                "SELECT priority, COUNT(*) AS cnt FROM print_requests GROUP BY priority", ()
-            ) or []
-            stats['by_priority'] = {r['priority']: r['cnt'] for r in rows}
+            stats['by_priority'] = request_stats.counts_by('priority')
 
             # Pending count (convenience)
             stats['pending_count'] = by_status.get('pending', 0)
 
-            # Completed this month
+            # Completed this month — bounded on the database clock, as the
+            # other date filters are (MySQL returns a date, SQLite a string)
+            row = db.fetch_one("SELECT CURRENT_DATE() AS today")
+            if not row:
+                raise RuntimeError('Could not read the database date')
+            today = str(row['today'])
+            clause, bounds = day_range('updated_at', today[:8] + '01', today)
             row = db.fetch_one(
-                """SELECT COUNT(*) AS cnt FROM print_requests
-                   WHERE status = 'completed'
-                     AND MONTH(updated_at) = MONTH(CURRENT_DATE())
-                     AND YEAR(updated_at)  = YEAR(CURRENT_DATE())""", ()
+                f"SELECT COUNT(*) AS cnt FROM print_requests WHERE status = 'completed' AND {clause}",
+                bounds
             )
             stats['completed_this_month'] = (row or {}).get('cnt', 0)
 
@@ -798,15 +908,11 @@ class PrintService:
                 "INSERT INTO print_request_history (request_id, new_status, changed_by) VALUES (%s, 'pending', %s)",
                 (request_id, student_email)
             )
+            change_bus.publish('request_status', request_id=request_id, status='pending')
 
-            # Delete the old STL from disk only if a new one was provided
-            if stl_file_path and old_stl and old_stl != stl_file_path:
-                old_path = os.path.join(Config.UPLOAD_FOLDER, old_stl)
-                try:
-                    if os.path.isfile(old_path):
-                        os.remove(old_path)
-                except Exception as fe:
-                    print(f"Warning: could not delete old STL {old_path}: {fe}")
+            # Move the STL reference only if a new one was provided
+            if stl_file_path:
+                blob_store.replace(old_stl, stl_file_path)
 
             return {'success': True, 'message': 'Request resubmitted successfully'}
 
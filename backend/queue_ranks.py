@@ -0,0 +1,192 @@
+"""
+Printer queue ranks
+print_jobs.queue_position is a sparse rank, not a dense 1..n index: ranks are
+spaced RANK_GAP apart (migration_025), the queue is ordered by
+(queue_position, job_id), and a job is placed by giving it a rank between its
+new neighbours. Appending, moving to another printer and reordering therefore
+write only the moved job's row.
+
+Appending computes the tail rank inside the INSERT / UPDATE itself, so there
+is no separate MAX() read to race with another staff member. Two jobs that
+land on the same rank at the same moment still have a defined order through
+the job_id tie-break.
+
+Repeatedly inserting into the same slot halves its gap each time; when no
+integer is left between two neighbours the printer's queue is re-spaced
+(rebalance). rebalance_crowded() does the same ahead of time from
+jobs.cleanup for queues whose smallest gap has shrunk below MIN_GAP.
+
+API responses still report a 1-based position (display_position) so the UI
+keeps showing "#3" rather than a raw rank.
+"""
+
+from typing import Dict, List, Optional
+
+from database import db
+
+RANK_GAP = 1 << 16     # spacing between neighbouring ranks after a rebalance
+MIN_GAP  = 64          # rebalance_crowded() re-spaces queues tighter than this
+
+# Jobs that still hold a place in a printer queue
+ACTIVE = "status NOT IN ('completed', 'cancelled', 'failed')"
+
+# Next free rank at the tail of printer %s, as a derived table so it can be
+# read from print_jobs inside an UPDATE of print_jobs
+_TAIL_RANK = f"""
+    (SELECT tail.next_rank FROM (
+        SELECT COALESCE(MAX(queue_position), 0) + {RANK_GAP} AS next_rank
+        FROM print_jobs WHERE printer_id = %s AND {ACTIVE}
+    ) AS tail)
+"""
+
+
+def append_job(printer_id: int, fields: Dict) -> Optional[int]:
+    """Insert a print_jobs row at the tail of printer_id's queue.
+
+    fields holds the other column values (keys come from code). The rank is
+    computed by the same INSERT ... SELECT. Returns the new job_id.
+    """
+    columns = list(fields)
+    return db.execute_query(
+        f"INSERT INTO print_jobs (printer_id, queue_position, {', '.join(columns)}) "
+        f"SELECT %s, COALESCE(MAX(queue_position), 0) + {RANK_GAP}, "
+        f"{', '.join(['%s'] * len(columns))} "
+        f"FROM print_jobs WHERE printer_id = %s AND {ACTIVE}",
+        (printer_id, *fields.values(), printer_id)
+    )
+
+
+def move_to_tail(job_id: int, printer_id: int) -> int:
+    """Move a job to the end of printer_id's queue. Returns affected rows."""
+    return db.execute_update(
+        f"UPDATE print_jobs SET printer_id = %s, queue_position = {_TAIL_RANK} "
+        f"WHERE job_id = %s",
+        (printer_id, printer_id, job_id)
+    )
+
+
+def place(job_id: int, after_job_id: Optional[int] = None,
+          before_job_id: Optional[int] = None) -> None:
+    """Move a job within its printer's queue, directly after after_job_id or
+    directly before before_job_id (the head of the queue when both are None).
+
+    Run inside db.transaction(): the printer's queued rows are locked while
+    the neighbours are read so two concurrent moves cannot pick the same gap.
+    Raises ValueError when a job is missing or on another printer.
+    """
+    job = db.fetch_one(
+        f"SELECT printer_id FROM print_jobs WHERE job_id = %s AND {ACTIVE} FOR UPDATE",
+        (job_id,)
+    )
+    if not job:
+        raise ValueError('Job not found in a queue')
+    queue = [j for j in _queue(job['printer_id'], lock=True) if j['job_id'] != job_id]
+
+    index = {j['job_id']: i for i, j in enumerate(queue)}
+    anchor = after_job_id if after_job_id is not None else before_job_id
+    if anchor is not None and anchor not in index:
+        raise ValueError('Neighbour job is not in the same printer queue')
+    if after_job_id is not None:
+        slot = index[after_job_id] + 1
+    elif before_job_id is not None:
+        slot = index[before_job_id]
+    else:
+        slot = 0
+
+    rank = _rank_between(queue, slot)
+    if rank is None:
+        # Gap exhausted: re-space the queue with the job already in its slot
+        order = [j['job_id'] for j in queue]
+        order.insert(slot, job_id)
+        _respace(job['printer_id'], order)
+        return
+    db.execute_query(
+        "UPDATE print_jobs SET queue_position = %s WHERE job_id = %s",
+        (rank, job_id)
+    )
+
+
+def rebalance(printer_id: int, order: Optional[List[int]] = None) -> None:
+    """Re-space printer_id's queue RANK_GAP apart, in order (job_ids) when
+    given, otherwise keeping the current order. Jobs missing from order keep
+    their relative order after the listed ones."""
+    with db.transaction():
+        current = [j['job_id'] for j in _queue(printer_id, lock=True)]
+        if order is not None:
+            queued = set(current)
+            listed = list(dict.fromkeys(job_id for job_id in order if job_id in queued))
+            rest = [job_id for job_id in current if job_id not in set(listed)]
+            current = listed + rest
+        _respace(printer_id, current)
+
+
+def rebalance_crowded() -> int:
+    """Re-space every queue whose smallest gap is below MIN_GAP. Returns the
+    number of printers rebalanced."""
+    rows = db.fetch_all(
+        f"SELECT printer_id, queue_position FROM print_jobs WHERE {ACTIVE} "
+        f"ORDER BY printer_id, queue_position, job_id"
+    )
+    if rows is None:
+        raise RuntimeError('Could not read printer queues')
+    crowded = set()
+    for prev, row in zip(rows, rows[1:]):
+        if prev['printer_id'] == row['printer_id'] \
+                and row['queue_position'] - prev['queue_position'] < MIN_GAP:
+            crowded.add(row['printer_id'])
+    for printer_id in sorted(crowded):
+        rebalance(printer_id)
+    return len(crowded)
+
+
+def display_position(job_id: int) -> Optional[int]:
+    """1-based place of an active job in its printer's queue."""
+    row = db.fetch_one(
+        f"""SELECT COUNT(*) + 1 AS position
+            FROM print_jobs pj
+            JOIN print_jobs me ON me.job_id = %s AND pj.printer_id = me.printer_id
+            WHERE pj.{ACTIVE}
+              AND (pj.queue_position < me.queue_position
+                   OR (pj.queue_position = me.queue_position AND pj.job_id < me.job_id))""",
+        (job_id,)
+    )
+    return int(row['position']) if row else None
+
+
+# ── internal ──────────────────────────────────────────────────────────────────
+
+def _queue(printer_id: int, lock: bool = False) -> List[Dict]:
+    rows = db.fetch_all(
+        f"SELECT job_id, queue_position FROM print_jobs "
+        f"WHERE printer_id = %s AND {ACTIVE} "
+        f"ORDER BY queue_position, job_id" + (" FOR UPDATE" if lock else ""),
+        (printer_id,)
+    )
+    if rows is None:
+        raise RuntimeError('Could not read printer queue')
+    return rows
+
+
+def _rank_between(queue: List[Dict], slot: int) -> Optional[int]:
+    """Integer rank strictly between queue[slot-1] and queue[slot], or None."""
+    lo = queue[slot - 1]['queue_position'] if slot > 0 else None
+    hi = queue[slot]['queue_position'] if slot < len(queue) else None
+    if lo is None and hi is None:
+        return RANK_GAP
+    if hi is None:
+        return lo + RANK_GAP
+    if lo is None:
+        return hi - RANK_GAP
+    if hi - lo < 2:
+        return None
+    return (lo + hi) // 2
+
+
+def _respace(printer_id: int, order: List[int]) -> None:
+    db.update_case(
+        'print_jobs', 'job_id',
+        [{'job_id': job_id, 'queue_position': (i + 1) * RANK_GAP}
+         for i, job_id in enumerate(order)],
+        ['queue_position'],
+        'printer_id = %s', (printer_id,),
+    )
@@ -0,0 +1,272 @@
+"""
+Daily request rollups
+`daily_request_stats` (migration_024) holds one row per creation day × status
+× priority × material × service type with the request count, print minutes and
+material grams, so the dashboard report and statistics read O(days) rows
+instead of aggregating all of print_requests on every view.
+
+Rollups are kept current from the change_bus: every print_requests mutation
+publishes an event carrying its request_id (deletes also carry the day), and a
+daemon worker re-aggregates the day that request was created on — one index
+range scan. Recomputing the whole day instead of applying deltas keeps every
+refresh idempotent, so a repeated or reordered event can't leave the rollup
+off. Readers call sync() first so a report reflects changes made just before.
+
+reconcile() runs nightly from jobs.cleanup: check_consistency() compares the
+rollup against a full recomputation and the days that differ (edits made
+outside the app, missed events) are re-aggregated.
+"""
+
+import datetime
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from database import db, day_range
+from change_bus import change_bus
+
+_IDLE_POLL_SECONDS  = 30
+_ERROR_BACKOFF_SECONDS = 5
+_SYNC_WAIT_SECONDS  = 2      # longest a report waits for the worker to catch up
+_MAX_REPORTED_DIFFS = 50
+
+# Rollup dimensions / measures as computed from print_requests
+_SOURCE_COLUMNS = """
+    DATE(created_at)                      AS day,
+    COALESCE(status, '')                  AS status,
+    COALESCE(priority, '')                AS priority,
+    COALESCE(material_type, '')           AS material_type,
+    COALESCE(service_type, '3dprint')     AS service_type,
+    COUNT(*)                              AS request_count,
+    COALESCE(SUM(COALESCE(ufp_print_time_minutes, slicer_time_minutes)), 0) AS print_minutes,
+    COALESCE(SUM(COALESCE(ufp_material_g, slicer_material_g)), 0)           AS material_g
+"""
+# Positional: GROUP BY status would group the raw column, not COALESCE(status, '')
+_GROUP_BY = "GROUP BY 1, 2, 3, 4, 5"
+_KEY = ('day', 'status', 'priority', 'material_type', 'service_type')
+
+
+class DailyRollup:
+    """Change-bus consumer that keeps daily_request_stats in step with print_requests."""
+
+    def __init__(self):
+        self._cond    = threading.Condition()
+        self._version = 0        # last change_bus version applied
+        self._thread  = None
+        self._pid     = None
+
+    def start(self):
+        """Start the worker in this process."""
+        self._ensure_worker()
+
+    def sync(self, timeout: float = _SYNC_WAIT_SECONDS) -> bool:
+        """Wait (bounded) until every change published so far is rolled up."""
+        self._ensure_worker()
+        target = change_bus.version
+        with self._cond:
+            return self._cond.wait_for(lambda: self._version >= target, timeout)
+
+    # ------------------------------------------------------------------
+    # maintenance
+    # ------------------------------------------------------------------
+    @staticmethod
+    def refresh_day(day) -> None:
+        """Re-aggregate one creation day from print_requests."""
+        clause, bounds = day_range('created_at', day, day)
+        db.execute_query(f"""
+            INSERT INTO daily_request_stats
+                (day, status, priority, material_type, service_type,
+                 request_count, print_minutes, material_g)
+            SELECT {_SOURCE_COLUMNS}
+            FROM print_requests
+            WHERE {clause}
+            {_GROUP_BY}
+            ON DUPLICATE KEY UPDATE
+                request_count = VALUES(request_count),
+                print_minutes = VALUES(print_minutes),
+                material_g    = VALUES(material_g)
+        """, bounds)
+        # Groups the day no longer has (e.g. every request moved to another status)
+        db.execute_query(f"""
+            DELETE FROM daily_request_stats
+            WHERE day = %s
+              AND (status, priority, material_type, service_type) NOT IN (
+                  SELECT COALESCE(status, ''), COALESCE(priority, ''),
+                         COALESCE(material_type, ''), COALESCE(service_type, '3dprint')
+                  FROM print_requests
+                  WHERE {clause})
+        """, (bounds[0].date(),) + bounds)
+
+    @staticmethod
+    def check_consistency() -> Dict:
+        """Compare the rollup with a full recomputation from print_requests.
+
+        Returns {'consistent', 'days_checked', 'mismatched_days', 'differences'};
+        differences lists up to _MAX_REPORTED_DIFFS {key, expected, actual} entries.
+        """
+        expected_rows = db.fetch_all(
+            f"SELECT {_SOURCE_COLUMNS} FROM print_requests {_GROUP_BY}"
+        )
+        actual_rows = db.fetch_all(
+            "SELECT day, status, priority, material_type, service_type, "
+            "request_count, print_minutes, material_g FROM daily_request_stats"
+        )
+        if expected_rows is None or actual_rows is None:
+            raise RuntimeError('Could not read print_requests / daily_request_stats')
+
+        def _index(rows):
+            return {tuple(str(r[k]) for k in _KEY):
+                    (int(r['request_count']), float(r['print_minutes']), float(r['material_g']))
+                    for r in rows}
+
+        expected, actual = _index(expected_rows), _index(actual_rows)
+        differences, days = [], set()
+        for key in sorted(expected.keys() | actual.keys()):
+            want, have = expected.get(key), actual.get(key)
+            if want is None or have is None or want[0] != have[0] \
+                    or abs(want[1] - have[1]) > 0.01 or abs(want[2] - have[2]) > 0.01:
+                days.add(key[0])
+                if len(differences) < _MAX_REPORTED_DIFFS:
+                    differences.append({'key': dict(zip(_KEY, key)), 'expected': want, 'actual': have})
+        return {
+            'consistent': not days,
+            'days_checked': len({k[0] for k in expected.keys() | actual.keys()}),
+            'mismatched_days': sorted(days),
+            'differences': differences,
+        }
+
+    def reconcile(self) -> Dict:
+        """Check the whole rollup and re-aggregate every day that differs."""
+        result = self.check_consistency()
+        for day in result['mismatched_days']:
+            self.refresh_day(day)
+        result['repaired'] = len(result['mismatched_days'])
+        return result
+
+    # ------------------------------------------------------------------
+    # internal
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        # Same lazy per-process start as email_outbox: threads don't survive
+        # gunicorn's --preload fork.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='request-rollup', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            version = self._version
+            change_bus.wait(version, _IDLE_POLL_SECONDS)
+            try:
+                latest = change_bus.version
+                events, complete = change_bus.events_since(version)
+                if not complete:
+                    # Fell behind the bus history: fall back to a full check
+                    print('[rollup] Change history overrun — reconciling all days')
+                    self.reconcile()
+                else:
+                    for day in self._days_touched(events):
+                        self.refresh_day(day)
+                    latest = max([latest] + [e['version'] for e in events])
+            except Exception as e:
+                print(f"[rollup] Worker error: {e}")
+                time.sleep(_ERROR_BACKOFF_SECONDS)
+                continue
+            with self._cond:
+                self._version = latest
+                self._cond.notify_all()
+
+    @staticmethod
+    def _days_touched(events: List[Dict]) -> List[datetime.date]:
+        days = {datetime.date.fromisoformat(e['day']) for e in events if e.get('day')}
+        request_ids = sorted({e['request_id'] for e in events
+                              if e.get('request_id') and not e.get('day')})
+        if request_ids:
+            placeholders = ', '.join(['%s'] * len(request_ids))
+            rows = db.fetch_all(
+                f"SELECT DISTINCT DATE(created_at) AS day FROM print_requests "
+                f"WHERE request_id IN ({placeholders})", tuple(request_ids)
+            )
+            if rows is None:
+                raise RuntimeError('Could not look up request days')
+            days.update(r['day'] for r in rows if r['day'])
+        return sorted(days)
+
+
+# ── Report reads ──────────────────────────────────────────────────────────────
+
+def _day_filter(from_date: Optional[str], to_date: Optional[str]):
+    if from_date and to_date:
+        return "WHERE day BETWEEN %s AND %s", (from_date, to_date)
+    return "", ()
+
+
+def report_summary(from_date: Optional[str] = None, to_date: Optional[str] = None) -> Dict:
+    """Dashboard totals for creation days from_date..to_date (all time when omitted).
+
+    unique_students is not additive across days, so it is not part of the
+    rollup; the dashboard counts it from print_requests separately.
+    """
+    where, params = _day_filter(from_date, to_date)
+    return db.fetch_one(f"""
+        SELECT
+            CAST(COALESCE(SUM(request_count), 0) AS SIGNED) AS total_requests,
+            CAST(COALESCE(SUM(CASE WHEN status = 'completed' THEN request_count END), 0) AS SIGNED) AS completed,
+            CAST(COALESCE(SUM(CASE WHEN status IN ('queued', 'printing') THEN request_count END), 0) AS SIGNED) AS in_progress,
+            CAST(COALESCE(SUM(CASE WHEN status = 'pending' THEN request_count END), 0) AS SIGNED) AS pending,
+            CAST(COALESCE(SUM(CASE WHEN status = 'approved' THEN request_count END), 0) AS SIGNED) AS approved,
+            CAST(COALESCE(SUM(CASE WHEN status = 'rejected' THEN request_count END), 0) AS SIGNED) AS rejected,
+            CAST(COALESCE(SUM(CASE WHEN status = 'cancelled' THEN request_count END), 0) AS SIGNED) AS cancelled,
+            ROUND(SUM(print_minutes) / 60, 1) AS total_print_hours,
+            ROUND(SUM(material_g), 1) AS total_material_g
+        FROM daily_request_stats
+        {where}
+    """, params) or {}
+
+
+def report_by_material(from_date: Optional[str] = None, to_date: Optional[str] = None) -> List[Dict]:
+    where, params = _day_filter(from_date, to_date)
+    return db.fetch_all(f"""
+        SELECT NULLIF(material_type, '') AS material_type,
+               CAST(SUM(request_count) AS SIGNED) AS count,
+               ROUND(SUM(material_g), 1) AS material_g
+        FROM daily_request_stats
+        {where}
+        GROUP BY material_type
+        ORDER BY count DESC
+    """, params) or []
+
+
+def report_by_day(from_date: Optional[str] = None, to_date: Optional[str] = None) -> List[Dict]:
+    where, params = _day_filter(from_date, to_date)
+    return db.fetch_all(f"""
+        SELECT day,
+               CAST(SUM(request_count) AS SIGNED) AS count,
+               CAST(COALESCE(SUM(CASE WHEN status = 'completed' THEN request_count END), 0) AS SIGNED) AS completed
+        FROM daily_request_stats
+        {where}
+        GROUP BY day
+        ORDER BY day
+    """, params) or []
+
+
+def counts_by(column: str) -> Dict[str, int]:
+    """All-time request counts keyed by 'status' or 'priority'."""
+    if column not in ('status', 'priority'):
+        raise ValueError(f'Cannot group by {column}')
+    rows = db.fetch_all(f"""
+        SELECT NULLIF({column}, '') AS value, CAST(SUM(request_count) AS SIGNED) AS cnt
+        FROM daily_request_stats
+        GROUP BY {column}
+    """) or []
+    return {r['value']: r['cnt'] for r in rows}
+
+
+# Single global instance
+rollup = DailyRollup()
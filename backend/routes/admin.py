@@ -1,14 +1,24 @@
 import bcrypt
 import datetime
+import threading
+import time
 import traceback
 import jwt as _jwt
-from flask import Blueprint, request, jsonify
-from database import db
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
+from database import db, day_range
 from auth_service import AuthService
 from email_service import EmailService
-from print_service import PrintService
+from print_service import PrintService, list_args
 from totp_service import TotpService
 from config import Config
+from db_pool import PoolTimeout
+from change_bus import change_bus, format_event_id, parse_event_id
+import blob_store
+import analysis_cache
+import queue_ranks
+import request_stats
+import thumbnails
+from request_stats import rollup
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -116,12 +126,15 @@ def admin_delete_student(email: str):
     if not existing:
         return jsonify({'success': False, 'message': 'Student not found'}), 404
 
-    db.execute_query("DELETE FROM totp_secrets WHERE email = %s AND user_type = 'student'", (email,))
-    db.execute_query("DELETE FROM password_reset_tokens WHERE email = %s AND user_type = 'student'", (email,))
-    db.execute_query("DELETE FROM email_verification_codes WHERE email = %s AND user_type = 'student'", (email,))
-
-    delete_result = db.execute_query("DELETE FROM students WHERE email = %s", (email,))
-    if delete_result is None:
+    # All-or-nothing: a failure part-way must not leave an account without its 2FA / tokens
+    try:
+        with db.transaction():
+            db.execute_query("DELETE FROM totp_secrets WHERE email = %s AND user_type = 'student'", (email,))
+            db.execute_query("DELETE FROM password_reset_tokens WHERE email = %s AND user_type = 'student'", (email,))
+            db.execute_query("DELETE FROM email_verification_codes WHERE email = %s AND user_type = 'student'", (email,))
+            db.execute_query("DELETE FROM students WHERE email = %s", (email,))
+    except Exception as e:
+        print(f"[ERROR] delete student {email}: {e}")
         return jsonify({'success': False, 'message': 'Failed to delete student'}), 500
 
     return jsonify({'success': True, 'message': 'Student deleted'}), 200
@@ -154,19 +167,8 @@ def admin_update_student_role(email: str):
 
 # ==================== PRODUCTION BOARD ====================
 
-@admin_bp.route('/api/admin/production-board', methods=['GET'])
-def get_production_board():
-    """
-    Return everything needed for the Production Board in one call.
-    Access: admin or student_staff.
-    """
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return jsonify({'success': False, 'message': 'No token provided'}), 401
-    payload = AuthService.verify_jwt_token(auth_header.split(' ')[1])
-    if not payload or payload.get('user_type') not in ('admin', 'student_staff'):
-        return jsonify({'success': False, 'message': 'Admin access required'}), 403
-
+def _build_production_board():
+    """Query the ready-to-schedule list and every printer with its active queue."""
     ready = db.fetch_all("""
         SELECT
             pr.request_id   AS id,
@@ -218,75 +220,96 @@ def get_production_board():
                     (p['printer_id'],)
                 )
 
+    # All active jobs for every printer in one round trip, grouped in Python below
+    # (one query per printer made the board cost N+2 queries per refresh).
+    active_jobs = db.fetch_all("""
+        SELECT
+            pj.job_id,
+            pj.printer_id,
+            pj.request_id,
+            pj.queue_position,
+            pj.status          AS job_status,
+            pj.attempt_number,
+            pj.assigned_by,
+            pj.assigned_at,
+            pj.estimated_start,
+            pj.estimated_end,
+            pj.started_at,
+            pj.staff_notified,
+            COALESCE(
+                pj.print_end_expected,
+                CASE WHEN pj.status = 'printing' AND pj.started_at IS NOT NULL
+                     THEN DATE_ADD(pj.started_at, INTERVAL pr.ufp_print_time_minutes MINUTE)
+                     ELSE NULL END
+            )                  AS print_end_expected,
+            pj.completed_at,
+            pj.notes           AS job_notes,
+            pr.project_name,
+            pr.student_email,
+            pr.reviewed_by,
+            s.full_name        AS student_name,
+            pr.material_type,
+            pr.priority,
+            pr.deadline_date,
+            pr.ufp_print_time_minutes,
+            pr.ufp_material_g,
+            pr.ufp_file_path,
+            ab.full_name       AS assigned_by_name,
+            rb.full_name       AS reviewed_by_name
+        FROM print_jobs pj
+        JOIN print_requests pr ON pr.request_id = pj.request_id
+        LEFT JOIN students s   ON s.email = pr.student_email
+        LEFT JOIN admins ab    ON ab.email = pj.assigned_by
+        LEFT JOIN admins rb    ON rb.email = pr.reviewed_by
+        WHERE pj.status NOT IN ('completed', 'cancelled', 'failed')
+        ORDER BY pj.printer_id ASC, pj.queue_position ASC, pj.job_id ASC
+    """) or []
+
+    for row in ready:
+        row['thumbnail_url'] = thumbnails.thumbnail_url(row['ufp_file_path'])
+
+    jobs_by_printer = {}
+    for job in active_jobs:
+        job['thumbnail_url'] = thumbnails.thumbnail_url(job.pop('ufp_file_path'))
+        jobs_by_printer.setdefault(job.pop('printer_id'), []).append(job)
+
     for p in printers:
-        jobs = db.fetch_all("""
-            SELECT
-                pj.job_id,
-                pj.request_id,
-                pj.queue_position,
-                pj.status          AS job_status,
-                pj.attempt_number,
-                pj.assigned_by,
-                pj.assigned_at,
-                pj.estimated_start,
-                pj.estimated_end,
-                pj.started_at,
-                pj.staff_notified,
-                COALESCE(
-                    pj.print_end_expected,
-                    CASE WHEN pj.status = 'printing' AND pj.started_at IS NOT NULL
-                         THEN DATE_ADD(pj.started_at, INTERVAL pr.ufp_print_time_minutes MINUTE)
-                         ELSE NULL END
-                )                  AS print_end_expected,
-                pj.completed_at,
-                pj.notes           AS job_notes,
-                pr.project_name,
-                pr.student_email,
-                pr.reviewed_by,
-                s.full_name        AS student_name,
-                pr.material_type,
-                pr.priority,
-                pr.deadline_date,
-                pr.ufp_print_time_minutes,
-                pr.ufp_material_g,
-                ab.full_name       AS assigned_by_name,
-                rb.full_name       AS reviewed_by_name
-            FROM print_jobs pj
-            JOIN print_requests pr ON pr.request_id = pj.request_id
-            LEFT JOIN students s   ON s.email = pr.student_email
-            LEFT JOIN admins ab    ON ab.email = pj.assigned_by
-            LEFT JOIN admins rb    ON rb.email = pr.reviewed_by
-            WHERE pj.printer_id = %s
-              AND pj.status NOT IN ('completed', 'cancelled', 'failed')
-            ORDER BY pj.queue_position ASC
-        """, (p['printer_id'],)) or []
+        jobs = jobs_by_printer.get(p['printer_id'], [])
         p['queue'] = jobs
         p['jobs'] = jobs
 
-    return jsonify({
-        'success': True,
-        'ready_to_schedule': ready,
-        'printers': printers
-    }), 200
+    return {'ready_to_schedule': ready, 'printers': printers}
 
 
-@admin_bp.route('/api/printers/status', methods=['GET'])
-def get_printer_status():
+@admin_bp.route('/api/admin/production-board', methods=['GET'])
+def get_production_board():
     """
-    Student-facing printer status summary.
-    Returns a sanitised per-printer view — no student names, no job details.
-    Access: any authenticated user (student, admin, student_staff).
+    Return everything needed for the Production Board in one call.
+    Access: admin or student_staff.
     """
     auth_header = request.headers.get('Authorization', '')
     if not auth_header.startswith('Bearer '):
         return jsonify({'success': False, 'message': 'No token provided'}), 401
     payload = AuthService.verify_jwt_token(auth_header.split(' ')[1])
-    if not payload:
-        return jsonify({'success': False, 'message': 'Invalid token'}), 403
+    if not payload or payload.get('user_type') not in ('admin', 'student_staff'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
-    now = datetime.datetime.utcnow()
+    return jsonify({'success': True, **_build_production_board()}), 200
+
+
+# ── Printer status snapshot ───────────────────────────────────────────────────
+# /api/printers/status is polled by every logged-in student, so the DB rows
+# behind it are cached per process for a few seconds. The snapshot remembers
+# the change_bus version it was built at; the job/printer mutation endpoints
+# publish to the bus, so staff changes show up on the next poll. The lock makes
+# concurrent callers share a single refresh.
+
+_status_lock     = threading.Lock()
+_status_snapshot = None   # (bus_version, fetched_at_monotonic, [printer rows])
 
-    # Try to fetch device_type; fall back gracefully if the column doesn't exist yet
+
+def _load_printer_status_rows():
+    """Fetch printers plus per-printer queue aggregates in two queries total."""
     printers = db.fetch_all(
         "SELECT printer_id, printer_name, model, location, status, accepted_file_formats, COALESCE(device_type, '3dprint') AS device_type FROM printers ORDER BY printer_name"
     )
@@ -298,33 +321,74 @@ def get_printer_status():
         for p in printers:
             p['device_type'] = '3dprint'
 
-    result = []
+    # Only one job can be printing per printer (guarded in update_job_status),
+    # so MAX() over the printing rows yields that job's expected end time.
+    aggregates = db.fetch_all("""
+        SELECT
+            pj.printer_id,
+            SUM(pj.status IN ('queued', 'file_transferred')) AS queued_count,
+            SUM(pj.status = 'printing')                      AS printing_count,
+            MAX(CASE WHEN pj.status = 'printing' THEN
+                    COALESCE(
+                        pj.print_end_expected,
+                        CASE WHEN pj.started_at IS NOT NULL
+                             THEN DATE_ADD(pj.started_at, INTERVAL pr.ufp_print_time_minutes MINUTE)
+                             ELSE NULL END
+                    )
+                END)                                         AS print_end_expected
+        FROM print_jobs pj
+        JOIN print_requests pr ON pr.request_id = pj.request_id
+        WHERE pj.status IN ('queued', 'file_transferred', 'printing')
+        GROUP BY pj.printer_id
+    """) or []
+    by_printer = {a['printer_id']: a for a in aggregates}
+
     for p in printers:
-        # Active (non-terminal) jobs for this printer
-        jobs = db.fetch_all("""
-            SELECT
-                pj.status AS job_status,
-                COALESCE(
-                    pj.print_end_expected,
-                    CASE WHEN pj.status = 'printing' AND pj.started_at IS NOT NULL
-                         THEN DATE_ADD(pj.started_at, INTERVAL pr.ufp_print_time_minutes MINUTE)
-                         ELSE NULL END
-                ) AS print_end_expected
-            FROM print_jobs pj
-            JOIN print_requests pr ON pr.request_id = pj.request_id
-            WHERE pj.printer_id = %s
-              AND pj.status NOT IN ('completed', 'cancelled', 'failed')
-            ORDER BY pj.queue_position ASC
-        """, (p['printer_id'],)) or []
-
-        printing_job = next((j for j in jobs if j['job_status'] == 'printing'), None)
-        queued_count = sum(1 for j in jobs if j['job_status'] in ('queued', 'file_transferred'))
+        agg = by_printer.get(p['printer_id']) or {}
+        p['queued_count']       = int(agg.get('queued_count') or 0)
+        p['is_printing']        = bool(agg.get('printing_count'))
+        p['print_end_expected'] = agg.get('print_end_expected')
+    return printers
+
+
+def _get_printer_status_rows():
+    """Return cached printer status rows, refreshing at most once per TTL window."""
+    global _status_snapshot
+    with _status_lock:
+        now     = time.monotonic()
+        version = change_bus.version
+        if (_status_snapshot is None
+                or _status_snapshot[0] != version
+                or now - _status_snapshot[1] >= Config.PRINTER_STATUS_CACHE_SECONDS):
+            _status_snapshot = (version, now, _load_printer_status_rows())
+        return _status_snapshot[2]
+
+
+@admin_bp.route('/api/printers/status', methods=['GET'])
+def get_printer_status():
+    """
+    Student-facing printer status summary.
+    Returns a sanitised per-printer view — no student names, no job details.
+    Access: any authenticated user (student, admin, student_staff).
+    """
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return jsonify({'success': False, 'message': 'No token provided'}), 401
+    payload = AuthService.verify_jwt_token(auth_header.split(' ')[1])
+    if not payload:
+        return jsonify({'success': False, 'message': 'Invalid token'}), 403
+
+    now = datetime.datetime.utcnow()
+
+    result = []
+    for p in _get_printer_status_rows():
+        queued_count = p['queued_count']
 
         # Minutes remaining for the active printing job
         minutes_remaining = None
         print_end_expected = None
-        if printing_job and printing_job.get('print_end_expected'):
-            end_dt = printing_job['print_end_expected']
+        if p['is_printing'] and p.get('print_end_expected'):
+            end_dt = p['print_end_expected']
             if isinstance(end_dt, str):
                 end_dt = datetime.datetime.fromisoformat(end_dt)
             diff_sec = (end_dt - now).total_seconds()
@@ -335,7 +399,7 @@ def get_printer_status():
         printer_hw_status = p['status']  # 'active', 'inactive', 'maintenance'
         if printer_hw_status in ('inactive', 'maintenance'):
             display_state = 'offline'
-        elif printing_job:
+        elif p['is_printing']:
             display_state = 'printing'
         elif queued_count > 0:
             display_state = 'busy'
@@ -376,57 +440,57 @@ def assign_to_printer(request_id):
     if not printer_id:
         return jsonify({'success': False, 'message': 'printer_id is required'}), 400
 
-    req = db.fetch_one(
-        "SELECT request_id, status, ufp_file_path FROM print_requests WHERE request_id = %s",
-        (request_id,)
-    )
-    if not req:
-        return jsonify({'success': False, 'message': 'Request not found'}), 404
-    if req['status'] not in ('approved',):
-        return jsonify({'success': False, 'message': f'Request must be in "approved" state (currently "{req["status"]}")'}), 409
-    if not req['ufp_file_path']:
-        return jsonify({'success': False, 'message': 'Request has no UFP file — cannot schedule'}), 409
-
-    printer = db.fetch_one("SELECT printer_id, status FROM printers WHERE printer_id = %s", (printer_id,))
-    if not printer:
-        return jsonify({'success': False, 'message': 'Printer not found'}), 404
-    if printer['status'] != 'active':
-        return jsonify({'success': False, 'message': f'Printer is not active (status: {printer["status"]})'}), 409
-
-    existing_job = db.fetch_one(
-        "SELECT job_id FROM print_jobs WHERE request_id = %s AND status NOT IN ('cancelled','failed')",
-        (request_id,)
-    )
-    if existing_job:
-        return jsonify({'success': False, 'message': 'This request already has an active print job'}), 409
-
-    pos_row = db.fetch_one(
-        "SELECT COALESCE(MAX(queue_position), 0) + 1 AS next_pos FROM print_jobs WHERE printer_id = %s AND status NOT IN ('completed','cancelled','failed')",
-        (printer_id,)
-    )
-    next_pos = pos_row['next_pos'] if pos_row else 1
-
     estimated_start = data.get('estimated_start') or None
     estimated_end   = data.get('estimated_end')   or None
     notes           = (data.get('notes') or '').strip() or None
 
-    job_id = db.execute_query(
-        """INSERT INTO print_jobs
-           (request_id, printer_id, queue_position, status, assigned_by, estimated_start, estimated_end, notes)
-           VALUES (%s, %s, %s, 'queued', %s, %s, %s, %s)""",
-        (request_id, printer_id, next_pos, payload['email'], estimated_start, estimated_end, notes)
-    )
+    # Checks and writes in one transaction; the request row is locked so two
+    # concurrent assigns can't both pass the "no active job" check.
+    try:
+        with db.transaction():
+            req = db.fetch_one(
+                "SELECT request_id, status, ufp_file_path FROM print_requests WHERE request_id = %s FOR UPDATE",
+                (request_id,)
+            )
+            if not req:
+                return jsonify({'success': False, 'message': 'Request not found'}), 404
+            if req['status'] not in ('approved',):
+                return jsonify({'success': False, 'message': f'Request must be in "approved" state (currently "{req["status"]}")'}), 409
+            if not req['ufp_file_path']:
+                return jsonify({'success': False, 'message': 'Request has no UFP file — cannot schedule'}), 409
+
+            printer = db.fetch_one("SELECT printer_id, status FROM printers WHERE printer_id = %s", (printer_id,))
+            if not printer:
+                return jsonify({'success': False, 'message': 'Printer not found'}), 404
+            if printer['status'] != 'active':
+                return jsonify({'success': False, 'message': f'Printer is not active (status: {printer["status"]})'}), 409
+
+            existing_job = db.fetch_one(
+                "SELECT job_id FROM print_jobs WHERE request_id = %s AND status NOT IN ('cancelled','failed')",
+                (request_id,)
+            )
+            if existing_job:
+                return jsonify({'success': False, 'message': 'This request already has an active print job'}), 409
 
-    db.execute_query(
-        "UPDATE print_requests SET status = 'queued' WHERE request_id = %s",
-        (request_id,)
-    )
+            job_id = queue_ranks.append_job(printer_id, {
+                'request_id': request_id, 'status': 'queued', 'assigned_by': payload['email'],
+                'estimated_start': estimated_start, 'estimated_end': estimated_end, 'notes': notes,
+            })
+
+            db.execute_query(
+                "UPDATE print_requests SET status = 'queued' WHERE request_id = %s",
+                (request_id,)
+            )
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
+
+    change_bus.publish('job_assigned', job_id=job_id, request_id=request_id, printer_id=printer_id)
 
     return jsonify({
         'success': True,
         'message': 'Request assigned to printer queue',
         'job_id': job_id,
-        'queue_position': next_pos
+        'queue_position': queue_ranks.display_position(job_id)
     }), 201
 
 
@@ -463,16 +527,11 @@ def move_job_to_printer(job_id):
     if not target or target['status'] != 'active':
         return jsonify({'success': False, 'message': 'Target printer not found or not active'}), 400
 
-    pos_row = db.fetch_one(
-        "SELECT COALESCE(MAX(queue_position), 0) + 1 AS next_pos FROM print_jobs "
-        "WHERE printer_id = %s AND status NOT IN ('completed', 'cancelled', 'failed')",
-        (target_printer_id,)
-    )
-    next_pos = pos_row['next_pos'] if pos_row else 1
-    db.execute_query(
-        "UPDATE print_jobs SET printer_id = %s, queue_position = %s WHERE job_id = %s",
-        (target_printer_id, next_pos, job_id)
-    )
+    if queue_ranks.move_to_tail(job_id, target_printer_id) < 0:
+        return jsonify({'success': False, 'message': 'Failed to move job'}), 500
+    change_bus.publish('job_moved', job_id=job_id, request_id=job['request_id'],
+                       printer_id=target_printer_id, from_printer_id=job['printer_id'])
+    next_pos = queue_ranks.display_position(job_id)
     return jsonify({
         'success': True,
         'message': f'Job moved to {target["printer_name"]} (position #{next_pos})',
@@ -495,11 +554,18 @@ def reschedule_printer_jobs():
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
     jobs = (request.json or {}).get('jobs', [])
-    for j in jobs:
-        db.execute_query(
-            "UPDATE print_jobs SET estimated_start = %s, estimated_end = %s WHERE job_id = %s",
-            (j.get('estimated_start'), j.get('estimated_end'), j['job_id'])
-        )
+    # One UPDATE ... CASE statement for the whole batch (atomic on its own)
+    updated = db.update_case(
+        'print_jobs', 'job_id',
+        [{'job_id': j['job_id'],
+          'estimated_start': j.get('estimated_start'),
+          'estimated_end': j.get('estimated_end')} for j in jobs],
+        ['estimated_start', 'estimated_end'],
+    )
+    if updated < 0:
+        return jsonify({'success': False, 'message': 'Failed to reschedule jobs'}), 500
+    if jobs:
+        change_bus.publish('jobs_rescheduled', job_ids=[j['job_id'] for j in jobs])
     return jsonify({'success': True, 'updated': len(jobs)}), 200
 
 
@@ -526,144 +592,142 @@ def update_job_status(job_id):
     if new_status not in valid:
         return jsonify({'success': False, 'message': f'Invalid status. Must be one of: {", ".join(valid)}'}), 400
 
-    job = db.fetch_one(
-        "SELECT job_id, request_id, printer_id, status, attempt_number FROM print_jobs WHERE job_id = %s",
-        (job_id,)
-    )
-    if not job:
-        return jsonify({'success': False, 'message': 'Job not found'}), 404
-
-    # Guard: only one job can be printing per printer
-    if new_status == 'printing':
-        already = db.fetch_one(
-            "SELECT job_id FROM print_jobs "
-            "WHERE printer_id = %s AND status = 'printing' AND job_id != %s",
-            (job['printer_id'], job_id)
-        )
-        if already:
-            return jsonify({
-                'success': False,
-                'message': 'Another job is already printing on this printer. Finish or fail that job first.'
-            }), 400
-
     notes = (data.get('notes') or '').strip() or None
+    note_part = ', notes = %s' if notes else ''
+    MAX_ATTEMPTS = 3
+    response = None
+    student_row = None
 
-    if new_status == 'printing':
-        req_row = db.fetch_one(
-            "SELECT pr.ufp_print_time_minutes FROM print_requests pr "
-            "JOIN print_jobs pj ON pj.request_id = pr.request_id "
-            "WHERE pj.job_id = %s", (job_id,)
-        )
-        mins = (req_row or {}).get('ufp_print_time_minutes') or 0
-        note_part = ', notes = %s' if notes else ''
-        params = (new_status,) + ((notes,) if notes else ()) + (mins, job_id)
-        db.execute_query(
-            f"UPDATE print_jobs SET status = %s {note_part}, "
-            f"started_at = NOW(), "
-            f"print_end_expected = DATE_ADD(NOW(), INTERVAL %s MINUTE), "
-            f"staff_notified = 0 "
-            f"WHERE job_id = %s",
-            params
-        )
-    elif new_status in ('completed', 'failed', 'cancelled'):
-        note_part = ', notes = %s' if notes else ''
-        params = (new_status,) + ((notes,) if notes else ()) + (job_id,)
-        db.execute_query(
-            f"UPDATE print_jobs SET status = %s {note_part}, completed_at = NOW() WHERE job_id = %s",
-            params
-        )
-    else:
-        note_part = ', notes = %s' if notes else ''
-        params = (new_status,) + ((notes,) if notes else ()) + (job_id,)
-        db.execute_query(
-            f"UPDATE print_jobs SET status = %s {note_part} WHERE job_id = %s",
-            params
-        )
-
-    # Failed: retry or send back
-    if new_status == 'failed':
-        attempt = job.get('attempt_number') or 1
-        MAX_ATTEMPTS = 3
-
-        if attempt < MAX_ATTEMPTS:
-            next_attempt = attempt + 1
-            pos_row = db.fetch_one(
-                "SELECT COALESCE(MAX(queue_position), 0) + 1 AS next_pos FROM print_jobs "
-                "WHERE printer_id = %s AND status NOT IN ('completed','cancelled','failed')",
-                (job['printer_id'],)
-            )
-            next_pos = pos_row['next_pos'] if pos_row else 1
-            db.execute_query(
-                """INSERT INTO print_jobs
-                   (request_id, printer_id, queue_position, status, assigned_by, attempt_number)
-                   VALUES (%s, %s, %s, 'queued', %s, %s)""",
-                (job['request_id'], job['printer_id'], next_pos, payload['email'], next_attempt)
-            )
-            db.execute_query(
-                "UPDATE print_requests SET status = 'queued' WHERE request_id = %s",
-                (job['request_id'],)
-            )
-            return jsonify({
-                'success': True,
-                'message': f'Attempt {attempt} failed. Retry #{next_attempt - 1} queued automatically.',
-                'retry': True,
-                'attempt': next_attempt,
-                'attempts_remaining': MAX_ATTEMPTS - next_attempt
-            }), 200
-        else:
-            auto_note = (
-                f"Your print failed after {MAX_ATTEMPTS} attempts. "
-                "Please review your model for printability issues "
-                "(overhangs, thin walls, supports, etc.) and resubmit."
-            )
-            db.execute_query(
-                """UPDATE print_requests
-                   SET status = 'revision_requested',
-                       admin_notes = %s,
-                       unlocked_fields = NULL
-                   WHERE request_id = %s""",
-                (auto_note, job['request_id'])
+    # One transaction for the job + request updates; the job row is locked so
+    # two staff members advancing the same job can't interleave.
+    try:
+        with db.transaction():
+            job = db.fetch_one(
+                "SELECT pj.job_id, pj.request_id, pj.printer_id, pj.status, pj.attempt_number, "
+                "       pr.ufp_print_time_minutes "
+                "FROM print_jobs pj LEFT JOIN print_requests pr ON pr.request_id = pj.request_id "
+                "WHERE pj.job_id = %s FOR UPDATE",
+                (job_id,)
             )
-            return jsonify({
-                'success': True,
-                'message': f'All {MAX_ATTEMPTS} attempts failed. Request sent back to student for revision.',
-                'retry': False,
-                'sent_back': True
-            }), 200
-
-    # All other statuses: mirror to print_requests
-    req_status_map = {
-        'file_transferred': 'queued',
-        'printing':         'printing',
-        'completed':        'completed',
-        'cancelled':        'approved',
-    }
-    db.execute_query(
-        "UPDATE print_requests SET status = %s WHERE request_id = %s",
-        (req_status_map[new_status], job['request_id'])
-    )
+            if not job:
+                return jsonify({'success': False, 'message': 'Job not found'}), 404
+
+            # Guard: only one job can be printing per printer
+            if new_status == 'printing':
+                already = db.fetch_one(
+                    "SELECT job_id FROM print_jobs "
+                    "WHERE printer_id = %s AND status = 'printing' AND job_id != %s FOR UPDATE",
+                    (job['printer_id'], job_id)
+                )
+                if already:
+                    return jsonify({
+                        'success': False,
+                        'message': 'Another job is already printing on this printer. Finish or fail that job first.'
+                    }), 400
+
+            if new_status == 'printing':
+                mins = job.get('ufp_print_time_minutes') or 0
+                params = (new_status,) + ((notes,) if notes else ()) + (mins, job_id)
+                db.execute_query(
+                    f"UPDATE print_jobs SET status = %s {note_part}, "
+                    f"started_at = NOW(), "
+                    f"print_end_expected = DATE_ADD(NOW(), INTERVAL %s MINUTE), "
+                    f"staff_notified = 0 "
+                    f"WHERE job_id = %s",
+                    params
+                )
+            elif new_status in ('completed', 'failed', 'cancelled'):
+                params = (new_status,) + ((notes,) if notes else ()) + (job_id,)
+                db.execute_query(
+                    f"UPDATE print_jobs SET status = %s {note_part}, completed_at = NOW() WHERE job_id = %s",
+                    params
+                )
+            else:
+                params = (new_status,) + ((notes,) if notes else ()) + (job_id,)
+                db.execute_query(
+                    f"UPDATE print_jobs SET status = %s {note_part} WHERE job_id = %s",
+                    params
+                )
+
+            # Failed: retry or send back
+            if new_status == 'failed':
+                attempt = job.get('attempt_number') or 1
+
+                if attempt < MAX_ATTEMPTS:
+                    next_attempt = attempt + 1
+                    queue_ranks.append_job(job['printer_id'], {
+                        'request_id': job['request_id'], 'status': 'queued',
+                        'assigned_by': payload['email'], 'attempt_number': next_attempt,
+                    })
+                    db.execute_query(
+                        "UPDATE print_requests SET status = 'queued' WHERE request_id = %s",
+                        (job['request_id'],)
+                    )
+                    response = {
+                        'success': True,
+                        'message': f'Attempt {attempt} failed. Retry #{next_attempt - 1} queued automatically.',
+                        'retry': True,
+                        'attempt': next_attempt,
+                        'attempts_remaining': MAX_ATTEMPTS - next_attempt
+                    }
+                else:
+                    auto_note = (
+                        f"Your print failed after {MAX_ATTEMPTS} attempts. "
+                        "Please review your model for printability issues "
+                        "(overhangs, thin walls, supports, etc.) and resubmit."
+                    )
+                    db.execute_query(
+                        """UPDATE print_requests
+                           SET status = 'revision_requested',
+                               admin_notes = %s,
+                               revision_fields = NULL
+                           WHERE request_id = %s""",
+                        (auto_note, job['request_id'])
+                    )
+                    response = {
+                        'success': True,
+                        'message': f'All {MAX_ATTEMPTS} attempts failed. Request sent back to student for revision.',
+                        'retry': False,
+                        'sent_back': True
+                    }
+            else:
+                # All other statuses: mirror to print_requests
+                req_status_map = {
+                    'file_transferred': 'queued',
+                    'printing':         'printing',
+                    'completed':        'completed',
+                    'cancelled':        'approved',
+                }
+                completed_part = ', completed_at = NOW()' if new_status == 'completed' else ''
+                db.execute_query(
+                    f"UPDATE print_requests SET status = %s {completed_part} WHERE request_id = %s",
+                    (req_status_map[new_status], job['request_id'])
+                )
+                if new_status == 'completed':
+                    student_row = db.fetch_one(
+                        """SELECT pr.student_email, pr.project_name, pr.service_type, s.full_name
+                           FROM print_requests pr
+                           LEFT JOIN students s ON pr.student_email = s.email
+                           WHERE pr.request_id = %s""",
+                        (job['request_id'],)
+                    )
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
+
+    change_bus.publish('job_status', job_id=job_id, request_id=job['request_id'],
+                       printer_id=job['printer_id'], status=new_status)
+    if response:
+        return jsonify(response), 200
 
     # Notify student on completion
-    if new_status == 'completed':
-        db.execute_query(
-            "UPDATE print_requests SET completed_at = NOW() WHERE request_id = %s",
-            (job['request_id'],)
-        )
-        student_row = db.fetch_one(
-            """SELECT pr.student_email, pr.project_name, pr.service_type, s.full_name
-               FROM print_requests pr
-               LEFT JOIN students s ON pr.student_email = s.email
-               WHERE pr.request_id = %s""",
-            (job['request_id'],)
+    if student_row and student_row.get('student_email'):
+        EmailService.send_print_completed_email(
+            to_email=student_row['student_email'],
+            full_name=student_row.get('full_name') or student_row['student_email'],
+            project_name=student_row.get('project_name') or 'Your project',
+            request_id=job['request_id'],
+            service_type=student_row.get('service_type') or '3dprint',
         )
-        if student_row and student_row.get('student_email'):
-            EmailService.send_print_completed_email(
-                to_email=student_row['student_email'],
-                full_name=student_row.get('full_name') or student_row['student_email'],
-                project_name=student_row.get('project_name') or 'Your project',
-                request_id=job['request_id'],
-                service_type=student_row.get('service_type') or '3dprint',
-            )
 
     return jsonify({'success': True, 'message': f'Job status updated to "{new_status}"'}), 200
 
@@ -710,32 +774,24 @@ def mark_job_notified(job_id):
     current_email = payload['email']
     # Only allow the approver of this request to mark it (prevents spoofing)
     db.execute_update(
-        "UPDATE print_jobs pj "
-        "JOIN print_requests pr ON pr.request_id = pj.request_id "
-        "SET pj.staff_notified = 1 "
-        "WHERE pj.job_id = %s AND pr.reviewed_by = %s AND pj.staff_notified = 0",
+        "UPDATE print_jobs SET staff_notified = 1 "
+        "WHERE job_id = %s AND staff_notified = 0 AND request_id IN "
+        "(SELECT request_id FROM print_requests WHERE reviewed_by = %s)",
         (job_id, current_email)
     )
+    change_bus.publish('job_notified', job_id=job_id)
     return jsonify({'success': True}), 200
 
 
-@admin_bp.route('/api/admin/notifications', methods=['GET'])
-def get_staff_notifications():
-    """Poll endpoint — returns pending notifications for the logged-in staff member."""
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return jsonify({'success': False, 'notifications': []}), 401
-    payload = AuthService.verify_jwt_token(auth_header.split(' ')[1])
-    if not payload or payload.get('user_type') not in ('admin', 'student_staff'):
-        return jsonify({'success': False, 'notifications': []}), 403
+def _claim_staff_notifications(current_email):
+    """Claim and return due notifications for one staff member.
 
+    Only the staff member who approved the request is notified. An atomic
+    UPDATE...WHERE staff_notified=0 claims each notification, so concurrent
+    pollers / streams never deliver the same one twice.
+    """
     now = datetime.datetime.utcnow()
 
-    # Only notify the staff member who originally assigned this job.
-    # Use an atomic UPDATE...WHERE staff_notified=0 to claim the notification
-    # and avoid race conditions where multiple staff members poll simultaneously.
-    current_email = payload['email']
-
     candidate_jobs = db.fetch_all("""
         SELECT pj.job_id, pj.print_end_expected,
                pr.project_name, pr.student_email,
@@ -787,14 +843,181 @@ def get_staff_notifications():
             'message':      message,
         })
 
+    if notifications:
+        change_bus.publish('job_notified', job_ids=[n['job_id'] for n in notifications])
+    return notifications
+
+
+@admin_bp.route('/api/admin/notifications', methods=['GET'])
+def get_staff_notifications():
+    """Poll endpoint — returns pending notifications for the logged-in staff member."""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return jsonify({'success': False, 'notifications': []}), 401
+    payload = AuthService.verify_jwt_token(auth_header.split(' ')[1])
+    if not payload or payload.get('user_type') not in ('admin', 'student_staff'):
+        return jsonify({'success': False, 'notifications': []}), 403
+
+    notifications = _claim_staff_notifications(payload['email'])
     return jsonify({'success': True, 'notifications': notifications}), 200
 
 
+# ── Live stream (SSE) ─────────────────────────────────────────────────────────
+# One shared board snapshot per change_bus version, so N open staff tabs cost
+# one set of board queries per change instead of N. The snapshot is also
+# rebuilt after _BOARD_RESYNC_SECONDS to pick up edits made outside the app.
+
+_STREAM_HEARTBEAT_SECONDS = 15
+_STREAM_NOTIFY_SECONDS    = 30   # same cadence the old pollNotifications used
+_BOARD_RESYNC_SECONDS     = 30
+
+_board_lock     = threading.Lock()
+_board_snapshot = None    # (bus_version, built_at_monotonic, board dict)
+
+_stream_lock    = threading.Lock()
+_stream_clients = 0
+
+
+def _get_board_snapshot():
+    """Return (version, board), rebuilding once per bus version / resync window."""
+    global _board_snapshot
+    with _board_lock:
+        now     = time.monotonic()
+        version = change_bus.version
+        if (_board_snapshot is None
+                or _board_snapshot[0] != version
+                or now - _board_snapshot[1] >= _BOARD_RESYNC_SECONDS):
+            _board_snapshot = (version, now, _build_production_board())
+        return _board_snapshot[0], _board_snapshot[2]
+
+
+def _sse(event, data, event_id=None):
+    """Format one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return '\n'.join(lines) + '\n\n'
+
+
+@admin_bp.route('/api/admin/stream', methods=['GET'])
+def admin_event_stream():
+    """
+    Server-Sent Events feed for the production board and staff notifications.
+    Auth: ?token=<jwt> (EventSource cannot send headers) or Authorization header.
+
+    Events:
+      board         { version, full, ready_to_schedule?, printers, printer_order, removed_printer_ids, changes }
+                    full=true carries the whole board; otherwise only changed parts.
+      notification  same shape as the items returned by /api/admin/notifications
+
+    Event ids are '<epoch>:<version>'. Browsers send the last one back as
+    Last-Event-ID when reconnecting; if nothing changed since, no snapshot is re-sent.
+    Responds 503 when streaming is disabled or full, so clients fall back to polling.
+    """
+    token = request.args.get('token', '')
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        token = auth_header.split(' ')[1]
+    if not token:
+        return jsonify({'success': False, 'message': 'No token provided'}), 401
+    payload = AuthService.verify_jwt_token(token)
+    if not payload or payload.get('user_type') not in ('admin', 'student_staff'):
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    if not Config.SSE_ENABLED:
+        return jsonify({'success': False, 'message': 'Streaming disabled — use polling'}), 503
+
+    global _stream_clients
+    with _stream_lock:
+        if _stream_clients >= Config.SSE_MAX_CLIENTS:
+            return jsonify({'success': False, 'message': 'Too many live streams — use polling'}), 503
+        _stream_clients += 1
+
+    # The stream lives for minutes; borrow a connection per query instead of
+    # pinning one for the whole response
+    db.disable_pinning()
+
+    current_email  = payload['email']
+    resume_version = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    dumps          = current_app.json.dumps
+
+    def _generate():
+        global _stream_clients
+        try:
+            yield 'retry: 3000\n\n'
+            sent_ready    = None
+            sent_printers = {}   # printer_id -> serialized printer as last sent
+            sent_version  = resume_version
+            deadline      = time.monotonic() + Config.SSE_MAX_STREAM_SECONDS
+            next_notify   = time.monotonic()
+
+            version, board = _get_board_snapshot()
+            if resume_version == version:
+                # Client already has this version — remember it without re-sending.
+                sent_ready    = dumps(board['ready_to_schedule'])
+                sent_printers = {p['printer_id']: dumps(p) for p in board['printers']}
+
+            while time.monotonic() < deadline:
+                version, board = _get_board_snapshot()
+                full = sent_ready is None
+                ready_json = dumps(board['ready_to_schedule'])
+                changed, current = [], {}
+                for p in board['printers']:
+                    current[p['printer_id']] = dumps(p)
+                    if full or sent_printers.get(p['printer_id']) != current[p['printer_id']]:
+                        changed.append(p)
+                removed = [pid for pid in sent_printers if pid not in current]
+
+                if full or changed or removed or ready_json != sent_ready:
+                    changes = []
+                    if sent_version is not None:
+                        changes, _complete = change_bus.events_since(sent_version)
+                    delta = {
+                        'version':             version,
+                        'full':                full,
+                        'printers':            changed,
+                        'printer_order':       [p['printer_id'] for p in board['printers']],
+                        'removed_printer_ids': removed,
+                        'changes':             changes,
+                    }
+                    if full or ready_json != sent_ready:
+                        delta['ready_to_schedule'] = board['ready_to_schedule']
+                    yield _sse('board', dumps(delta), format_event_id(version))
+                    sent_ready, sent_printers, sent_version = ready_json, current, version
+
+                if time.monotonic() >= next_notify:
+                    for n in _claim_staff_notifications(current_email):
+                        yield _sse('notification', dumps(n))
+                    next_notify = time.monotonic() + _STREAM_NOTIFY_SECONDS
+
+                wait_for = min(_STREAM_HEARTBEAT_SECONDS,
+                               max(0.0, next_notify - time.monotonic()),
+                               max(0.0, deadline - time.monotonic()))
+                if change_bus.wait(version, wait_for) == version:
+                    yield ': keep-alive\n\n'
+        except PoolTimeout:
+            # Database saturated: end the stream; the client reconnects after
+            # the retry delay (or falls back to polling) instead of holding a slot
+            print('[stream] No database connection free — closing stream')
+        finally:
+            with _stream_lock:
+                _stream_clients -= 1
+
+    return Response(
+        stream_with_context(_generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @admin_bp.route('/api/admin/jobs/reorder', methods=['PATCH'])
 def reorder_printer_queue():
     """
     Reorder jobs in a printer's queue.
-    Body: { printer_id, order: [job_id, job_id, ...] }
+    Body: { job_id, after_job_id? | before_job_id? }  — move one job; only its row is written
+          { printer_id, order: [job_id, job_id, ...] } — full order; re-spaces the whole queue
     """
     auth_header = request.headers.get('Authorization', '')
     if not auth_header.startswith('Bearer '):
@@ -804,16 +1027,26 @@ def reorder_printer_queue():
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
     data       = request.json or {}
+    job_id     = data.get('job_id')
     printer_id = data.get('printer_id')
     order      = data.get('order', [])
-    if not printer_id or not order:
-        return jsonify({'success': False, 'message': 'printer_id and order[] are required'}), 400
 
-    for pos, job_id in enumerate(order, start=1):
-        db.execute_query(
-            "UPDATE print_jobs SET queue_position = %s WHERE job_id = %s AND printer_id = %s",
-            (pos, job_id, printer_id)
-        )
+    try:
+        if job_id:
+            with db.transaction():
+                queue_ranks.place(job_id, data.get('after_job_id'), data.get('before_job_id'))
+                printer_id = db.fetch_one(
+                    "SELECT printer_id FROM print_jobs WHERE job_id = %s", (job_id,)
+                )['printer_id']
+        elif printer_id and order:
+            queue_ranks.rebalance(printer_id, order)
+        else:
+            return jsonify({'success': False, 'message': 'job_id or printer_id and order[] are required'}), 400
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Failed to reorder queue: {str(e)}'}), 500
+    change_bus.publish('queue_reordered', printer_id=printer_id)
 
     return jsonify({'success': True, 'message': 'Queue reordered'}), 200
 
@@ -834,6 +1067,7 @@ def remove_job(job_id):
 
     db.execute_query("UPDATE print_jobs SET status = 'cancelled', completed_at = NOW() WHERE job_id = %s", (job_id,))
     db.execute_query("UPDATE print_requests SET status = 'approved' WHERE request_id = %s", (job['request_id'],))
+    change_bus.publish('job_removed', job_id=job_id, request_id=job['request_id'])
 
     return jsonify({'success': True, 'message': 'Job removed from queue'}), 200
 
@@ -903,6 +1137,7 @@ def admin_add_printer():
          dev_type)
     )
     if result is not None:
+        change_bus.publish('printer_changed', printer_id=result)
         return jsonify({'success': True, 'message': 'Printer added', 'printer_id': result}), 201
     return jsonify({'success': False, 'message': 'Failed to add printer'}), 500
 
@@ -957,6 +1192,7 @@ def admin_update_printer(printer_id):
 
     vals.append(printer_id)
     db.execute_query(f"UPDATE printers SET {', '.join(sets)} WHERE printer_id = %s", tuple(vals))
+    change_bus.publish('printer_changed', printer_id=printer_id)
     return jsonify({'success': True, 'message': 'Printer updated'}), 200
 
 
@@ -976,6 +1212,7 @@ def admin_delete_printer(printer_id):
         return jsonify({'success': False, 'message': 'Printer not found'}), 404
 
     db.execute_query("DELETE FROM printers WHERE printer_id = %s", (printer_id,))
+    change_bus.publish('printer_changed', printer_id=printer_id)
     return jsonify({'success': True, 'message': 'Printer deleted'}), 200
 
 
@@ -1065,10 +1302,15 @@ def admin_delete_admin(email):
     if existing.get('role') == 'super_admin':
         return jsonify({'success': False, 'message': 'The super_admin account cannot be deleted'}), 403
 
-    db.execute_query("DELETE FROM totp_secrets WHERE email = %s AND user_type = 'admin'", (email,))
-    db.execute_query("DELETE FROM password_reset_tokens WHERE email = %s AND user_type = 'admin'", (email,))
-    db.execute_query("DELETE FROM email_verification_codes WHERE email = %s AND user_type = 'admin'", (email,))
-    db.execute_query("DELETE FROM admins WHERE email = %s", (email,))
+    try:
+        with db.transaction():
+            db.execute_query("DELETE FROM totp_secrets WHERE email = %s AND user_type = 'admin'", (email,))
+            db.execute_query("DELETE FROM password_reset_tokens WHERE email = %s AND user_type = 'admin'", (email,))
+            db.execute_query("DELETE FROM email_verification_codes WHERE email = %s AND user_type = 'admin'", (email,))
+            db.execute_query("DELETE FROM admins WHERE email = %s", (email,))
+    except Exception as e:
+        print(f"[ERROR] delete admin {email}: {e}")
+        return jsonify({'success': False, 'message': 'Failed to delete admin'}), 500
     return jsonify({'success': True, 'message': 'Admin deleted'}), 200
 
 
@@ -1095,7 +1337,11 @@ def admin_reset_admin_password(email):
 
 @admin_bp.route('/api/admin/print-requests', methods=['GET'])
 def admin_get_all_requests():
-    """Get all print requests (Admin / Student Staff)"""
+    """Get print requests (Admin / Student Staff).
+
+    Without ?limit every matching request is returned (weekly report, exports);
+    ?limit=N&cursor=... pages by keyset and ?fields=a,b trims the columns.
+    """
     auth_header = request.headers.get('Authorization')
 
     if not auth_header or not auth_header.startswith('Bearer '):
@@ -1113,7 +1359,13 @@ def admin_get_all_requests():
     from_date = request.args.get('from')
     to_date = request.args.get('to')
 
-    result = PrintService.get_all_requests(status, priority, week, from_date, to_date)
+    try:
+        fields, limit, cursor = list_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    result = PrintService.get_all_requests(status, priority, week, from_date, to_date,
+                                           fields, limit, cursor)
 
     if result['success']:
         return jsonify(result), 200
@@ -1239,57 +1491,62 @@ def admin_approve_with_ufp(request_id):
         return jsonify({'success': False, 'message': 'ufp_filename is required'}), 400
 
     try:
-        rows = db.fetch_all(
-            "SELECT status FROM print_requests WHERE request_id = %s",
-            (request_id,)
-        )
-        if not rows:
-            return jsonify({'success': False, 'message': 'Print request not found'}), 404
-
-        current_status = rows[0]['status']
-        if current_status not in ('pending', 'revision_requested'):
-            return jsonify({
-                'success': False,
-                'message': f'Request cannot be approved from status: {current_status}'
-            }), 400
-
-        reviewer_email = payload['email'] if payload.get('user_type') == 'admin' else None
-
-        db.execute_query(
-            """UPDATE print_requests
-               SET status                 = 'approved',
-                   ufp_file_path          = %s,
-                   ufp_original_name      = %s,
-                   ufp_print_time_minutes = %s,
-                   ufp_material_g         = %s,
-                   admin_notes            = %s,
-                   reviewed_by            = %s,
-                   reviewed_at            = NOW()
-               WHERE request_id = %s""",
-            (
-                ufp_filename,
-                ufp_original_name or None,
-                ufp_print_time_minutes,
-                ufp_material_g,
-                admin_notes or None,
-                reviewer_email,
-                request_id
+        # Status check, request update, history row and blob refs commit together
+        with db.transaction():
+            rows = db.fetch_all(
+                "SELECT status, ufp_file_path FROM print_requests WHERE request_id = %s FOR UPDATE",
+                (request_id,)
             )
-        )
+            if not rows:
+                return jsonify({'success': False, 'message': 'Print request not found'}), 404
+
+            current_status = rows[0]['status']
+            if current_status not in ('pending', 'revision_requested'):
+                return jsonify({
+                    'success': False,
+                    'message': f'Request cannot be approved from status: {current_status}'
+                }), 400
 
-        db.execute_query(
-            """INSERT INTO print_request_history
-               (request_id, old_status, new_status, changed_by, change_reason)
-               VALUES (%s, %s, 'approved', %s, %s)""",
-            (
-                request_id,
-                current_status,
-                payload['email'],
-                f'Approved with UFP: {ufp_original_name or ufp_filename}'
-                + (f' | Notes: {admin_notes}' if admin_notes else '')
+            reviewer_email = payload['email'] if payload.get('user_type') == 'admin' else None
+
+            db.execute_query(
+                """UPDATE print_requests
+                   SET status                 = 'approved',
+                       ufp_file_path          = %s,
+                       ufp_original_name      = %s,
+                       ufp_print_time_minutes = %s,
+                       ufp_material_g         = %s,
+                       admin_notes            = %s,
+                       reviewed_by            = %s,
+                       reviewed_at            = NOW()
+                   WHERE request_id = %s""",
+                (
+                    ufp_filename,
+                    ufp_original_name or None,
+                    ufp_print_time_minutes,
+                    ufp_material_g,
+                    admin_notes or None,
+                    reviewer_email,
+                    request_id
+                )
+            )
+
+            db.execute_query(
+                """INSERT INTO print_request_history
+                   (request_id, old_status, new_status, changed_by, change_reason)
+                   VALUES (%s, %s, 'approved', %s, %s)""",
+                (
+                    request_id,
+                    current_status,
+                    payload['email'],
+                    f'Approved with UFP: {ufp_original_name or ufp_filename}'
+                    + (f' | Notes: {admin_notes}' if admin_notes else '')
+                )
             )
-        )
 
+            blob_store.replace(rows[0]['ufp_file_path'], ufp_filename)
+
+        change_bus.publish('request_status', request_id=request_id, status='approved')
         return jsonify({'success': True, 'message': 'Request approved with UFP data'}), 200
 
     except Exception as e:
@@ -1342,55 +1599,60 @@ def admin_approve_with_gcode(request_id):
     cut_time_minutes = _parse_time_to_minutes(estimated_time_str)
 
     try:
-        rows = db.fetch_all(
-            "SELECT status FROM print_requests WHERE request_id = %s",
-            (request_id,)
-        )
-        if not rows:
-            return jsonify({'success': False, 'message': 'Print request not found'}), 404
-
-        current_status = rows[0]['status']
-        if current_status not in ('pending', 'revision_requested'):
-            return jsonify({
-                'success': False,
-                'message': f'Request cannot be approved from status: {current_status}'
-            }), 400
-
-        reviewer_email = payload['email'] if payload.get('user_type') == 'admin' else None
-
-        db.execute_query(
-            """UPDATE print_requests
-               SET status                 = 'approved',
-                   ufp_file_path          = %s,
-                   ufp_original_name      = %s,
-                   admin_notes            = %s,
-                   reviewed_by            = %s,
-                   reviewed_at            = NOW(),
-                   ufp_print_time_minutes = COALESCE(%s, ufp_print_time_minutes)
-               WHERE request_id = %s""",
-            (
-                gcode_filename,
-                gcode_original or None,
-                admin_notes or None,
-                reviewer_email,
-                cut_time_minutes,
-                request_id
+        # Status check, request update, history row and blob refs commit together
+        with db.transaction():
+            rows = db.fetch_all(
+                "SELECT status, ufp_file_path FROM print_requests WHERE request_id = %s FOR UPDATE",
+                (request_id,)
             )
-        )
+            if not rows:
+                return jsonify({'success': False, 'message': 'Print request not found'}), 404
+
+            current_status = rows[0]['status']
+            if current_status not in ('pending', 'revision_requested'):
+                return jsonify({
+                    'success': False,
+                    'message': f'Request cannot be approved from status: {current_status}'
+                }), 400
 
-        db.execute_query(
-            """INSERT INTO print_request_history
-               (request_id, old_status, new_status, changed_by, change_reason)
-               VALUES (%s, %s, 'approved', %s, %s)""",
-            (
-                request_id,
-                current_status,
-                payload['email'],
-                f'Approved with G-code: {gcode_original or gcode_filename}'
-                + (f' | Notes: {admin_notes}' if admin_notes else '')
+            reviewer_email = payload['email'] if payload.get('user_type') == 'admin' else None
+
+            db.execute_query(
+                """UPDATE print_requests
+                   SET status                 = 'approved',
+                       ufp_file_path          = %s,
+                       ufp_original_name      = %s,
+                       admin_notes            = %s,
+                       reviewed_by            = %s,
+                       reviewed_at            = NOW(),
+                       ufp_print_time_minutes = COALESCE(%s, ufp_print_time_minutes)
+                   WHERE request_id = %s""",
+                (
+                    gcode_filename,
+                    gcode_original or None,
+                    admin_notes or None,
+                    reviewer_email,
+                    cut_time_minutes,
+                    request_id
+                )
             )
-        )
 
+            db.execute_query(
+                """INSERT INTO print_request_history
+                   (request_id, old_status, new_status, changed_by, change_reason)
+                   VALUES (%s, %s, 'approved', %s, %s)""",
+                (
+                    request_id,
+                    current_status,
+                    payload['email'],
+                    f'Approved with G-code: {gcode_original or gcode_filename}'
+                    + (f' | Notes: {admin_notes}' if admin_notes else '')
+                )
+            )
+
+            blob_store.replace(rows[0]['ufp_file_path'], gcode_filename)
+
+        change_bus.publish('request_status', request_id=request_id, status='approved')
         return jsonify({'success': True, 'message': 'Laser request approved with G-code'}), 200
 
     except Exception as e:
@@ -1419,6 +1681,21 @@ def admin_get_statistics():
         return jsonify(result), 400
 
 
+@admin_bp.route('/api/admin/cache-stats', methods=['GET'])
+def admin_cache_stats():
+    """Hit/miss counters for the file analysis cache (Admin only)"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return jsonify({'success': False, 'message': 'No token provided'}), 401
+
+    token = auth_header.split(' ')[1]
+    payload = AuthService.verify_jwt_token(token)
+    if not payload or payload.get('user_type') != 'admin':
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    return jsonify({'success': True, 'analysis_cache': analysis_cache.stats()}), 200
+
+
 # ==================== 2FA (TOTP) ENDPOINTS ====================
 
 @admin_bp.route('/api/2fa/status', methods=['GET'])
@@ -1623,7 +1900,8 @@ def get_dashboard_report():
     """
     GET /api/reports/dashboard?from=YYYY-MM-DD&to=YYYY-MM-DD
     GET /api/reports/dashboard?all_time=1
-    Return aggregated stats from print_requests table.
+    Return aggregated stats: totals, materials and per-day counts from the
+    daily_request_stats rollup, students and recent requests from print_requests.
     """
     payload = _get_auth_payload()
     if not payload or payload.get('user_type') not in ('admin', 'professor', 'manager'):
@@ -1639,44 +1917,33 @@ def get_dashboard_report():
         from_date = from_dt.strftime('%Y-%m-%d')
         to_date   = to_dt.strftime('%Y-%m-%d')
 
-    where    = "" if all_time else "WHERE DATE(created_at) BETWEEN %s AND %s"
-    params   = () if all_time else (from_date, to_date)
-    where_pr = "" if all_time else "WHERE DATE(pr.created_at) BETWEEN %s AND %s"
-
     try:
-        summary = db.fetch_one(f"""
-            SELECT
-                COUNT(*) AS total_requests,
-                SUM(status = 'completed') AS completed,
-                SUM(status IN ('queued', 'printing')) AS in_progress,
-                SUM(status = 'pending') AS pending,
-                SUM(status = 'approved') AS approved,
-                SUM(status = 'rejected') AS rejected,
-                SUM(status = 'cancelled') AS cancelled,
-                ROUND(SUM(COALESCE(ufp_print_time_minutes, slicer_time_minutes)) / 60, 1) AS total_print_hours,
-                ROUND(SUM(COALESCE(ufp_material_g, slicer_material_g)), 1) AS total_material_g,
-                COUNT(DISTINCT student_email) AS unique_students
-            FROM print_requests
-            {where}
-        """, params)
+        if all_time:
+            where = where_pr = ""
+            params = ()
+        else:
+            clause, params = day_range('created_at', from_date, to_date)
+            where    = f"WHERE {clause}"
+            where_pr = f"WHERE {day_range('pr.created_at', from_date, to_date)[0]}"
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-        by_material = db.fetch_all(f"""
-            SELECT material_type, COUNT(*) AS count,
-                   ROUND(SUM(COALESCE(ufp_material_g, slicer_material_g)), 1) AS material_g
+    try:
+        # Totals, materials and per-day counts come from the daily rollup
+        # (request_stats); distinct students aren't additive, so they're
+        # counted from print_requests over the same creation range.
+        rollup.sync()
+        range_args = () if all_time else (from_date, to_date)
+        summary = request_stats.report_summary(*range_args)
+        students = db.fetch_one(f"""
+            SELECT COUNT(DISTINCT student_email) AS unique_students
             FROM print_requests
             {where}
-            GROUP BY material_type
-            ORDER BY count DESC
         """, params)
+        summary['unique_students'] = (students or {}).get('unique_students', 0)
 
-        by_day = db.fetch_all(f"""
-            SELECT DATE(created_at) AS day, COUNT(*) AS count,
-                   SUM(status = 'completed') AS completed
-            FROM print_requests
-            {where}
-            GROUP BY DATE(created_at)
-            ORDER BY day
-        """, params)
+        by_material = request_stats.report_by_material(*range_args)
+        by_day = request_stats.report_by_day(*range_args)
 
         top_students = db.fetch_all(f"""
             SELECT pr.student_email, s.full_name,
@@ -1723,3 +1990,30 @@ def get_dashboard_report():
 
     except Exception as e:
         return jsonify({'success': False, 'message': f'Report error: {str(e)}'}), 500
+
+
+@admin_bp.route('/api/reports/rollup-consistency', methods=['GET', 'POST'])
+def check_rollup_consistency():
+    """
+    GET  /api/reports/rollup-consistency — compare daily_request_stats with a
+         full recomputation from print_requests
+    POST /api/reports/rollup-consistency — same, then re-aggregate the days that differ
+    """
+    payload = _get_auth_payload()
+    if not payload or payload.get('user_type') != 'admin':
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    try:
+        result = rollup.reconcile() if request.method == 'POST' else rollup.check_consistency()
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Consistency check failed: {str(e)}'}), 500
+    return jsonify({'success': True, **result}), 200
+
+
+@admin_bp.route('/api/admin/db-pool', methods=['GET'])
+def get_db_pool_metrics():
+    """Database connection pool counters: active / idle, checkout waits, exhaustion, stale reconnects."""
+    payload = _get_auth_payload()
+    if not payload or payload.get('user_type') != 'admin':
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    return jsonify({'success': True, 'pool': db.pool_metrics()}), 200
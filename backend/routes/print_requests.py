@@ -1,12 +1,22 @@
+import mimetypes
 import os
 import re
-import uuid
-from flask import Blueprint, request, jsonify, send_from_directory, current_app, Response
+import threading
+import zlib
+from flask import Blueprint, request, jsonify, send_file, send_from_directory, current_app, Response
 from database import db
 from auth_service import AuthService
-from print_service import PrintService
-from ufp_analysis import analyze_ufp
-from threemf_analysis import analyze_3mf
+from print_service import PrintService, list_args
+from config import Config
+from ufp_analysis import PARSER_VERSION as UFP_PARSER_VERSION
+from threemf_analysis import PARSER_VERSION as THREEMF_PARSER_VERSION
+import analysis_cache
+from analysis_jobs import analysis_jobs
+from upload_store import save_upload, UploadRejected
+import blob_store
+import dxf_preview
+import mesh_preview
+import thumbnails
 
 print_bp = Blueprint('print_requests', __name__)
 
@@ -32,6 +42,9 @@ _LUBAN_TIME_RE = re.compile(r';\s*estimated_time\(s\)\s*[=:]\s*(\d+)', re.IGNORE
 
 _ALLOWED_CNC_EXTS = {'.gcode', '.nc', '.ngc', '.cnc', '.tap'}
 
+# Bump when _parse_gcode_time / its patterns change (invalidates analysis_cache entries)
+_GCODE_PARSER_VERSION = 1
+
 def _seconds_to_hms(seconds: int) -> str:
     h, rem = divmod(seconds, 3600)
     m, s   = divmod(rem, 60)
@@ -64,6 +77,84 @@ def _parse_gcode_time(file_path: str):
     return None
 
 
+# ── Slicer file analysis (background jobs) ───────────────────────────────────
+_SLICER_ANALYSIS_FIELDS = (
+    'slicer',                 # 3MF only
+    'print_time',
+    'material_weight_g',
+    'material_length_mm',
+    'layer_height',
+    'infill_sparse_density',
+    'material_type',
+    'printer_name',
+)
+
+
+def _slicer_upload_body(result: dict, stored: dict, original_name: str) -> dict:
+    """Upload response body for a UFP / 3MF parser result."""
+    if not result.get('success'):
+        if not stored['deduplicated']:  # a shared blob is left to the cleanup job
+            try:
+                os.remove(stored['path'])
+            except OSError:
+                pass
+        return result
+    return {
+        'success':       True,
+        'filename':      stored['filename'],
+        'original_name': original_name,
+        'analysis':      {k: result[k] for k in _SLICER_ANALYSIS_FIELDS if k in result},
+    }
+
+
+def _respond_with_analysis(parser: str, version: int, stored: dict, original_name: str, owner: str):
+    """Answer from the analysis cache (201), or queue a background job (202 + job_id)."""
+    cached = analysis_cache.lookup(parser, version, stored['sha256'])
+    if cached is not None:
+        return jsonify(_slicer_upload_body(cached, stored, original_name)), 201
+
+    def finish(result):
+        analysis_cache.store(parser, version, stored['sha256'], result)
+        return _slicer_upload_body(result, stored, original_name)
+
+    job_id = analysis_jobs.submit(parser, stored['path'], owner, finish=finish)
+    return jsonify({
+        'success':       True,
+        'status':        'queued',
+        'job_id':        job_id,
+        'filename':      stored['filename'],
+        'original_name': original_name,
+    }), 202
+
+
+@print_bp.route('/api/print-requests/analysis-jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id: str):
+    """Poll a background analysis job started by upload-ufp / upload-3mf.
+
+    202 while queued/running; then the same body the upload would have returned
+    (200 on success, 400 when the file could not be analyzed).
+    """
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return jsonify({'success': False, 'message': 'No token provided'}), 401
+
+    token = auth_header.split(' ')[1]
+    payload = AuthService.verify_jwt_token(token)
+    if not payload:
+        return jsonify({'success': False, 'message': 'Invalid token'}), 401
+
+    job = analysis_jobs.get(job_id)
+    if not job or (job['owner'] != payload.get('email')
+                   and payload.get('user_type') not in ('admin', 'student_staff')):
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+
+    if job['status'] in ('queued', 'running'):
+        return jsonify({'success': True, 'status': job['status'], 'job_id': job_id}), 202
+
+    body = {**job['result'], 'status': job['status'], 'job_id': job_id}
+    return jsonify(body), 200 if job['result'].get('success') else 400
+
+
 # ==================== 3D PRINT REQUEST ENDPOINTS ====================
 
 @print_bp.route('/api/print-requests/upload-stl', methods=['POST'])
@@ -89,10 +180,15 @@ def upload_stl():
     if not original_name.lower().endswith('.stl'):
         return jsonify({'success': False, 'message': 'Only .stl files are allowed'}), 400
 
-    # Save as uuid.stl to avoid filename collisions
-    saved_name = f"{uuid.uuid4().hex}.stl"
-    save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], saved_name)
-    file.save(save_path)
+    # Stored under its content hash, so re-uploading the same STL costs no disk
+    try:
+        stored = save_upload(file, '.stl')
+    except UploadRejected as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    saved_name = stored['filename']
+
+    # Build the compact viewer mesh in the background (see serve_upload_mesh)
+    _start_render(mesh_preview, stored['path'], payload.get('email'))
 
     return jsonify({
         'success': True,
@@ -132,6 +228,10 @@ def delete_uploaded_stl(filename: str):
     if not os.path.exists(abs_file_path):
         return jsonify({'success': True, 'message': 'File already deleted'}), 200
 
+    # Blobs can be shared with submitted requests; cleanup removes them once unreferenced
+    if blob_store.is_tracked(safe_name):
+        return jsonify({'success': True, 'message': 'File deleted'}), 200
+
     try:
         os.remove(abs_file_path)
         return jsonify({'success': True, 'message': 'File deleted'}), 200
@@ -167,9 +267,16 @@ def upload_laser():
     if ext not in LASER_ALLOWED_EXTENSIONS:
         return jsonify({'success': False, 'message': 'Only .svg, .dxf, or .pdf files are allowed'}), 400
 
-    saved_name = f"{uuid.uuid4().hex}{ext}"
-    save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], saved_name)
-    file.save(save_path)
+    try:
+        stored = save_upload(file, ext)
+    except UploadRejected as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    saved_name = stored['filename']
+
+    if ext == '.dxf':
+        # Render the preview now so the first staff member to open the request
+        # doesn't wait for it
+        _start_dxf_preview(stored['path'], payload.get('email'))
 
     return jsonify({
         'success': True,
@@ -203,6 +310,10 @@ def delete_uploaded_laser(filename: str):
     if not os.path.exists(abs_file_path):
         return jsonify({'success': True, 'message': 'File already deleted'}), 200
 
+    # Blobs can be shared with submitted requests; cleanup removes them once unreferenced
+    if blob_store.is_tracked(safe_name):
+        return jsonify({'success': True, 'message': 'File deleted'}), 200
+
     try:
         os.remove(abs_file_path)
         return jsonify({'success': True, 'message': 'File deleted'}), 200
@@ -216,6 +327,8 @@ def upload_ufp():
 
     The .ufp is a ZIP archive produced by Cura. We extract print.json from it
     to read the exact print time and material usage the slicer calculated.
+    Parsing runs as a background job: 202 + job_id (poll get_analysis_job),
+    or 201 straight away when this content was analyzed before.
     """
     auth_header = request.headers.get('Authorization')
     if not auth_header or not auth_header.startswith('Bearer '):
@@ -237,40 +350,14 @@ def upload_ufp():
     if not original_name.lower().endswith('.ufp'):
         return jsonify({'success': False, 'message': 'Only .ufp files are allowed'}), 400
 
-    # Size limit: 100 MB (UFP contains G-code which can be large)
-    file.seek(0, 2)
-    size = file.tell()
-    file.seek(0)
-    if size > 100 * 1024 * 1024:
-        return jsonify({'success': False, 'message': 'File exceeds 100 MB limit'}), 400
-
-    saved_name = f"{uuid.uuid4().hex}.ufp"
-    save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], saved_name)
-    file.save(save_path)
+    # Streamed to disk with a 100 MB cap (UFP contains G-code which can be large)
+    try:
+        stored = save_upload(file, '.ufp')
+    except UploadRejected as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-    result = analyze_ufp(save_path)
-
-    if not result.get('success'):
-        try:
-            os.remove(save_path)
-        except OSError:
-            pass
-        return jsonify(result), 400
-
-    return jsonify({
-        'success':       True,
-        'filename':      saved_name,
-        'original_name': original_name,
-        'analysis': {
-            'print_time':            result['print_time'],
-            'material_weight_g':     result['material_weight_g'],
-            'material_length_mm':    result['material_length_mm'],
-            'layer_height':          result['layer_height'],
-            'infill_sparse_density': result['infill_sparse_density'],
-            'material_type':         result['material_type'],
-            'printer_name':          result['printer_name'],
-        }
-    }), 201
+    _start_render(thumbnails, stored['path'], payload['email'])
+    return _respond_with_analysis('ufp', UFP_PARSER_VERSION, stored, original_name, payload['email'])
 
 
 @print_bp.route('/api/print-requests/upload-ufp/<filename>', methods=['DELETE'])
@@ -294,6 +381,10 @@ def delete_uploaded_ufp(filename: str):
     if not os.path.exists(abs_file_path):
         return jsonify({'success': True, 'message': 'File already deleted'}), 200
 
+    # Blobs can be shared with submitted requests; cleanup removes them once unreferenced
+    if blob_store.is_tracked(safe_name):
+        return jsonify({'success': True, 'message': 'File deleted'}), 200
+
     try:
         os.remove(abs_file_path)
         return jsonify({'success': True, 'message': 'File deleted'}), 200
@@ -301,10 +392,118 @@ def delete_uploaded_ufp(filename: str):
         return jsonify({'success': False, 'message': 'Failed to delete file'}), 500
 
 
+_IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+
+def _upload_etag(stored_name: str, st: os.stat_result) -> str:
+    """Strong validator for a stored upload: blob names are the content hash
+    itself; legacy uuid names never change content, so mtime + size is enough."""
+    if blob_store.is_blob_name(stored_name):
+        return stored_name.split('.', 1)[0]
+    return f'{st.st_mtime_ns:x}-{st.st_size:x}'
+
+
 @print_bp.route('/api/uploads/<filename>', methods=['GET'])
 def serve_upload(filename: str):
-    """Serve uploaded STL / UFP / 3MF files"""
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+    """Serve uploaded STL / UFP / 3MF files.
+
+    A stored name's bytes never change, so responses carry a strong ETag and an
+    immutable Cache-Control; If-None-Match gets a 304 and Range gets a 206.
+    With UPLOAD_SENDFILE_MODE set, the front proxy streams the bytes instead.
+    """
+    upload_dir = current_app.config['UPLOAD_FOLDER']
+    # Dotfiles are in-progress uploads / temp renders (see upload_store)
+    if os.path.basename(filename) != filename or filename.startswith('.'):
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+
+    file_path = os.path.join(upload_dir, filename)
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+    etag = _upload_etag(filename, st)
+
+    if Config.UPLOAD_SENDFILE_MODE == 'x-accel':
+        # nginx serves the internal location (and handles Range); we only answer 304s
+        resp = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        resp.headers['X-Accel-Redirect'] = Config.UPLOAD_ACCEL_PREFIX.rstrip('/') + '/' + filename
+        resp.set_etag(etag)
+        resp = resp.make_conditional(request)
+    else:
+        # Also covers 'x-sendfile': app.config['USE_X_SENDFILE'] makes send_file emit the header
+        resp = send_file(file_path, conditional=True, etag=etag)
+    resp.headers['Cache-Control'] = _IMMUTABLE_CACHE_CONTROL
+    return resp
+
+
+@print_bp.route('/api/uploads/<filename>/mesh', methods=['GET'])
+def serve_upload_mesh(filename: str):
+    """Compact indexed mesh of an uploaded STL for the 3D viewer (see mesh_preview).
+
+    ?lod=N picks a level (0 = full detail); without it the coarsest level is sent
+    so the viewer can paint early and then fetch lod=0. Returns 202 while the mesh
+    is still being built — the viewer then loads the raw STL instead.
+    """
+    if os.path.basename(filename) != filename or filename.startswith('.') \
+            or not filename.lower().endswith('.stl'):
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+
+    levels = mesh_preview.lod_count(file_path)
+    if not levels:
+        failure = mesh_preview.recent_failure(file_path)
+        if failure:
+            return jsonify({'success': False, 'message': failure}), 404
+        _start_render(mesh_preview, file_path, '')
+        return jsonify({'success': False, 'status': 'queued',
+                        'message': 'Mesh is being prepared'}), 202
+
+    lod = request.args.get('lod', type=int)
+    lod = levels - 1 if lod is None else max(0, min(lod, levels - 1))
+    etag = f'{_upload_etag(filename, st)}-m{mesh_preview.MESH_VERSION}-l{lod}'
+    return _send_gzipped(mesh_preview.preview_path(file_path, lod),
+                         'application/octet-stream', etag, _IMMUTABLE_CACHE_CONTROL)
+
+
+@print_bp.route('/api/uploads/<filename>/thumbnail', methods=['GET'])
+def serve_upload_thumbnail(filename: str):
+    """PNG thumbnail embedded in an uploaded UFP / 3MF / G-code file (see thumbnails).
+
+    ?size=small (96 px, default) or large (256 px). Extracted once per file; a
+    missing thumbnail is extracted on first request (bounded wait), then 404s
+    for files that carry none.
+    """
+    size = request.args.get('size', 'small')
+    if size not in thumbnails.SIZES or os.path.basename(filename) != filename \
+            or filename.startswith('.') or not thumbnails.thumbnail_url(filename):
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+
+    out = thumbnails.preview_path(file_path, size)
+    if not os.path.exists(thumbnails.preview_path(file_path)):
+        failure = thumbnails.recent_failure(file_path)
+        if failure:
+            return jsonify({'success': False, 'message': failure}), 404
+        job_id = _start_render(thumbnails, file_path, '')
+        job = analysis_jobs.wait(job_id, Config.THUMBNAIL_WAIT_SECONDS) if job_id else None
+        if not os.path.exists(out):
+            message = (job or {}).get('result') or {'message': 'Thumbnail is being prepared'}
+            return jsonify({'success': False, 'message': message.get('message')}), 404
+
+    etag = f'{_upload_etag(filename, st)}-t{thumbnails.THUMB_VERSION}-{size}'
+    resp = send_file(out, mimetype='image/png', conditional=True, etag=etag)
+    resp.headers['Cache-Control'] = _IMMUTABLE_CACHE_CONTROL
+    return resp
 
 
 # ==================== 3MF UPLOAD ====================
@@ -314,6 +513,7 @@ def upload_3mf():
     """Upload a .3mf (sliced) file and return slicer estimates.
 
     Supports Bambu Studio, OrcaSlicer, PrusaSlicer, SuperSlicer, and Cura 3MF exports.
+    Same 202 / 201 contract as upload_ufp.
     """
     auth_header = request.headers.get('Authorization')
     if not auth_header or not auth_header.startswith('Bearer '):
@@ -335,41 +535,14 @@ def upload_3mf():
     if not original_name.lower().endswith('.3mf'):
         return jsonify({'success': False, 'message': 'Only .3mf files are allowed'}), 400
 
-    # Size limit: 200 MB (Bambu 3MF files include G-code and can be large)
-    file.seek(0, 2)
-    size = file.tell()
-    file.seek(0)
-    if size > 200 * 1024 * 1024:
-        return jsonify({'success': False, 'message': 'File exceeds 200 MB limit'}), 400
-
-    saved_name = f"{uuid.uuid4().hex}.3mf"
-    save_path  = os.path.join(current_app.config['UPLOAD_FOLDER'], saved_name)
-    file.save(save_path)
-
-    result = analyze_3mf(save_path)
-
-    if not result.get('success'):
-        try:
-            os.remove(save_path)
-        except OSError:
-            pass
-        return jsonify(result), 400
+    # Streamed to disk with a 200 MB cap (Bambu 3MF files include G-code and can be large)
+    try:
+        stored = save_upload(file, '.3mf')
+    except UploadRejected as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-    return jsonify({
-        'success':       True,
-        'filename':      saved_name,
-        'original_name': original_name,
-        'analysis': {
-            'slicer':                result['slicer'],
-            'print_time':            result['print_time'],
-            'material_weight_g':     result['material_weight_g'],
-            'material_length_mm':    result['material_length_mm'],
-            'layer_height':          result['layer_height'],
-            'infill_sparse_density': result['infill_sparse_density'],
-            'material_type':         result['material_type'],
-            'printer_name':          result['printer_name'],
-        }
-    }), 201
+    _start_render(thumbnails, stored['path'], payload['email'])
+    return _respond_with_analysis('3mf', THREEMF_PARSER_VERSION, stored, original_name, payload['email'])
 
 
 @print_bp.route('/api/print-requests/upload-3mf/<filename>', methods=['DELETE'])
@@ -393,6 +566,10 @@ def delete_uploaded_3mf(filename: str):
     if not os.path.exists(abs_file_path):
         return jsonify({'success': True, 'message': 'File already deleted'}), 200
 
+    # Blobs can be shared with submitted requests; cleanup removes them once unreferenced
+    if blob_store.is_tracked(safe_name):
+        return jsonify({'success': True, 'message': 'File deleted'}), 200
+
     try:
         os.remove(abs_file_path)
         return jsonify({'success': True, 'message': 'File deleted'}), 200
@@ -429,19 +606,19 @@ def upload_gcode():
             'message': f'Only {", ".join(sorted(_ALLOWED_CNC_EXTS))} files are allowed'
         }), 400
 
-    # Size limit: 50 MB
-    file.seek(0, 2)
-    size = file.tell()
-    file.seek(0)
-    if size > 50 * 1024 * 1024:
-        return jsonify({'success': False, 'message': 'File exceeds 50 MB limit'}), 400
-
     # Keep original extension when saving
-    saved_name = f"{uuid.uuid4().hex}{file_ext}"
-    save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], saved_name)
-    file.save(save_path)
-
-    estimated_time = _parse_gcode_time(save_path)
+    try:
+        stored = save_upload(file, file_ext)
+    except UploadRejected as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    saved_name = stored['filename']
+    save_path  = stored['path']
+
+    estimated_time = analysis_cache.get_or_compute(
+        'gcode_time', _GCODE_PARSER_VERSION, stored['sha256'],
+        lambda: {'success': True, 'estimated_time': _parse_gcode_time(save_path)}
+    )['estimated_time']
+    _start_render(thumbnails, save_path, payload['email'])
 
     return jsonify({
         'success': True,
@@ -472,6 +649,10 @@ def delete_uploaded_gcode(filename: str):
     if not os.path.exists(abs_file_path):
         return jsonify({'success': True, 'message': 'File already deleted'}), 200
 
+    # Blobs can be shared with submitted requests; cleanup removes them once unreferenced
+    if blob_store.is_tracked(safe_name):
+        return jsonify({'success': True, 'message': 'File deleted'}), 200
+
     try:
         os.remove(abs_file_path)
         return jsonify({'success': True, 'message': 'File deleted'}), 200
@@ -527,7 +708,11 @@ def create_print_request():
 
 @print_bp.route('/api/print-requests/my-requests', methods=['GET'])
 def get_my_requests():
-    """Get all print requests for the authenticated student"""
+    """Get print requests for the authenticated student.
+
+    Optional ?fields=a,b projection and ?limit=N&cursor=... keyset paging
+    (see PrintService.get_student_requests).
+    """
     auth_header = request.headers.get('Authorization')
 
     if not auth_header or not auth_header.startswith('Bearer '):
@@ -540,7 +725,11 @@ def get_my_requests():
         return jsonify({'success': False, 'message': 'Invalid token or not a student'}), 401
 
     status = request.args.get('status')
-    result = PrintService.get_student_requests(payload['email'], status)
+    try:
+        fields, limit, cursor = list_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    result = PrintService.get_student_requests(payload['email'], status, fields, limit, cursor)
 
     if result['success']:
         return jsonify(result), 200
@@ -674,11 +863,94 @@ def get_request_history(request_id):
 
 # ==================== DESIGN FILE PREVIEW ====================
 
+# Derived files (DXF previews, compact meshes) are built at most once per upload:
+# callers look up / start the job under a striped lock and then wait on the same
+# job id. `renderer` is the dxf_preview or mesh_preview module, whose name is
+# also its analysis_worker parser.
+_RENDER_LOCKS = [threading.Lock() for _ in range(32)]
+_render_jobs  = {}   # (parser, file path) -> job_id of the in-flight render
+
+
+def _render_lock(file_path: str) -> threading.Lock:
+    return _RENDER_LOCKS[zlib.crc32(file_path.encode('utf-8')) % len(_RENDER_LOCKS)]
+
+
+def _start_render(renderer, file_path: str, owner: str, **submit_kwargs):
+    """Return the job id building file_path's derived file, starting one if needed
+    (None when it already exists)."""
+    key = (renderer.__name__, file_path)
+    with _render_lock(file_path):
+        if os.path.exists(renderer.preview_path(file_path)):
+            return None
+        job_id = _render_jobs.get(key)
+        if job_id and analysis_jobs.get(job_id):
+            return job_id
+
+        def finish(result):
+            if not result.get('success'):
+                renderer.mark_failed(file_path, result.get('message') or 'Rendering failed')
+            with _render_lock(file_path):
+                _render_jobs.pop(key, None)
+            return result
+
+        job_id = analysis_jobs.submit(renderer.__name__, file_path, owner, finish=finish, **submit_kwargs)
+        _render_jobs[key] = job_id
+        return job_id
+
+
+def _start_dxf_preview(file_path: str, owner: str):
+    return _start_render(dxf_preview, file_path, owner,
+                         timeout=Config.DXF_PREVIEW_TIMEOUT_SECONDS,
+                         options={'max_entities': Config.DXF_PREVIEW_MAX_ENTITIES})
+
+
+def _send_gzipped(path: str, mimetype: str, etag: str, cache_control: str):
+    """Serve a stored .gz file as-is (Content-Encoding: gzip) or inflated for
+    clients that don't accept gzip; If-None-Match is answered before reading it."""
+    gzip_ok = 'gzip' in request.accept_encodings
+    if gzip_ok:
+        etag += '-gz'
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        with open(path, 'rb') as f:
+            body = f.read()
+        resp = Response(body if gzip_ok else zlib.decompress(body, 16 + zlib.MAX_WBITS),
+                        mimetype=mimetype)
+        if gzip_ok:
+            resp.headers['Content-Encoding'] = 'gzip'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = cache_control
+    resp.set_etag(etag)
+    return resp
+
+
+def _serve_dxf_preview(file_path: str, stored_name: str, owner: str):
+    """Serve the stored gzipped SVG preview, rendering it first if it is missing."""
+    out = dxf_preview.preview_path(file_path)
+    if not os.path.exists(out):
+        failure = dxf_preview.recent_failure(file_path)
+        if failure:
+            return jsonify({'success': False, 'message': failure}), 500
+        job_id = _start_dxf_preview(file_path, owner)
+        if job_id:
+            job = analysis_jobs.wait(job_id, Config.DXF_PREVIEW_TIMEOUT_SECONDS + 5)
+            result = job['result'] if job else None
+            if result is None:
+                return jsonify({'success': False, 'message': 'DXF preview is still rendering, try again shortly'}), 503
+            if not result.get('success'):
+                return jsonify(result), 500
+
+    etag = f'{_upload_etag(stored_name, os.stat(out))}-p{dxf_preview.PREVIEW_VERSION}'
+    # Same URL can point at a different file after a resubmission — always revalidate
+    return _send_gzipped(out, 'image/svg+xml', etag, 'private, no-cache')
+
+
 @print_bp.route('/api/print-requests/<int:request_id>/preview-design', methods=['GET'])
 def preview_design(request_id):
     """Convert and return the design file as SVG/inline for preview.
     - SVG  → served directly
-    - DXF  → converted to SVG via ezdxf
+    - DXF  → converted to SVG via ezdxf once, then served from the stored preview
     - PDF  → served as application/pdf (browser renders inline)
     """
     auth_header = request.headers.get('Authorization')
@@ -714,41 +986,8 @@ def preview_design(request_id):
         return send_from_directory(upload_dir, stored_name, mimetype='application/pdf')
 
     elif ext == 'dxf':
-        try:
-            import ezdxf
-            from ezdxf.addons.drawing import RenderContext, Frontend
-            from ezdxf.addons.drawing.svg import SVGBackend
-
-            doc = ezdxf.readfile(file_path)
-            msp = doc.modelspace()
-            ctx = RenderContext(doc)
-
-            # Suppress font errors (no system fonts on Railway)
-            config = None
-            try:
-                from ezdxf.addons.drawing.config import Configuration, TextPolicy
-                for policy_name in ('IGNORE', 'SUBSTITUTE', 'REPLACE', 'FILLING'):
-                    policy = getattr(TextPolicy, policy_name, None)
-                    if policy is not None:
-                        config = Configuration.defaults().with_changes(text_policy=policy)
-                        break
-            except Exception:
-                pass
-
-            backend = SVGBackend()
-            frontend = Frontend(ctx, backend, config=config) if config else Frontend(ctx, backend)
-
-            # draw_layout renders geometry and calls backend.finalize() (finalize=True by default)
-            frontend.draw_layout(msp)
-
-            # Page(width_mm, height_mm) — A3 landscape, Settings go to get_string separately
-            from ezdxf.addons.drawing.layout import Page, Settings
-            page = Page(420, 297)
-            svg_string = backend.get_string(page, settings=Settings(fit_page=True))
-
-            return Response(svg_string, mimetype='image/svg+xml')
-        except Exception as exc:
-            return jsonify({'success': False, 'message': f'DXF preview failed: {exc}'}), 500
+        # Rendered once in an analysis worker process and stored gzipped
+        return _serve_dxf_preview(file_path, stored_name, payload.get('email'))
 
     else:
         return jsonify({'success': False, 'message': f'Preview not supported for .{ext} files'}), 415
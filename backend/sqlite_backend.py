@@ -0,0 +1,505 @@
+"""
+SQLite backend
+Runs the app on a local SQLite file or in-memory database instead of MySQL, so
+it can be developed, load-tested and benchmarked on one machine without a
+database server. Select it with DB_BACKEND=sqlite and SQLITE_PATH (a file, or
+':memory:'); database._make_pool() then hands out SQLiteConnection objects
+from the same BlockingPool the MySQL backend uses, and Database and every
+caller stay unchanged.
+
+Queries are written for MySQL; translate() rewrites the MySQL-isms this code
+base uses:
+
+    %s placeholders                      → ?
+    NOW() / CURRENT_DATE() / CURDATE()   → datetime('now', 'localtime') / date(...)
+    DATE_ADD / DATE_SUB(x, INTERVAL n U) → datetime(x, n || ' units')
+    FIELD(x, a, b, ...)                  → CASE x WHEN a THEN 1 WHEN b THEN 2 ... ELSE 0 END
+    GREATEST / LEAST                     → MAX / MIN
+    CAST(x AS SIGNED)                    → CAST(x AS INTEGER)
+    ON DUPLICATE KEY UPDATE c = VALUES(c) → ON CONFLICT (key) DO UPDATE SET c = excluded.c
+    SELECT ... FOR UPDATE                → dropped; transactions take the write
+                                           lock up front with BEGIN IMMEDIATE
+
+SUM(condition) needs no rewrite: SQLite comparisons already evaluate to 0 / 1.
+The upsert's conflict target is the first primary / unique key of the table
+(taken from the schema files) whose columns the INSERT supplies, so SQLite
+3.24 (the first with upsert) is enough; make_pool() refuses anything older.
+
+load_schema() builds the tables from database/schema.sql plus the migrations
+in file order. ENUM columns become TEXT without a value check, ON UPDATE
+CURRENT_TIMESTAMP becomes an AFTER UPDATE trigger, MODIFY COLUMN is skipped
+(SQLite columns are not strictly typed) and data statements are skipped — on a
+new database there are no rows to backfill.
+
+Known differences from MySQL: rowcount counts matched rather than changed
+rows, and only columns declared DATE / DATETIME / TIMESTAMP / DECIMAL come
+back as date / datetime / Decimal — computed expressions such as
+DATE(created_at) are returned as strings.
+"""
+
+import datetime
+import decimal
+import glob
+import os
+import re
+import sqlite3
+import sys
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+from config import Config
+from db_pool import BlockingPool
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database')
+MIN_SQLITE_VERSION = (3, 24, 0)     # INSERT ... ON CONFLICT (key) DO UPDATE
+
+_NOW   = "datetime('now', 'localtime')"
+_TODAY = "date('now', 'localtime')"
+_UNITS = {'SECOND': 'seconds', 'MINUTE': 'minutes', 'HOUR': 'hours',
+          'DAY': 'days', 'MONTH': 'months', 'YEAR': 'years'}
+
+# migration_015 drops this foreign key from a stored procedure, which
+# load_schema() cannot run, so the key is left out when the table is created
+_DROPPED_FOREIGN_KEYS = {('print_requests', 'student_email')}
+
+# Columns the code relies on that the deployed database has but no migration
+# creates; added after the migrations have run
+_UNMIGRATED_COLUMNS = [
+    ('printers', "device_type VARCHAR(20) NOT NULL DEFAULT '3dprint'"),
+]
+
+
+# ── Value conversion ──────────────────────────────────────────────────────────
+
+def _convert(parse):
+    def _fn(raw):
+        text = raw.decode()
+        try:
+            return parse(text)
+        except ValueError:
+            return text
+    return _fn
+
+sqlite3.register_adapter(datetime.datetime, lambda v: v.isoformat(' '))
+sqlite3.register_adapter(datetime.date, lambda v: v.isoformat())
+sqlite3.register_adapter(decimal.Decimal, str)
+sqlite3.register_converter('TIMESTAMP', _convert(datetime.datetime.fromisoformat))
+sqlite3.register_converter('DATETIME', _convert(datetime.datetime.fromisoformat))
+sqlite3.register_converter('DATE', _convert(datetime.date.fromisoformat))
+sqlite3.register_converter('DECIMAL', _convert(decimal.Decimal))
+
+
+# ── Query translation ─────────────────────────────────────────────────────────
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_MASKED  = re.compile(r"\x00(\d+)\x00")
+
+
+def _mask(sql: str) -> Tuple[str, List[str]]:
+    """Swap string literals for \\x00N\\x00 markers so rewrites can't touch them."""
+    literals = []
+    def _keep(m):
+        literals.append(m.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+    return _LITERAL.sub(_keep, sql), literals
+
+
+def _unmask(sql: str, literals: List[str]) -> str:
+    return _MASKED.sub(lambda m: literals[int(m.group(1))], sql)
+
+
+def _split_args(sql: str, start: int) -> Tuple[List[str], int]:
+    """Split the argument list opening just before `start` on top-level commas.
+    Returns (args, index after the closing parenthesis)."""
+    args, depth, begin = [], 0, start
+    for i in range(start, len(sql)):
+        c = sql[i]
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            if depth == 0:
+                args.append(sql[begin:i].strip())
+                return args, i + 1
+            depth -= 1
+        elif c == ',' and depth == 0:
+            args.append(sql[begin:i].strip())
+            begin = i + 1
+    raise ValueError(f"Unbalanced parentheses in: {sql[:80]}...")
+
+
+def _rewrite_calls(sql: str, name: str, fn: Callable[[List[str]], str]) -> str:
+    """Replace every NAME(args) call with fn(args), inner calls first."""
+    pattern = re.compile(rf"\b{name}\s*\(", re.IGNORECASE)
+    out, pos = [], 0
+    while True:
+        m = pattern.search(sql, pos)
+        if not m:
+            out.append(sql[pos:])
+            return ''.join(out)
+        args, end = _split_args(sql, m.end())
+        out.append(sql[pos:m.start()])
+        out.append(fn([_rewrite_calls(a, name, fn) for a in args]))
+        pos = end
+
+
+def _date_shift(sign: str):
+    def _fn(args):
+        m = len(args) == 2 and re.fullmatch(r"INTERVAL\s+(.+?)\s+(\w+)", args[1],
+                                             re.IGNORECASE | re.DOTALL)
+        if not m or m.group(2).upper() not in _UNITS:
+            raise ValueError(f"Unsupported interval: {', '.join(args)}")
+        amount, unit = m.group(1), _UNITS[m.group(2).upper()]
+        return f"datetime({args[0]}, ({sign}({amount})) || ' {unit}')"
+    return _fn
+
+
+def _field(args):
+    whens = ' '.join(f"WHEN {a} THEN {i}" for i, a in enumerate(args[1:], start=1))
+    return f"(CASE {args[0]} {whens} ELSE 0 END)"
+
+
+@lru_cache(maxsize=1024)
+def translate(query: str) -> str:
+    """Rewrite a MySQL query for SQLite (see the module docstring)."""
+    sql, literals = _mask(query)
+    sql = _rewrite_calls(sql, 'NOW', lambda args: _NOW)
+    sql = _rewrite_calls(sql, 'CURRENT_DATE', lambda args: _TODAY)
+    sql = _rewrite_calls(sql, 'CURDATE', lambda args: _TODAY)
+    sql = _rewrite_calls(sql, 'DATE_ADD', _date_shift(''))
+    sql = _rewrite_calls(sql, 'DATE_SUB', _date_shift('-'))
+    sql = _rewrite_calls(sql, 'FIELD', _field)
+    sql = _rewrite_calls(sql, 'GREATEST', lambda args: f"MAX({', '.join(args)})")
+    sql = _rewrite_calls(sql, 'LEAST', lambda args: f"MIN({', '.join(args)})")
+    sql = re.sub(r"\bAS\s+(?:UN)?SIGNED\b", "AS INTEGER", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\s+FOR\s+UPDATE\b", "", sql, flags=re.IGNORECASE)
+    upsert = re.search(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", sql, re.IGNORECASE)
+    if upsert:
+        assignments = re.sub(r"\bVALUES\s*\(\s*(\w+)\s*\)", r"excluded.\1",
+                             sql[upsert.end():], flags=re.IGNORECASE)
+        sql = sql[:upsert.start()] + f"ON CONFLICT {_conflict_target(sql)}DO UPDATE SET" + assignments
+    sql = sql.replace('%s', '?')
+    return _unmask(sql, literals)
+
+
+def _conflict_target(sql: str) -> str:
+    """'(columns) ' of the first unique key the INSERT supplies every column of.
+    MySQL's ON DUPLICATE KEY names no key; SQLite needs one before 3.35."""
+    m = re.match(r"\s*INSERT\s+(?:IGNORE\s+)?INTO\s+`?(\w+)`?\s*\(([^)]*)\)", sql, re.IGNORECASE)
+    if not m:
+        raise ValueError(f"Cannot find the INSERT columns of upsert: {sql[:80]}")
+    supplied = {c.strip().strip('`').lower() for c in m.group(2).split(',')}
+    for key in _unique_keys().get(m.group(1).lower(), []):
+        if set(key) <= supplied:
+            return f"({', '.join(key)}) "
+    raise ValueError(f"No unique key of {m.group(1)} is covered by the upsert's columns")
+
+
+@lru_cache(maxsize=1)
+def _unique_keys() -> Dict[str, List[Tuple[str, ...]]]:
+    """Primary and unique keys per table, read from a scratch database built
+    from the same schema files as load_schema()."""
+    scratch = sqlite3.connect(':memory:')
+    try:
+        load_schema(scratch)
+        keys = {}
+        tables = [r[0] for r in scratch.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            found = []
+            pk = sorted((r[5], r[1]) for r in scratch.execute(f"PRAGMA table_info({table})") if r[5])
+            if pk:
+                found.append(tuple(name.lower() for _, name in pk))
+            for index in scratch.execute(f"PRAGMA index_list({table})"):
+                if index[2]:     # unique
+                    columns = tuple(r[2].lower() for r in scratch.execute(f"PRAGMA index_info({index[1]})"))
+                    if columns not in found:
+                        found.append(columns)
+            keys[table.lower()] = found
+        return keys
+    finally:
+        scratch.close()
+
+
+# ── Connections ───────────────────────────────────────────────────────────────
+
+class SQLiteCursor:
+    """mysql.connector-style cursor: %s queries, optional dict rows."""
+
+    def __init__(self, conn: sqlite3.Connection, dictionary: bool = False):
+        self._cur = conn.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self._cur.execute(translate(query), tuple(params or ()))
+
+    def executemany(self, query, seq_params):
+        self._cur.executemany(translate(query), [tuple(p) for p in seq_params])
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        return self._row(row) if row is not None else None
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cur.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    def close(self):
+        self._cur.close()
+
+    def _row(self, row):
+        if not self._dictionary:
+            return row
+        return {d[0]: value for d, value in zip(self._cur.description, row)}
+
+
+class SQLiteConnection:
+    """The part of mysql.connector's connection API that database.Database uses."""
+
+    def __init__(self, path: str):
+        self.raw = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,       # autocommit, like the MySQL pool
+            check_same_thread=False,    # handed between threads by the pool
+            timeout=Config.DB_POOL_TIMEOUT,
+        )
+        self.raw.execute("PRAGMA foreign_keys = ON")
+        if path != ':memory:':
+            self.raw.execute("PRAGMA journal_mode = WAL")
+
+    def cursor(self, dictionary: bool = False, buffered: bool = False):
+        return SQLiteCursor(self.raw, dictionary)
+
+    def start_transaction(self):
+        self.raw.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def reset_session(self):
+        if self.raw.in_transaction:
+            self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
+
+
+def make_pool(path: str) -> BlockingPool:
+    """Pool of connections to the SQLite database at path, creating the schema
+    if the database has no tables yet."""
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(f"SQLite {sqlite3.sqlite_version} is too old for the SQLite backend; "
+                           f"{'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is needed")
+    first = SQLiteConnection(path)
+    if not first.raw.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]:
+        load_schema(first.raw)
+    if path == ':memory:':
+        # An in-memory database lives and dies with its connection, so the
+        # pool holds exactly that one and callers take turns on it
+        return BlockingPool(lambda: first, size=1, overflow=0,
+                            timeout=Config.DB_POOL_TIMEOUT, name='sqlite::memory:')
+    first.close()
+    return BlockingPool(lambda: SQLiteConnection(path),
+                        size=Config.DB_POOL_SIZE, overflow=Config.DB_POOL_OVERFLOW,
+                        timeout=Config.DB_POOL_TIMEOUT, name=f'sqlite:{path}')
+
+
+# ── Schema loading ────────────────────────────────────────────────────────────
+
+_SKIPPED = re.compile(
+    r"(USE|CREATE\s+DATABASE|CREATE\s+PROCEDURE|DROP\s+PROCEDURE|CALL"
+    r"|SET|SELECT|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+def load_schema(conn: sqlite3.Connection, schema_dir: str = SCHEMA_DIR) -> int:
+    """Create the tables from schema.sql and every migration_*.sql in order.
+    Returns the number of SQLite statements executed."""
+    paths = [os.path.join(schema_dir, 'schema.sql')]
+    paths += sorted(glob.glob(os.path.join(schema_dir, 'migration_*.sql')))
+    executed = 0
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            script = f.read()
+        for statement in _statements(script):
+            try:
+                ddl = translate_ddl(statement)
+            except ValueError as e:
+                raise ValueError(f"{os.path.basename(path)}: {e}") from None
+            for sql in ddl:
+                conn.execute(sql)
+                executed += 1
+    for table, column in _UNMIGRATED_COLUMNS:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+        executed += 1
+    return executed
+
+
+def _statements(script: str) -> List[str]:
+    """Split a MySQL script into statements: drops comments and follows
+    DELIMITER changes (a stored procedure body comes back as one statement)."""
+    statements, buf = [], []
+    delimiter, quote = ';', None
+    i, n = 0, len(script)
+    while i < n:
+        c = script[i]
+        if quote:
+            buf.append(c)
+            if c == '\\' and i + 1 < n:
+                buf.append(script[i + 1])
+                i += 2
+                continue
+            if c == quote:
+                quote = None
+            i += 1
+            continue
+        if i == 0 or script[i - 1] == '\n':
+            m = re.match(r"[ \t]*DELIMITER[ \t]+(\S+)[^\n]*", script[i:], re.IGNORECASE)
+            if m:
+                delimiter = m.group(1)
+                i += m.end()
+                continue
+        if c in "'\"`":
+            quote = c
+        elif script.startswith('--', i):
+            end = script.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        elif script.startswith('/*', i):
+            end = script.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            buf.append(' ')
+            continue
+        elif script.startswith(delimiter, i):
+            statements.append(''.join(buf).strip())
+            buf = []
+            i += len(delimiter)
+            continue
+        buf.append(c)
+        i += 1
+    statements.append(''.join(buf).strip())
+    return [s for s in statements if s]
+
+
+def translate_ddl(statement: str) -> List[str]:
+    """SQLite statements for one MySQL schema statement ([] when skipped)."""
+    sql, literals = _mask(' '.join(statement.split()))
+    if _SKIPPED.match(sql):
+        return []
+
+    m = re.match(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\(", sql, re.IGNORECASE)
+    if m:
+        items, _ = _split_args(sql, m.end())
+        out = _create_table(m.group(1), items)
+        return [_unmask(s, literals) for s in out]
+
+    m = re.match(r"CREATE\s+(UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)\s*\((.*)\)$", sql, re.IGNORECASE)
+    if m:
+        return [_unmask(_index(m.group(3), m.group(2), m.group(4), bool(m.group(1))), literals)]
+
+    m = re.match(r"ALTER\s+TABLE\s+`?(\w+)`?\s+", sql, re.IGNORECASE)
+    if m:
+        clauses, _ = _split_args(sql + ')', m.end())
+        out = []
+        for clause in clauses:
+            out.extend(_alter(m.group(1), clause))
+        return [_unmask(s, literals) for s in out]
+
+    raise ValueError(f"Unsupported statement: {statement[:80]}")
+
+
+def _create_table(table: str, items: List[str]) -> List[str]:
+    columns, extra = [], []
+    for item in items:
+        head = item.upper()
+        m = re.match(r"(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)$", item, re.IGNORECASE)
+        if m:
+            extra.append(_index(table, m.group(1), m.group(2)))
+            continue
+        m = re.match(r"UNIQUE\s+(?:KEY|INDEX)\s+\w+\s*(\(.*\))$", item, re.IGNORECASE)
+        if m:
+            columns.append(f"UNIQUE {m.group(1)}")
+            continue
+        if head.startswith('PRIMARY KEY'):
+            columns.append(item)
+            continue
+        m = re.match(r"(?:CONSTRAINT\s+\w+\s+)?FOREIGN\s+KEY\s*\(\s*(\w+)\s*\)", item, re.IGNORECASE)
+        if m:
+            if (table, m.group(1)) not in _DROPPED_FOREIGN_KEYS:
+                columns.append(item)
+            continue
+        column, on_update = _column(item)
+        columns.append(column)
+        if on_update:
+            extra.append(_on_update_trigger(table, on_update))
+    return [f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})"] + extra
+
+
+def _alter(table: str, clause: str) -> List[str]:
+    m = re.match(r"ADD\s+(?:COLUMN\s+)?(?!INDEX\b|KEY\b|UNIQUE\b|CONSTRAINT\b|FOREIGN\b)(.*)$",
+                 clause, re.IGNORECASE)
+    if m:
+        column, on_update = _column(m.group(1))
+        out = [f"ALTER TABLE {table} ADD COLUMN {column}"]
+        return out + ([_on_update_trigger(table, on_update)] if on_update else [])
+    m = re.match(r"ADD\s+(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)$", clause, re.IGNORECASE)
+    if m:
+        return [_index(table, m.group(2), m.group(3), bool(m.group(1)))]
+    m = re.match(r"DROP\s+(?:INDEX|KEY)\s+(\w+)$", clause, re.IGNORECASE)
+    if m:
+        return [f"DROP INDEX IF EXISTS {table}_{m.group(1)}"]
+    if re.match(r"(MODIFY|CHANGE|ALTER)\s+(COLUMN\s+)?|DROP\s+FOREIGN\s+KEY\b", clause, re.IGNORECASE):
+        return []
+    raise ValueError(f"Unsupported ALTER TABLE clause: {clause[:80]}")
+
+
+def _column(definition: str) -> Tuple[str, str]:
+    """(SQLite column definition, column name if it has ON UPDATE CURRENT_TIMESTAMP else '')."""
+    name = definition.split()[0].strip('`')
+    sql = definition
+    on_update = re.search(r"\bON\s+UPDATE\s+CURRENT_TIMESTAMP\b", sql, re.IGNORECASE)
+    rewrites = (
+        (r"\bINT\w*(?:\(\d+\))?\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        (r"\bAUTO_INCREMENT\b", ""),
+        (r"\bENUM\s*\([^)]*\)", "TEXT"),
+        (r"\bON\s+UPDATE\s+CURRENT_TIMESTAMP\b", ""),
+        (r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", f"DEFAULT ({_NOW})"),
+        (r"\bCOMMENT\s+\x00\d+\x00", ""),
+        (r"\bAFTER\s+`?\w+`?", ""),
+        (r"\bFIRST\b", ""),
+        (r"\bUNSIGNED\b", ""),
+        (r"\bCHARACTER\s+SET\s+\w+", ""),
+        (r"\bCOLLATE\s+\w+", ""),
+    )
+    for pattern, replacement in rewrites:
+        sql = re.sub(pattern, replacement, sql, flags=re.IGNORECASE)
+    return ' '.join(sql.split()), name if on_update else ''
+
+
+def _index(table: str, name: str, columns: str, unique: bool = False) -> str:
+    # SQLite index names are per database, not per table as in MySQL
+    columns = re.sub(r"(\w+)\s*\(\d+\)", r"\1", columns)    # drop prefix lengths
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    return f"CREATE {kind} IF NOT EXISTS {table}_{name} ON {table} ({columns})"
+
+
+def _on_update_trigger(table: str, column: str) -> str:
+    return (f"CREATE TRIGGER IF NOT EXISTS {table}_{column}_on_update "
+            f"AFTER UPDATE ON {table} FOR EACH ROW WHEN NEW.{column} IS OLD.{column} "
+            f"BEGIN UPDATE {table} SET {column} = {_NOW} WHERE rowid = NEW.rowid; END")
+
+
+if __name__ == '__main__':
+    # python sqlite_backend.py dgspace.db — create a database file for DB_BACKEND=sqlite
+    if len(sys.argv) != 2:
+        sys.exit('usage: python sqlite_backend.py <database file>')
+    with sqlite3.connect(sys.argv[1]) as target:
+        print(f"[OK] {load_schema(target)} statements applied to {sys.argv[1]}")
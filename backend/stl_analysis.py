@@ -1,16 +1,39 @@
 """
 STL File Analysis Service
 Parses .stl files and estimates print volume, filament usage, and print time.
+
+Binary STLs are memory-mapped and viewed in place as 50-byte triangle records
+(np.frombuffer with a structured dtype), so the file is never copied into a
+mesh object; ASCII STLs go through a regex tokenizer. Volume, bounding box and
+surface area are then computed in vectorized chunks.
+
+Print time and material come from a layer-sliced estimate: every triangle is
+intersected with the Z planes it spans (all triangle/plane pairs at once, no
+per-layer Python loop), giving each layer's perimeter length and cross-section
+area; walls, top/bottom skin, sparse infill and travel are derived from those.
 """
 
 import os
-import math
-import warnings
-import logging
-from stl import mesh as stl_mesh
+import re
+import mmap
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Bump when a change here alters results, so cached analyses (analysis_cache) are recomputed
+PARSER_VERSION = 3
+
+# Binary STL: 80-byte header, uint32 triangle count, then one record per triangle
+_STL_HEADER_SIZE = 84
+_STL_RECORD = np.dtype([
+    ('normal',   '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attr',     '<u2'),
+])
+
+# Triangles processed per vectorized pass (bounds float64 temporaries to ~100 MB)
+_CHUNK_TRIANGLES = 1_000_000
 
-# Suppress the "mesh is not closed" warning from numpy-stl
-logging.getLogger('stl').setLevel(logging.ERROR)
+_ASCII_VERTEX_RE = re.compile(rb'vertex\s+(\S+)\s+(\S+)\s+(\S+)')
 
 
 # Material densities in g/cm³
@@ -41,76 +64,276 @@ DEFAULT_INFILL = 0.20       # 20 %
 SHELL_FRACTION = 0.30
 
 # Additional time multiplier to account for travel moves, retraction, homing, etc.
+# (volume-only fallback, used when the mesh yields no layers)
 TIME_OVERHEAD_FACTOR = 1.35
 
+# Layer-sliced estimate (0.4 mm nozzle defaults)
+DEFAULT_LAYER_HEIGHT = 0.2     # mm
+LINE_WIDTH           = 0.4     # mm
+WALL_LINES           = 3       # perimeters per layer
+SKIN_LAYERS          = 4       # solid layers under top / above bottom surfaces
+WALL_SPEED_FACTOR    = 0.5     # walls print at half the volumetric speed of infill
+TRAVEL_SPEED         = 150.0   # mm/s, non-extruding moves
+LAYER_CHANGE_SECONDS = 1.0     # Z move, retract, seam travel per layer
+
+# Triangles sliced per batch (bounds the triangle × layer pair arrays)
+_SLICE_CHUNK_TRIANGLES = 200_000
+
+
+def _is_binary_stl(file_path: str) -> bool:
+    size = os.path.getsize(file_path)
+    if size < _STL_HEADER_SIZE:
+        return False
+    with open(file_path, 'rb') as f:
+        f.seek(80)
+        count = int.from_bytes(f.read(4), 'little')
+    return _STL_HEADER_SIZE + count * _STL_RECORD.itemsize == size
+
+
+def _read_ascii_triangles(file_path: str) -> np.ndarray:
+    """Tokenize 'vertex x y z' lines of an ASCII STL into an (n, 3, 3) array."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    coords = _ASCII_VERTEX_RE.findall(data)
+    if not coords or len(coords) % 3:
+        raise ValueError('no complete facets found')
+    return np.array(coords, dtype='S').astype(np.float64).reshape(-1, 3, 3)
+
+
+def read_triangles(file_path: str) -> np.ndarray:
+    """All facets of a binary or ASCII STL as an (n, 3, 3) float32 array (a copy,
+    so it outlives the mmap)."""
+    if _is_binary_stl(file_path):
+        count = (os.path.getsize(file_path) - _STL_HEADER_SIZE) // _STL_RECORD.itemsize
+        if count == 0:
+            raise ValueError('STL contains no triangles')
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            records = np.frombuffer(mm, dtype=_STL_RECORD, count=count, offset=_STL_HEADER_SIZE)
+            triangles = records['vertices'].astype(np.float32)
+            del records
+        return triangles
+    return _read_ascii_triangles(file_path).astype(np.float32)
+
+
+def _mesh_properties(triangles: np.ndarray) -> dict:
+    """Signed volume, bounding box and surface area of (n, 3, 3) triangles, chunk by chunk."""
+    volume = 0.0
+    area   = 0.0
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    for start in range(0, len(triangles), _CHUNK_TRIANGLES):
+        tri = triangles[start:start + _CHUNK_TRIANGLES].astype(np.float64)
+        v0, v1, v2 = tri[:, 0], tri[:, 1], tri[:, 2]
+        # Signed tetrahedron volumes against the origin: v0 · (v1 × v2) / 6
+        volume += float(np.einsum('ij,ij->', v0, np.cross(v1, v2))) / 6.0
+        area   += float(np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1).sum()) / 2.0
+        pts = tri.reshape(-1, 3)
+        lo = np.minimum(lo, pts.min(axis=0))
+        hi = np.maximum(hi, pts.max(axis=0))
+    return {'volume_mm3': volume, 'area_mm2': area, 'min': lo, 'max': hi}
+
+
+def _slice_layers(triangles: np.ndarray, z_min: float, z_max: float, layer_height: float):
+    """Per-layer perimeter (mm) and cross-section area (mm²) at layer mid-heights.
+
+    Each triangle spanning plane z yields one segment. Segments are oriented so
+    the solid lies to their left (from the facet normal), so summing the
+    shoelace terms gives outer contours positive and holes negative.
+    """
+    n_layers = int(np.ceil((z_max - z_min) / layer_height))
+    perimeter = np.zeros(max(n_layers, 0))
+    area      = np.zeros(max(n_layers, 0))
+    if n_layers <= 0:
+        return perimeter, area
+
+    for start in range(0, len(triangles), _SLICE_CHUNK_TRIANGLES):
+        tri = triangles[start:start + _SLICE_CHUNK_TRIANGLES].astype(np.float64)
+        normal = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        # Sort each triangle's vertices by z: a lowest, b middle, c highest
+        order = np.argsort(tri[:, :, 2], axis=1)
+        tri = np.take_along_axis(tri, order[:, :, None], axis=1)
+        a, b, c = tri[:, 0], tri[:, 1], tri[:, 2]
+
+        # Layer k is cut at z_min + (k + 0.5) * layer_height
+        first = np.maximum(np.ceil((a[:, 2] - z_min) / layer_height - 0.5), 0).astype(np.int64)
+        last  = np.minimum(np.floor((c[:, 2] - z_min) / layer_height - 0.5), n_layers - 1).astype(np.int64)
+        counts = np.where(c[:, 2] > a[:, 2], np.maximum(last - first + 1, 0), 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
 
-def analyze_stl(file_path: str, material: str = 'PLA', infill: float = DEFAULT_INFILL) -> dict:
+        # Expand to one row per (triangle, layer) pair
+        idx   = np.repeat(np.arange(len(tri)), counts)
+        layer = first[idx] + (np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts))
+        z = z_min + (layer + 0.5) * layer_height
+        A, B, C = a[idx], b[idx], c[idx]
+
+        # One end on edge a–c, the other on a–b (below b) or b–c (above b)
+        t = (z - A[:, 2]) / (C[:, 2] - A[:, 2])
+        p1 = A[:, :2] + t[:, None] * (C[:, :2] - A[:, :2])
+        below = (z < B[:, 2])[:, None]
+        S = np.where(below, A, B)
+        E = np.where(below, B, C)
+        dz = E[:, 2] - S[:, 2]
+        t = np.divide(z - S[:, 2], dz, out=np.zeros_like(dz), where=dz != 0)
+        p2 = S[:, :2] + t[:, None] * (E[:, :2] - S[:, :2])
+
+        # Contour direction for an outward normal n is z × n = (-n_y, n_x)
+        n = normal[idx]
+        seg = p2 - p1
+        flip = (seg[:, 0] * -n[:, 1] + seg[:, 1] * n[:, 0] < 0)[:, None]
+        p1, p2 = np.where(flip, p2, p1), np.where(flip, p1, p2)
+
+        perimeter += np.bincount(layer, weights=np.hypot(seg[:, 0], seg[:, 1]), minlength=n_layers)
+        area += np.bincount(layer, weights=0.5 * (p1[:, 0] * p2[:, 1] - p2[:, 0] * p1[:, 1]),
+                            minlength=n_layers)
+    return perimeter, np.abs(area)
+
+
+def _layered_estimate(perimeter: np.ndarray, area: np.ndarray, layer_height: float,
+                      material: str, infill: float) -> dict:
+    """Print time (s) and extruded volume (mm³) from per-layer perimeter / area."""
+    if not len(area):
+        return {'time_seconds': 0.0, 'extruded_mm3': 0.0, 'layer_count': 0, 'breakdown_minutes': {}}
+    w = LINE_WIDTH
+    wall_area = np.minimum(perimeter * WALL_LINES * w, area)
+
+    # Top/bottom skin: the part of a section not covered by every layer within
+    # SKIN_LAYERS above and below it (zero padding makes the first/last layers solid)
+    window = sliding_window_view(np.pad(area, SKIN_LAYERS), 2 * SKIN_LAYERS + 1)
+    skin_area = area - window.min(axis=1)
+
+    # Walls + skin, but never less than SHELL_FRACTION of the section (as in the volume model)
+    solid_area  = np.minimum(area, np.maximum(wall_area + skin_area, SHELL_FRACTION * area))
+    sparse_area = area - solid_area
+
+    wall_len   = wall_area.sum() / w
+    skin_len   = (solid_area - wall_area).sum() / w
+    infill_len = (sparse_area * infill).sum() / w
+
+    # Volumetric speed (mm³/s) → linear speed for this line width / layer height
+    volumetric = MATERIAL_PRINT_SPEEDS.get(material, MATERIAL_PRINT_SPEEDS['PLA'])
+    line_speed = volumetric / (w * layer_height)
+    printed_layers = int(np.count_nonzero(area > 0))
+
+    wall_s   = wall_len / (line_speed * WALL_SPEED_FACTOR)
+    fill_s   = (skin_len + infill_len) / line_speed
+    travel_s = perimeter.sum() / TRAVEL_SPEED + printed_layers * LAYER_CHANGE_SECONDS
+
+    return {
+        'time_seconds': wall_s + fill_s + travel_s,
+        'extruded_mm3': (wall_len + skin_len + infill_len) * w * layer_height,
+        'layer_count':  printed_layers,
+        'breakdown_minutes': {
+            'walls':       round(wall_s / 60, 1),
+            'skin_infill': round(fill_s / 60, 1),
+            'travel':      round(travel_s / 60, 1),
+        },
+    }
+
+
+def _analyze_mesh(file_path: str, layer_height: float) -> dict:
+    """Return mesh properties, triangle count and per-layer slices (binary STLs via mmap)."""
+    def _measure(triangles):
+        props = _mesh_properties(triangles)
+        props['layer_perimeter'], props['layer_area'] = _slice_layers(
+            triangles, float(props['min'][2]), float(props['max'][2]), layer_height)
+        return props
+
+    if _is_binary_stl(file_path):
+        with open(file_path, 'rb') as f:
+            count = (os.path.getsize(file_path) - _STL_HEADER_SIZE) // _STL_RECORD.itemsize
+            if count == 0:
+                raise ValueError('STL contains no triangles')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                records = np.frombuffer(mm, dtype=_STL_RECORD, count=count, offset=_STL_HEADER_SIZE)
+                props = _measure(records['vertices'])
+                del records  # release the buffer export before the mmap closes
+    else:
+        triangles = _read_ascii_triangles(file_path)
+        count = len(triangles)
+        props = _measure(triangles)
+    props['triangle_count'] = int(count)
+    return props
+
+
+def analyze_stl(file_path: str, material: str = 'PLA', infill: float = DEFAULT_INFILL,
+                layer_height: float = DEFAULT_LAYER_HEIGHT) -> dict:
     """Analyze an STL file and return estimated print metrics.
 
     Args:
         file_path: Absolute path to the .stl file.
         material:  Material type (PLA, ABS, PETG, TPU, Nylon, Resin).
         infill:    Infill ratio (0.0 – 1.0).  Default 0.20 (20 %).
+        layer_height: Slicing layer height in mm.  Default 0.2.
 
     Returns:
         dict with keys:
             success           (bool)
             volume_cm3        (float)  – total solid volume of the mesh
+            surface_area_cm2  (float)  – total triangle area
+            triangle_count    (int)
             bounding_box      (dict)   – {x_mm, y_mm, z_mm} dimensions
-            estimated_weight_grams    (float) – weight considering infill & shell
-            estimated_print_time_hours (float) – rough time estimate
+            estimated_weight_grams    (float) – extruded walls, skin & infill
+            estimated_print_time_hours (float) – layer-sliced time estimate
             material          (str)
             infill_percent    (int)
+            layer_height_mm   (float)
+            layer_count       (int)
+            time_breakdown_minutes (dict) – {walls, skin_infill, travel}
             message           (str)    – error message when success is False
     """
     if not os.path.isfile(file_path):
         return {'success': False, 'message': 'STL file not found'}
 
     try:
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            stl = stl_mesh.Mesh.from_file(file_path)
+        mesh = _analyze_mesh(file_path, layer_height)
     except Exception as e:
         return {'success': False, 'message': f'Failed to parse STL: {e}'}
 
     # ── Volume (cm³) ───────────────────────────────────────
-    # numpy-stl computes volume via the signed volume of tetrahedra.
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        volume_mm3, _cog, _inertia = stl.get_mass_properties()
-    volume_mm3 = abs(volume_mm3)          # ensure positive
+    # Sum of signed tetrahedron volumes; sign depends on facet winding.
+    volume_mm3 = abs(mesh['volume_mm3'])  # ensure positive
     volume_cm3 = volume_mm3 / 1000.0      # 1 cm³ = 1000 mm³
 
     # ── Bounding box (mm) ──────────────────────────────────
-    min_coords = stl.min_
-    max_coords = stl.max_
+    min_coords = mesh['min']
+    max_coords = mesh['max']
     bbox = {
         'x_mm': round(float(max_coords[0] - min_coords[0]), 1),
         'y_mm': round(float(max_coords[1] - min_coords[1]), 1),
         'z_mm': round(float(max_coords[2] - min_coords[2]), 1),
     }
 
-    # ── Weight estimate (grams) ────────────────────────────
-    # Effective solid fraction = shell + infill of interior
-    effective_solid = SHELL_FRACTION + (1 - SHELL_FRACTION) * infill
-    effective_volume_cm3 = volume_cm3 * effective_solid
-
     density = MATERIAL_DENSITIES.get(material, MATERIAL_DENSITIES['PLA'])
-    weight_grams = effective_volume_cm3 * density
+    layered = _layered_estimate(mesh['layer_perimeter'], mesh['layer_area'],
+                                layer_height, material, infill)
 
-    # ── Print time estimate (hours) ────────────────────────
-    # deposited volume in mm³
-    deposited_mm3 = effective_volume_cm3 * 1000.0
-    print_speed = MATERIAL_PRINT_SPEEDS.get(material, MATERIAL_PRINT_SPEEDS['PLA'])
-    time_seconds = (deposited_mm3 / print_speed) * TIME_OVERHEAD_FACTOR
+    if layered['layer_count']:
+        # ── Layer-sliced estimate ──────────────────────────────
+        weight_grams = layered['extruded_mm3'] / 1000.0 * density
+        time_seconds = layered['time_seconds']
+    else:
+        # ── Volume-only fallback (flat / degenerate mesh) ──────
+        # Effective solid fraction = shell + infill of interior
+        effective_solid = SHELL_FRACTION + (1 - SHELL_FRACTION) * infill
+        effective_volume_cm3 = volume_cm3 * effective_solid
+        weight_grams = effective_volume_cm3 * density
+        print_speed = MATERIAL_PRINT_SPEEDS.get(material, MATERIAL_PRINT_SPEEDS['PLA'])
+        time_seconds = (effective_volume_cm3 * 1000.0 / print_speed) * TIME_OVERHEAD_FACTOR
     time_hours = time_seconds / 3600.0
 
     return {
         'success': True,
         'volume_cm3':                round(volume_cm3, 2),
+        'surface_area_cm2':          round(mesh['area_mm2'] / 100.0, 2),
+        'triangle_count':            mesh['triangle_count'],
         'bounding_box':              bbox,
         'estimated_weight_grams':    round(weight_grams, 1),
         'estimated_print_time_hours': round(time_hours, 1),
         'material':                  material,
         'infill_percent':            int(infill * 100),
+        'layer_height_mm':           layer_height,
+        'layer_count':               layered['layer_count'],
+        'time_breakdown_minutes':    layered['breakdown_minutes'],
     }
@@ -0,0 +1,74 @@
+"""
+Test setup: the suite runs against the SQLite backend (sqlite_backend.py) on a
+fresh in-memory database per test, so no MySQL server is needed.
+
+    cd backend && python -m pytest tests
+"""
+
+import os
+import sys
+
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = ':memory:'
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-with-enough-length-0123')
+os.environ.setdefault('EMAIL_TRANSPORT', 'fake')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def fresh_db():
+    """A new, empty in-memory database with the full schema."""
+    database._pool = None
+    yield database.db
+    database.db.release_request_connection()
+    database._pool = None
+
+
+@pytest.fixture
+def app_client(fresh_db):
+    """Flask test client on a fresh database (background workers not started)."""
+    from app import app
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def seed(fresh_db):
+    """Insert an admin, a student and printers; returns auth headers and ids."""
+    import bcrypt
+    from auth_service import AuthService
+    db = fresh_db
+    pw = bcrypt.hashpw(b'pw', bcrypt.gensalt(4)).decode()
+    db.execute_query(
+        "INSERT INTO admins (email, password_hash, full_name, email_verified, role) "
+        "VALUES (%s, %s, 'Admin', 1, 'admin')", ('admin@test.edu', pw))
+    db.execute_query(
+        "INSERT INTO students (email, password_hash, full_name, email_verified) "
+        "VALUES (%s, %s, 'Student', 1)", ('student@test.edu', pw))
+    printers = [db.execute_query(
+        "INSERT INTO printers (printer_name, status) VALUES (%s, 'active')", (f'P{i}',))
+        for i in (1, 2)]
+    return {
+        'admin': {'Authorization': 'Bearer ' + AuthService.generate_jwt_token('admin@test.edu', 'admin')},
+        'student': {'Authorization': 'Bearer ' + AuthService.generate_jwt_token('student@test.edu', 'student')},
+        'printers': printers,
+    }
+
+
+@pytest.fixture
+def make_request(fresh_db):
+    """Factory inserting a print request (approved, with a UFP by default); returns its id."""
+    def _make(status='approved', **fields):
+        values = {'student_email': 'student@test.edu', 'project_name': 'part',
+                  'status': status, 'ufp_file_path': 'part.ufp', **fields}
+        return fresh_db.execute_query(
+            f"INSERT INTO print_requests ({', '.join(values)}) "
+            f"VALUES ({', '.join(['%s'] * len(values))})",
+            tuple(values.values()))
+    return _make
@@ -0,0 +1,112 @@
+import pytest
+
+import analysis_cache
+
+SHA = 'a' * 64
+RESULT = {'success': True, 'print_time_minutes': 42, 'material_g': 12.5}
+
+
+@pytest.fixture
+def cache(fresh_db, monkeypatch):
+    monkeypatch.setattr(analysis_cache, '_counters', analysis_cache._Counters())
+    return analysis_cache
+
+
+def _hit_count(db, version=1):
+    return db.fetch_one(
+        "SELECT hit_count FROM file_analysis_cache WHERE sha256 = %s AND parser_version = %s",
+        (SHA, version))['hit_count']
+
+
+def test_store_then_lookup(cache, fresh_db):
+    assert cache.lookup('ufp', 1, SHA) is None
+    cache.store('ufp', 1, SHA, RESULT)
+    assert cache.lookup('ufp', 1, SHA) == RESULT
+    assert cache.lookup('ufp', 1, SHA) == RESULT
+    assert _hit_count(fresh_db) == 2
+    assert cache.stats() == {'ufp': {'hits': 2, 'misses': 1, 'hit_rate': 0.667}}
+
+
+def test_key_includes_parser_version_and_params(cache):
+    cache.store('ufp', 1, SHA, RESULT)
+    cache.store('stl', 1, SHA, {**RESULT, 'print_time_minutes': 7}, params='PLA')
+    assert cache.lookup('ufp', 1, SHA, params='PLA') is None
+    assert cache.lookup('stl', 1, SHA) is None
+    assert cache.lookup('stl', 1, SHA, params='PLA')['print_time_minutes'] == 7
+    assert cache.lookup('ufp', 1, 'b' * 64) is None
+
+
+def test_version_bump_misses_only_that_parser(cache):
+    cache.store('ufp', 1, SHA, RESULT)
+    cache.store('stl', 3, SHA, RESULT)
+    assert cache.lookup('ufp', 2, SHA) is None       # parser bumped: recompute
+    assert cache.lookup('stl', 3, SHA) == RESULT     # other parser unaffected
+    cache.store('ufp', 2, SHA, {**RESULT, 'print_time_minutes': 40})
+    assert cache.lookup('ufp', 2, SHA)['print_time_minutes'] == 40
+    assert cache.lookup('ufp', 1, SHA) == RESULT     # old entry left for eviction
+
+
+def test_failures_are_not_cached(cache):
+    cache.store('ufp', 1, SHA, {'success': False, 'message': 'corrupt archive'})
+    assert cache.lookup('ufp', 1, SHA) is None
+
+
+def test_store_overwrites_existing_entry(cache):
+    cache.store('ufp', 1, SHA, RESULT)
+    cache.store('ufp', 1, SHA, {**RESULT, 'material_g': 99})
+    assert cache.lookup('ufp', 1, SHA)['material_g'] == 99
+
+
+def test_corrupt_row_is_a_miss(cache, fresh_db):
+    cache.store('ufp', 1, SHA, RESULT)
+    fresh_db.execute_update("UPDATE file_analysis_cache SET result_json = 'not json'")
+    assert cache.lookup('ufp', 1, SHA) is None
+
+
+def test_get_or_compute_computes_once(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return dict(RESULT)
+
+    for _ in range(3):
+        assert cache.get_or_compute('ufp', 1, SHA, compute) == RESULT
+    assert len(calls) == 1
+    cache.get_or_compute('ufp', 2, SHA, compute)     # version bump
+    assert len(calls) == 2
+
+
+def test_get_or_compute_retries_failures(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'success': len(calls) > 1}
+
+    assert cache.get_or_compute('ufp', 1, SHA, compute) == {'success': False}
+    assert cache.get_or_compute('ufp', 1, SHA, compute) == {'success': True}
+    assert cache.get_or_compute('ufp', 1, SHA, compute) == {'success': True}
+    assert len(calls) == 2
+
+
+def test_hit_rate_for_repeated_uploads(cache):
+    # 10 distinct files, each uploaded 5 times (revisions re-sending the same
+    # file): only the first upload of each is analysed
+    computed = []
+    for _ in range(5):
+        for n in range(10):
+            cache.get_or_compute('ufp', 1, f'{n:064x}', lambda n=n: computed.append(n) or dict(RESULT))
+    assert len(computed) == 10
+    assert cache.stats()['ufp'] == {'hits': 40, 'misses': 10, 'hit_rate': 0.8}
+
+
+def test_evict_stale(cache, fresh_db):
+    cache.store('ufp', 1, SHA, RESULT)
+    cache.store('ufp', 1, 'b' * 64, RESULT)
+    fresh_db.execute_update(
+        "UPDATE file_analysis_cache SET last_hit_at = DATE_SUB(NOW(), INTERVAL 40 DAY) "
+        "WHERE sha256 = %s", (SHA,))
+    assert cache.evict_stale() == 1
+    assert cache.lookup('ufp', 1, SHA) is None
+    assert cache.lookup('ufp', 1, 'b' * 64) == RESULT
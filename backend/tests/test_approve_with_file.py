@@ -0,0 +1,62 @@
+"""Approve-with-UFP / approve-with-G-code: status, history and blob refs commit as one unit."""
+
+import pytest
+
+import blob_store
+from change_bus import change_bus
+
+OLD, NEW = blob_store.blob_name('a' * 64, '.ufp'), blob_store.blob_name('b' * 64, '.ufp')
+ENDPOINTS = {
+    'ufp':   ('approve-with-ufp', 'ufp_filename'),
+    'gcode': ('approve-with-gcode', 'gcode_filename'),
+}
+
+
+@pytest.fixture
+def pending(fresh_db, make_request):
+    blob_store.register('a' * 64, '.ufp', 10)
+    blob_store.register('b' * 64, '.ufp', 10)
+    blob_store.acquire(OLD)
+    return make_request(status='pending', ufp_file_path=OLD)
+
+
+def _refcount(db, name):
+    return db.fetch_one("SELECT refcount FROM file_blobs WHERE blob_key = %s", (name,))['refcount']
+
+
+def _approve(client, seed, request_id, kind):
+    path, field = ENDPOINTS[kind]
+    return client.post(f'/api/admin/print-requests/{request_id}/{path}',
+                       json={field: NEW}, headers=seed['admin'])
+
+
+@pytest.mark.parametrize('kind', ENDPOINTS)
+def test_approve_moves_refs_and_publishes(app_client, seed, pending, fresh_db, kind):
+    version = change_bus.version
+    assert _approve(app_client, seed, pending, kind).status_code == 200
+    row = fresh_db.fetch_one("SELECT status, ufp_file_path FROM print_requests WHERE request_id = %s",
+                             (pending,))
+    assert row == {'status': 'approved', 'ufp_file_path': NEW}
+    assert (_refcount(fresh_db, OLD), _refcount(fresh_db, NEW)) == (0, 1)
+    assert change_bus.version > version
+
+    # A second approval fails the status check and leaves the refs alone
+    assert _approve(app_client, seed, pending, kind).status_code == 400
+    assert (_refcount(fresh_db, OLD), _refcount(fresh_db, NEW)) == (0, 1)
+
+
+@pytest.mark.parametrize('kind', ENDPOINTS)
+def test_failed_ref_move_rolls_back_approval(app_client, seed, pending, fresh_db, monkeypatch, kind):
+    def replace(old_name, new_name):
+        blob_store.acquire(new_name)
+        raise RuntimeError('refcount update failed')
+
+    monkeypatch.setattr(blob_store, 'replace', replace)
+    version = change_bus.version
+    assert _approve(app_client, seed, pending, kind).status_code == 500
+    row = fresh_db.fetch_one("SELECT status, ufp_file_path FROM print_requests WHERE request_id = %s",
+                             (pending,))
+    assert row == {'status': 'pending', 'ufp_file_path': OLD}
+    assert fresh_db.fetch_one("SELECT COUNT(*) AS n FROM print_request_history")['n'] == 0
+    assert (_refcount(fresh_db, OLD), _refcount(fresh_db, NEW)) == (1, 0)
+    assert change_bus.version == version
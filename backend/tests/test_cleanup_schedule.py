@@ -0,0 +1,19 @@
+import threading
+
+from db_pool import PoolTimeout
+from jobs.cleanup import _run_periodically
+
+
+def test_schedule_survives_exceptions():
+    calls = []
+    done = threading.Event()
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 3:
+            done.set()
+            threading.Event().wait()     # park the timer thread; the test is over
+        raise PoolTimeout('no connection')
+
+    _run_periodically(flaky, interval_seconds=0.01)
+    assert done.wait(2)
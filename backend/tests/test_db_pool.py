@@ -0,0 +1,136 @@
+"""BlockingPool under contention, driven by plain threads and fake connections."""
+
+import threading
+import time
+
+import pytest
+
+from db_pool import BlockingPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, registry):
+        self.closed = False
+        self.resets = 0
+        registry.append(self)
+
+    def reset_session(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+def _pool(size, overflow=0, timeout=5.0):
+    opened = []
+    return BlockingPool(lambda: FakeConnection(opened), size, overflow, timeout), opened
+
+
+def test_more_callers_than_slots_never_exceeds_limit():
+    pool, opened = _pool(size=4, overflow=2)
+    in_use, peak, errors = [0], [0], []
+    lock = threading.Lock()
+
+    def caller():
+        for _ in range(25):
+            try:
+                cnx = pool.get_connection()
+            except PoolTimeout as e:
+                errors.append(e)
+                continue
+            with lock:
+                in_use[0] += 1
+                peak[0] = max(peak[0], in_use[0])
+            time.sleep(0.001)
+            with lock:
+                in_use[0] -= 1
+            cnx.close()
+
+    threads = [threading.Thread(target=caller) for _ in range(32)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    m = pool.metrics()
+    assert not errors
+    assert peak[0] <= 6
+    assert m['checkouts'] == 32 * 25
+    assert m['active'] == 0 and m['waiting'] == 0
+    assert m['exhausted'] > 0                      # callers did have to queue
+    assert sum(m['wait_ms_histogram'].values()) == m['checkouts']
+    assert m['wait_ms_max'] > 1                    # and some waited for a release
+    # Overflow connections were closed on return; the idle set is capped at size
+    assert m['idle'] <= 4 and m['open'] == m['idle']
+    assert sum(not c.closed for c in opened) == m['open']
+
+
+def test_overflow_connection_closed_on_return():
+    pool, opened = _pool(size=1, overflow=1)
+    first, second = pool.get_connection(), pool.get_connection()
+    assert pool.metrics()['open'] == 2
+    first.close()
+    second.close()
+    m = pool.metrics()
+    assert m['open'] == 1 and m['idle'] == 1
+    assert [c.closed for c in opened] == [False, True]
+
+
+def test_timeout_counts_exhausted_and_timeouts():
+    pool, _ = _pool(size=1, timeout=0.05)
+    held = pool.get_connection()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.get_connection()
+    assert time.monotonic() - started >= 0.05
+    m = pool.metrics()
+    assert m['exhausted'] == 1 and m['timeouts'] == 1
+    assert m['waiting'] == 0
+    held.close()
+    pool.get_connection().close()      # the slot is usable again
+    assert pool.metrics()['timeouts'] == 1
+
+
+def test_waiter_wakes_on_release_and_lands_in_histogram():
+    pool, _ = _pool(size=1)
+    held = pool.get_connection()
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.get_connection()))
+    t.start()
+    time.sleep(0.06)
+    held.close()
+    t.join(2)
+    assert got
+    hist = pool.metrics()['wait_ms_histogram']
+    assert hist['le_1'] == 1                 # the uncontended first checkout
+    assert hist['le_100'] == 1               # the waiter, released after ~60 ms
+
+
+def test_concurrent_releases_keep_idle_at_size():
+    pool, opened = _pool(size=2, overflow=30)
+    for _ in range(20):
+        held = [pool.get_connection() for _ in range(32)]
+        barrier = threading.Barrier(len(held))
+
+        def release(cnx):
+            barrier.wait()
+            cnx.close()
+
+        threads = [threading.Thread(target=release, args=(c,)) for c in held]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        m = pool.metrics()
+        assert m['idle'] == 2 and m['open'] == 2
+    assert sum(not c.closed for c in opened) == 2
+
+
+def test_failed_reset_drops_connection():
+    pool, opened = _pool(size=2)
+    cnx = pool.get_connection()
+    opened[0].reset_session = lambda: (_ for _ in ()).throw(OSError('gone'))
+    cnx.close()
+    m = pool.metrics()
+    assert m['open'] == 0 and m['idle'] == 0
+    assert opened[0].closed
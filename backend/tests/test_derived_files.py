@@ -0,0 +1,46 @@
+"""Output naming and failure markers shared by the renderers (derived_files)."""
+
+import os
+import time
+
+import pytest
+
+import derived_files
+import dxf_preview
+import mesh_preview
+import thumbnails
+
+RENDERERS = {
+    dxf_preview:  ('x.dxf.preview-v{v}.svg.gz', dxf_preview.PREVIEW_VERSION, 'x.dxf'),
+    mesh_preview: ('x.stl.mesh-v{v}.lod0.bin.gz', mesh_preview.MESH_VERSION, 'x.stl'),
+    thumbnails:   ('x.ufp.thumb-v{v}-small.png', thumbnails.THUMB_VERSION, 'x.ufp'),
+}
+
+
+@pytest.mark.parametrize('renderer', RENDERERS, ids=lambda m: m.__name__)
+def test_names(renderer):
+    pattern, version, source = RENDERERS[renderer]
+    current, old, newer = (pattern.format(v=v) for v in (version, version - 1, version * 10))
+    assert os.path.basename(renderer.preview_path(source)) == current
+    for name in (current, old, newer):
+        assert renderer.is_derived_file(name)
+        assert renderer.source_of(name) == source
+    assert renderer.is_current(current)
+    assert not renderer.is_current(old) and not renderer.is_current(newer)
+    assert not renderer.is_derived_file(source)
+
+
+@pytest.mark.parametrize('renderer', RENDERERS, ids=lambda m: m.__name__)
+def test_failure_marker_expires(renderer, tmp_path):
+    source = str(tmp_path / RENDERERS[renderer][2])
+    assert renderer.recent_failure(source) is None
+    renderer.mark_failed(source, 'bad file')
+    assert renderer.recent_failure(source) == 'bad file'
+
+    marker = next(p for p in os.listdir(tmp_path) if p.endswith('.failed'))
+    assert renderer.is_derived_file(marker) and renderer.is_current(marker)
+    assert not [p for p in os.listdir(tmp_path) if p.startswith('.upload-')]
+
+    stale = time.time() - derived_files._FAILED_TTL_SECONDS - 1
+    os.utime(tmp_path / marker, (stale, stale))
+    assert renderer.recent_failure(source) is None
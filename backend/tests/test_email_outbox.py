@@ -0,0 +1,66 @@
+import threading
+import time
+
+import database
+from db_pool import PoolTimeout
+from email_outbox import EmailOutbox
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.sent = []
+        self.event = threading.Event()
+
+    def send(self, to_email, subject, html_body):
+        self.sent.append((to_email, subject))
+        self.event.set()
+        return f'id-{len(self.sent)}'
+
+
+def _rows(db):
+    return db.fetch_all("SELECT to_email, status FROM email_outbox ORDER BY outbox_id")
+
+
+def test_enqueue_persists_before_returning(fresh_db, monkeypatch):
+    outbox = EmailOutbox()
+    monkeypatch.setattr(outbox, '_ensure_worker', lambda: None)   # no worker at all
+    outbox.enqueue('a@test.edu', 'Hello', '<p>hi</p>')
+    assert _rows(fresh_db) == [{'to_email': 'a@test.edu', 'status': 'pending'}]
+
+
+def test_worker_drains_table(fresh_db):
+    transport = RecordingTransport()
+    outbox = EmailOutbox()
+    outbox.set_transport(transport)
+    outbox.enqueue('a@test.edu', 'Hello', '<p>hi</p>')
+    assert transport.event.wait(5)
+    deadline = time.time() + 5
+    while _rows(fresh_db)[0]['status'] != 'sent' and time.time() < deadline:
+        time.sleep(0.01)
+    assert transport.sent == [('a@test.edu', 'Hello')]
+    assert _rows(fresh_db)[0]['status'] == 'sent'
+
+
+def test_pool_timeout_keeps_message_and_worker(fresh_db, monkeypatch):
+    transport = RecordingTransport()
+    outbox = EmailOutbox()
+    outbox.set_transport(transport)
+
+    real_execute_query = database.db.execute_query
+    failing = {'on': True}
+    def flaky_execute_query(query, params=None):
+        if failing['on'] and query.startswith('INSERT INTO email_outbox'):
+            raise PoolTimeout('no connection')
+        return real_execute_query(query, params)
+    monkeypatch.setattr(database.db, 'execute_query', flaky_execute_query)
+
+    outbox.enqueue('a@test.edu', 'Hello', '<p>hi</p>')      # INSERT fails: held in memory
+    time.sleep(0.2)                                          # worker passes while still failing
+    assert outbox._thread.is_alive()
+    assert _rows(fresh_db) == []
+
+    failing['on'] = False
+    outbox._wake.set()
+    assert transport.event.wait(5)
+    assert outbox._thread.is_alive()
+    assert transport.sent == [('a@test.edu', 'Hello')]
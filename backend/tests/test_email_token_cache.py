@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+
+import pytest
+
+import email_service
+from email_service import _AccessTokenCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubTokenEndpoint:
+    """Counts token exchanges; each one returns a new token valid for expires_in."""
+
+    def __init__(self, expires_in=3600, delay=0.0):
+        self.calls = 0
+        self.expires_in = expires_in
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        time.sleep(self.delay)
+        return f'tok-{n}', self.expires_in
+
+
+def test_reuses_token_until_margin_before_expiry():
+    clock, fetch = Clock(), StubTokenEndpoint(expires_in=3600)
+    cache = _AccessTokenCache(fetch=fetch, refresh_margin=60, clock=clock)
+    assert cache.get() == 'tok-1'
+    clock.now += 3600 - 60 - 0.001           # just inside the margin
+    assert cache.get() == 'tok-1'
+    clock.now += 0.002                        # 60 s before expiry: refresh
+    assert cache.get() == 'tok-2'
+    assert fetch.calls == 2
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'cached': True}
+
+
+def test_short_lived_token_is_never_cached_past_margin():
+    clock, fetch = Clock(), StubTokenEndpoint(expires_in=30)
+    cache = _AccessTokenCache(fetch=fetch, refresh_margin=60, clock=clock)
+    cache.get()
+    cache.get()
+    assert fetch.calls == 2
+
+
+def test_single_flight_refresh():
+    fetch = StubTokenEndpoint(delay=0.05)
+    cache = _AccessTokenCache(fetch=fetch)
+    start = threading.Barrier(32)
+    tokens = []
+
+    def caller():
+        start.wait()
+        tokens.append(cache.get())
+
+    threads = [threading.Thread(target=caller) for _ in range(32)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert fetch.calls == 1
+    assert tokens == ['tok-1'] * 32
+
+
+def test_failed_exchange_is_not_cached():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            raise email_service.GmailApiError(500, 'backend error')
+        return 'tok-ok', 3600
+
+    cache = _AccessTokenCache(fetch=fetch)
+    with pytest.raises(email_service.GmailApiError):
+        cache.get()
+    assert cache.get() == 'tok-ok'
+
+
+class StubGoogle:
+    """Stands in for _http_pool: a token endpoint plus a Gmail send endpoint
+    that rejects the tokens listed in revoked with 401."""
+
+    def __init__(self, revoked=()):
+        self.revoked = set(revoked)
+        self.token_requests = 0
+        self.sends = []
+
+    def request(self, host, method, path, body=None, headers=None, conn=None):
+        if path == '/token':
+            self.token_requests += 1
+            return 200, json.dumps({'access_token': f'tok-{self.token_requests}',
+                                    'expires_in': 3600}).encode()
+        token = headers['Authorization'].split(' ', 1)[1]
+        self.sends.append(token)
+        if token in self.revoked:
+            return 401, b'{"error": "invalid_grant"}'
+        return 200, json.dumps({'id': f'msg-{len(self.sends)}'}).encode()
+
+
+@pytest.fixture
+def google(monkeypatch):
+    def install(**kwargs):
+        stub = StubGoogle(**kwargs)
+        monkeypatch.setattr(email_service, '_http_pool', stub)
+        monkeypatch.setattr(email_service, '_token_cache', _AccessTokenCache())
+        return stub
+    return install
+
+
+def test_token_fetched_once_for_many_sends(google):
+    stub = google()
+    for _ in range(5):
+        email_service._send_via_gmail_api('a@test.edu', 'Hi', '<p>hi</p>')
+    assert stub.token_requests == 1
+    assert stub.sends == ['tok-1'] * 5
+
+
+def test_401_invalidates_and_retries_once(google):
+    stub = google(revoked={'tok-1'})
+    assert email_service._send_via_gmail_api('a@test.edu', 'Hi', '<p>hi</p>') == 'msg-2'
+    assert stub.sends == ['tok-1', 'tok-2']
+    assert stub.token_requests == 2
+    # The fresh token is cached for the next message
+    email_service._send_via_gmail_api('a@test.edu', 'Hi', '<p>hi</p>')
+    assert stub.token_requests == 2
+
+
+def test_second_401_is_raised(google):
+    stub = google(revoked={'tok-1', 'tok-2'})
+    with pytest.raises(email_service.GmailApiError) as exc:
+        email_service._send_via_gmail_api('a@test.edu', 'Hi', '<p>hi</p>')
+    assert exc.value.status == 401
+    assert stub.sends == ['tok-1', 'tok-2']
@@ -0,0 +1,97 @@
+"""/api/printers/status shares one DB refresh per TTL window / bus version."""
+
+import threading
+import time
+
+import pytest
+
+from change_bus import change_bus
+from config import Config
+from routes import admin
+
+
+class CountingFetchAll:
+    """Stands in for db.fetch_all: two queries per refresh, each a little slow."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query, params=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.01)
+        if 'FROM printers' in query:
+            return [{'printer_id': 1, 'printer_name': 'P1', 'model': 'S5', 'location': '',
+                     'status': 'active', 'accepted_file_formats': 'ufp', 'device_type': '3dprint'}]
+        return [{'printer_id': 1, 'queued_count': 2, 'printing_count': 0, 'print_end_expected': None}]
+
+
+@pytest.fixture
+def fetch_all(monkeypatch):
+    fake = CountingFetchAll()
+    monkeypatch.setattr(admin.db, 'fetch_all', fake)
+    monkeypatch.setattr(admin, '_status_snapshot', None)
+    monkeypatch.setattr(Config, 'PRINTER_STATUS_CACHE_SECONDS', 60.0)
+    return fake
+
+
+def _hammer(fn, threads=32, rounds=10):
+    results, errors = [], []
+    start = threading.Barrier(threads)
+
+    def caller():
+        start.wait()
+        for _ in range(rounds):
+            try:
+                results.append(fn())
+            except Exception as e:      # pragma: no cover - reported below
+                errors.append(e)
+
+    pool = [threading.Thread(target=caller) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    assert not errors
+    return results
+
+
+def test_concurrent_callers_share_one_refresh(fetch_all):
+    rows = _hammer(admin._get_printer_status_rows)
+    assert len(rows) == 320
+    assert fetch_all.calls == 2                      # printers + aggregates, once
+    assert all(r is rows[0] for r in rows)
+
+
+def test_bus_version_change_invalidates(fetch_all):
+    admin._get_printer_status_rows()
+    change_bus.publish('job_status_changed')
+    _hammer(admin._get_printer_status_rows)
+    assert fetch_all.calls == 4
+
+
+def test_ttl_expiry_refreshes_once_per_window(fetch_all, monkeypatch):
+    monkeypatch.setattr(Config, 'PRINTER_STATUS_CACHE_SECONDS', 0.2)
+    deadline = time.monotonic() + 0.5
+    windows = 0
+    while time.monotonic() < deadline:
+        _hammer(admin._get_printer_status_rows, threads=8, rounds=5)
+        windows += 1
+    # At most one refresh per started 0.2 s window, however many callers
+    assert 2 <= fetch_all.calls <= 2 * 4
+    assert windows > 4
+
+
+def test_endpoint_under_load(app_client, seed, fetch_all):
+    from app import app
+
+    def poll():
+        with app.test_client() as client:
+            r = client.get('/api/printers/status', headers=seed['student'])
+            assert r.status_code == 200
+            return r.get_json()['printers']
+
+    results = _hammer(poll, threads=16, rounds=5)
+    assert results[0][0]['display_state'] == 'busy'
+    assert fetch_all.calls == 2
@@ -0,0 +1,82 @@
+"""
+Report and list queries must stay index range scans (migrations 022 / 023).
+
+Each endpoint below is called with every statement recorded, and each
+recorded SELECT is run through SQLite's EXPLAIN QUERY PLAN. A query that
+wraps the filtered column in a function again (DATE(created_at), MONTH(...))
+or loses its index shows up as a SCAN instead of an index SEARCH and fails
+the test. SQLite's planner is not MySQL's, but both need the same thing here: a
+sargable predicate on the leading index columns.
+"""
+
+import re
+
+import pytest
+
+import sqlite_backend
+
+
+@pytest.fixture
+def plans(monkeypatch):
+    """Records (sql, EXPLAIN QUERY PLAN details) for every SELECT executed."""
+    recorded = []
+    real_execute = sqlite_backend.SQLiteCursor.execute
+
+    def execute(self, query, params=()):
+        sql = sqlite_backend.translate(query)
+        if sql.lstrip().upper().startswith('SELECT'):
+            rows = self._cur.connection.execute(
+                'EXPLAIN QUERY PLAN ' + sql, tuple(params or ())).fetchall()
+            recorded.append((sql, [r[-1] for r in rows]))
+        return real_execute(self, query, params)
+
+    monkeypatch.setattr(sqlite_backend.SQLiteCursor, 'execute', execute)
+    return recorded
+
+
+def _plans_for(plans, pattern):
+    found = [detail for sql, detail in plans if re.search(pattern, sql, re.S)]
+    assert found, f'no query matching {pattern!r} was executed'
+    return found
+
+
+def _assert_search(plans, pattern, index):
+    for detail in _plans_for(plans, pattern):
+        text = '\n'.join(detail)
+        # A full index scan ('SCAN pr USING COVERING INDEX ...') is still a scan
+        assert re.search(rf'SEARCH \w+ USING (COVERING )?INDEX {index} \(', text), text
+        assert not re.search(r'\bSCAN (print_requests|pr|print_jobs|pj)\b', text), text
+
+
+def test_dashboard_report(app_client, seed, make_request, plans):
+    make_request()
+    r = app_client.get('/api/reports/dashboard?from=2026-01-01&to=2026-01-31',
+                       headers=seed['admin'])
+    assert r.status_code == 200
+    _assert_search(plans, r'COUNT\(DISTINCT student_email\)', 'print_requests_idx_pr_created_report')
+    _assert_search(plans, r'GROUP BY pr\.student_email', 'print_requests_idx_pr_created_report')
+    _assert_search(plans, r'ORDER BY pr\.created_at DESC\s+LIMIT 50', 'print_requests_idx_created_at')
+
+
+def test_completed_this_month(app_client, seed, plans):
+    r = app_client.get('/api/admin/print-requests/statistics', headers=seed['admin'])
+    assert r.status_code == 200
+    _assert_search(plans, r"status = 'completed' AND updated_at >=",
+                   'print_requests_idx_pr_status_updated')
+
+
+def test_request_lists(app_client, seed, make_request, plans):
+    make_request(status='pending')
+    assert app_client.get('/api/admin/print-requests?status=pending',
+                          headers=seed['admin']).status_code == 200
+    assert app_client.get('/api/print-requests/my-requests',
+                          headers=seed['student']).status_code == 200
+    _assert_search(plans, r'FROM print_requests pr.*pr\.status = \?.*ORDER BY pr\.created_at DESC',
+                   'print_requests_idx_pr_status_created')
+    _assert_search(plans, r'FROM print_requests.*student_email = \?.*ORDER BY',
+                   'print_requests_idx_pr_student_created')
+
+
+def test_staff_notification_claim(app_client, seed, plans):
+    assert app_client.get('/api/admin/notifications', headers=seed['admin']).status_code == 200
+    _assert_search(plans, r"pj\.status = 'printing'", 'print_jobs_idx_pj_notify')
@@ -0,0 +1,178 @@
+"""
+sqlite_backend: the schema loader on the real schema files, translate() on
+its own rewrites, and every constant query in the code base run through
+translate() and SQLite's EXPLAIN — a MySQL-ism translate() does not cover
+fails here instead of at request time on DB_BACKEND=sqlite.
+"""
+
+import ast
+import datetime
+import glob
+import os
+import sqlite3
+
+import pytest
+
+import sqlite_backend
+from sqlite_backend import translate
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DB_METHODS = {'fetch_one', 'fetch_all', 'execute_query', 'execute_update', 'execute_many'}
+
+
+@pytest.fixture
+def conn():
+    c = sqlite3.connect(':memory:', isolation_level=None)
+    sqlite_backend.load_schema(c)
+    yield c
+    c.close()
+
+
+def _names(conn, kind):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+
+def _real_queries():
+    """(file:line, query) for every db.<helper>('constant SQL', ...) call."""
+    paths = glob.glob(os.path.join(BACKEND_DIR, '*.py'))
+    paths += glob.glob(os.path.join(BACKEND_DIR, 'routes', '*.py'))
+    paths += glob.glob(os.path.join(BACKEND_DIR, 'jobs', '*.py'))
+    found = []
+    for path in sorted(paths):
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in _DB_METHODS and node.args
+                    and isinstance(node.args[0], ast.Constant)
+                    and isinstance(node.args[0].value, str)):
+                found.append((f"{os.path.relpath(path, BACKEND_DIR)}:{node.lineno}", node.args[0].value))
+    return found
+
+
+# ── Schema loader ─────────────────────────────────────────────────────────────
+
+def test_schema_loads_tables_indexes_and_triggers(conn):
+    tables = _names(conn, 'table')
+    assert {'students', 'admins', 'printers', 'print_requests', 'print_jobs',
+            'file_blobs', 'file_analysis_cache', 'daily_request_stats'} <= tables
+    assert 'print_requests_idx_pr_status_updated' in _names(conn, 'index')
+    assert 'print_requests_updated_at_on_update' in _names(conn, 'trigger')
+    printer_columns = {r[1] for r in conn.execute("PRAGMA table_info(printers)")}
+    assert 'device_type' in printer_columns
+
+
+def test_on_update_trigger_refreshes_timestamp(conn):
+    conn.execute("INSERT INTO students (email, password_hash, full_name) VALUES ('s@x', 'h', 'S')")
+    conn.execute("INSERT INTO print_requests (student_email, project_name, updated_at) "
+                 "VALUES ('s@x', 'p', '2000-01-01 00:00:00')")
+    conn.execute("UPDATE print_requests SET project_name = 'q'")
+    updated = conn.execute("SELECT updated_at FROM print_requests").fetchone()[0]
+    assert not updated.startswith('2000')
+
+
+def test_unique_keys_come_from_the_schema():
+    keys = sqlite_backend._unique_keys()
+    assert keys['file_blobs'][0] == ('blob_key',)
+    assert ('sha256', 'parser', 'parser_version', 'params') in keys['file_analysis_cache']
+    assert keys['daily_request_stats'][0] == ('day', 'status', 'priority', 'material_type', 'service_type')
+
+
+# ── translate() ───────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize('mysql, sqlite', [
+    ("SELECT * FROM t WHERE a = %s AND b = '%s'", "SELECT * FROM t WHERE a = ? AND b = '%s'"),
+    ("SELECT NOW(), CURDATE(), CURRENT_DATE()",
+     "SELECT datetime('now', 'localtime'), date('now', 'localtime'), date('now', 'localtime')"),
+    ("SELECT GREATEST(a, 1), LEAST(b, 2)", "SELECT MAX(a, 1), MIN(b, 2)"),
+    ("SELECT CAST(x AS SIGNED), CAST(y AS UNSIGNED)", "SELECT CAST(x AS INTEGER), CAST(y AS INTEGER)"),
+    ("SELECT a FROM t WHERE id = %s FOR UPDATE", "SELECT a FROM t WHERE id = ?"),
+    ("ORDER BY FIELD(status, 'a', 'b')", "ORDER BY (CASE status WHEN 'a' THEN 1 WHEN 'b' THEN 2 ELSE 0 END)"),
+])
+def test_translate_rewrites(mysql, sqlite):
+    assert translate(mysql) == sqlite
+
+
+def test_translate_date_shift(conn):
+    sql = translate("SELECT DATE_SUB('2026-03-01 00:00:00', INTERVAL 1 DAY), "
+                    "DATE_ADD('2026-01-31 12:00:00', INTERVAL 2 HOUR)")
+    assert conn.execute(sql).fetchone() == ('2026-02-28 00:00:00', '2026-01-31 14:00:00')
+
+
+def test_upsert_names_the_conflict_target():
+    sql = translate("INSERT INTO file_blobs (blob_key, sha256, ext, size_bytes) VALUES (%s, %s, %s, %s) "
+                    "ON DUPLICATE KEY UPDATE size_bytes = VALUES(size_bytes)")
+    assert sql.endswith("ON CONFLICT (blob_key) DO UPDATE SET size_bytes = excluded.size_bytes")
+
+
+def test_upsert_without_a_covered_key_is_refused():
+    with pytest.raises(ValueError, match='No unique key of file_blobs'):
+        translate("INSERT INTO file_blobs (sha256, ext) VALUES (%s, %s) "
+                  "ON DUPLICATE KEY UPDATE ext = VALUES(ext)")
+
+
+def test_make_pool_refuses_old_sqlite(monkeypatch):
+    monkeypatch.setattr(sqlite3, 'sqlite_version_info', (3, 23, 1))
+    with pytest.raises(RuntimeError, match='3.24.0 or newer'):
+        sqlite_backend.make_pool(':memory:')
+
+
+# ── The code base's own queries ───────────────────────────────────────────────
+
+def test_real_queries_translate_and_prepare(conn):
+    queries = _real_queries()
+    assert len(queries) > 100
+    failures = []
+    for where, query in queries:
+        if query.lstrip().upper().startswith('ALTER'):
+            continue    # one-off MySQL fixes run from admin routes (MODIFY COLUMN ... ENUM)
+        try:
+            sql = translate(query)
+            conn.execute('EXPLAIN ' + sql, [None] * sql.count('?'))
+        except (sqlite3.Error, ValueError) as e:
+            failures.append(f"{where}: {e}: {' '.join(query.split())[:100]}")
+    assert not failures, '\n'.join(failures)
+
+
+def test_real_upserts_insert_then_update(fresh_db, make_request):
+    import analysis_cache
+    import blob_store
+    import request_stats
+
+    blob_store.register('ab' * 32, '.stl', 10)
+    blob_store.register('ab' * 32, '.stl', 10)
+    assert fresh_db.fetch_one("SELECT COUNT(*) AS n FROM file_blobs")['n'] == 1
+
+    analysis_cache.store('stl', 1, 'cd' * 32, {'success': True, 'volume': 1})
+    analysis_cache.store('stl', 1, 'cd' * 32, {'success': True, 'volume': 2})
+    rows = fresh_db.fetch_all("SELECT result_json FROM file_analysis_cache")
+    assert len(rows) == 1 and '"volume": 2' in rows[0]['result_json']
+
+    make_request(status='pending', created_at=datetime.datetime(2026, 1, 5, 10))
+    request_stats.DailyRollup.refresh_day('2026-01-05')
+    make_request(status='pending', created_at=datetime.datetime(2026, 1, 5, 11))
+    request_stats.DailyRollup.refresh_day('2026-01-05')
+    rows = fresh_db.fetch_all("SELECT request_count FROM daily_request_stats")
+    assert [r['request_count'] for r in rows] == [2]
+
+
+# ── Statistics bounded on the database clock ──────────────────────────────────
+
+def test_completed_this_month_uses_database_date(app_client, seed, make_request, fresh_db, monkeypatch):
+    import print_service
+
+    class _WrongClock(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2001, 1, 1)
+
+    # An app-server clock months away from the database's must not matter
+    monkeypatch.setattr(print_service, 'datetime', _WrongClock)
+    today = datetime.date.fromisoformat(fresh_db.fetch_one("SELECT CURRENT_DATE() AS today")['today'])
+    month_start = datetime.datetime.combine(today.replace(day=1), datetime.time())
+    make_request(status='completed', updated_at=month_start)
+    make_request(status='completed', updated_at=month_start - datetime.timedelta(seconds=1))
+
+    r = app_client.get('/api/admin/print-requests/statistics', headers=seed['admin'])
+    assert r.status_code == 200
+    assert r.get_json()['statistics']['completed_this_month'] == 1
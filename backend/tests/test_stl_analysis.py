@@ -0,0 +1,184 @@
+import numpy as np
+import pytest
+
+import stl_analysis
+
+# Unit cube as 12 outward-facing triangles (counter-clockwise seen from outside)
+_CUBE = np.array([
+    [[0, 0, 0], [0, 1, 0], [1, 1, 0]], [[0, 0, 0], [1, 1, 0], [1, 0, 0]],   # bottom
+    [[0, 0, 1], [1, 0, 1], [1, 1, 1]], [[0, 0, 1], [1, 1, 1], [0, 1, 1]],   # top
+    [[0, 0, 0], [1, 0, 0], [1, 0, 1]], [[0, 0, 0], [1, 0, 1], [0, 0, 1]],   # front
+    [[0, 1, 0], [0, 1, 1], [1, 1, 1]], [[0, 1, 0], [1, 1, 1], [1, 1, 0]],   # back
+    [[0, 0, 0], [0, 0, 1], [0, 1, 1]], [[0, 0, 0], [0, 1, 1], [0, 1, 0]],   # left
+    [[1, 0, 0], [1, 1, 0], [1, 1, 1]], [[1, 0, 0], [1, 1, 1], [1, 0, 1]],   # right
+], dtype=np.float64)
+
+
+def cube(size=1.0, origin=(0, 0, 0), inward=False):
+    tri = _CUBE * size + np.asarray(origin, dtype=np.float64)
+    return tri[:, ::-1] if inward else tri
+
+
+def _normals(tri):
+    n = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    length = np.linalg.norm(n, axis=1, keepdims=True)
+    return np.divide(n, length, out=np.zeros_like(n), where=length > 0)
+
+
+def write_binary(path, tri):
+    records = np.zeros(len(tri), dtype=stl_analysis._STL_RECORD)
+    records['normal'] = _normals(tri)
+    records['vertices'] = tri
+    with open(path, 'wb') as f:
+        f.write(b'binary cube'.ljust(80, b' ') + len(tri).to_bytes(4, 'little'))
+        f.write(records.tobytes())
+
+
+def write_ascii(path, tri):
+    lines = ['solid cube']
+    for n, facet in zip(_normals(tri), tri):
+        lines.append(f'  facet normal {n[0]:e} {n[1]:e} {n[2]:e}')
+        lines.append('    outer loop')
+        lines += [f'      vertex {x:e} {y:e} {z:e}' for x, y, z in facet]
+        lines += ['    endloop', '  endfacet']
+    lines.append('endsolid cube')
+    path.write_text('\n'.join(lines) + '\n')
+
+
+@pytest.fixture(params=['binary', 'ascii'])
+def cube_stl(request, tmp_path):
+    path = tmp_path / f'cube-{request.param}.stl'
+    (write_binary if request.param == 'binary' else write_ascii)(path, cube(20.0))
+    return path
+
+
+def test_cube_volume_area_and_bounds(cube_stl):
+    result = stl_analysis.analyze_stl(str(cube_stl))
+    assert result['success'], result
+    assert result['triangle_count'] == 12
+    assert result['volume_cm3'] == pytest.approx(8.0)             # 20 mm cube
+    assert result['surface_area_cm2'] == pytest.approx(24.0)      # 6 × 4 cm²
+    assert result['bounding_box'] == {'x_mm': 20.0, 'y_mm': 20.0, 'z_mm': 20.0}
+
+
+def test_ascii_and_binary_agree(tmp_path):
+    write_binary(tmp_path / 'b.stl', cube(12.5, origin=(3, -4, 7)))
+    write_ascii(tmp_path / 'a.stl', cube(12.5, origin=(3, -4, 7)))
+    binary = stl_analysis.analyze_stl(str(tmp_path / 'b.stl'))
+    ascii_ = stl_analysis.analyze_stl(str(tmp_path / 'a.stl'))
+    assert binary['success'] and ascii_['success']
+    assert binary == ascii_
+    np.testing.assert_allclose(stl_analysis.read_triangles(str(tmp_path / 'b.stl')),
+                               stl_analysis.read_triangles(str(tmp_path / 'a.stl')))
+
+
+def test_binary_detection_does_not_trust_solid_prefix(tmp_path):
+    # Binary STLs whose 80-byte header starts with "solid" exist in the wild
+    path = tmp_path / 'solid-header.stl'
+    write_binary(path, cube(10.0))
+    data = path.read_bytes()
+    path.write_bytes(b'solid exported'.ljust(80, b' ') + data[80:])
+    result = stl_analysis.analyze_stl(str(path))
+    assert result['success'] and result['volume_cm3'] == pytest.approx(1.0)
+
+
+def test_reversed_winding_still_positive_volume(tmp_path):
+    write_binary(tmp_path / 'inside-out.stl', cube(10.0, inward=True))
+    result = stl_analysis.analyze_stl(str(tmp_path / 'inside-out.stl'))
+    assert result['volume_cm3'] == pytest.approx(1.0)
+
+
+def test_unreadable_files(tmp_path):
+    assert not stl_analysis.analyze_stl(str(tmp_path / 'missing.stl'))['success']
+    (tmp_path / 'empty.stl').write_bytes(b'')
+    assert not stl_analysis.analyze_stl(str(tmp_path / 'empty.stl'))['success']
+    (tmp_path / 'text.stl').write_text('solid nothing\nendsolid nothing\n')
+    assert not stl_analysis.analyze_stl(str(tmp_path / 'text.stl'))['success']
+
+
+# ── Layer slicing (_slice_layers / _layered_estimate) ─────────────────────────
+
+def _walls(tri):
+    """Only the side facets (those spanning z); flat caps never cut a layer."""
+    return tri[np.ptp(tri[:, :, 2], axis=1) > 0]
+
+
+def test_slice_solid_cube():
+    perimeter, area = stl_analysis._slice_layers(cube(20.0), 0.0, 20.0, 0.2)
+    assert len(area) == 100
+    np.testing.assert_allclose(area, 400.0)
+    np.testing.assert_allclose(perimeter, 80.0)
+
+
+def test_slice_hollow_cube_subtracts_void():
+    # 20 mm cube with a closed 10 mm void in the middle (inner facets face inwards)
+    tri = np.concatenate([cube(20.0), cube(10.0, origin=(5, 5, 5), inward=True)])
+    perimeter, area = stl_analysis._slice_layers(tri, 0.0, 20.0, 0.2)
+    z = (np.arange(100) + 0.5) * 0.2
+    void = (z > 5) & (z < 15)
+    np.testing.assert_allclose(area[void], 300.0)
+    np.testing.assert_allclose(area[~void], 400.0)
+    np.testing.assert_allclose(perimeter[void], 120.0)
+    np.testing.assert_allclose(perimeter[~void], 80.0)
+
+
+def test_slice_tube_with_through_hole():
+    # Square tube: 20 mm outer walls, 10 mm hole all the way through, 10 mm tall
+    tri = np.concatenate([_walls(cube(20.0) * [1, 1, 0.5]),
+                          _walls(cube(10.0, origin=(5, 5, 0), inward=True))])
+    perimeter, area = stl_analysis._slice_layers(tri, 0.0, 10.0, 0.5)
+    assert len(area) == 20
+    np.testing.assert_allclose(area, 300.0)
+    np.testing.assert_allclose(perimeter, 120.0)
+
+
+def test_slice_empty_and_degenerate():
+    perimeter, area = stl_analysis._slice_layers(np.zeros((0, 3, 3)), 0.0, 10.0, 0.2)
+    assert len(area) == 50 and not area.any() and not perimeter.any()
+    flat = cube(10.0) * [1, 1, 0]                   # everything at z = 0
+    perimeter, area = stl_analysis._slice_layers(flat, 0.0, 0.0, 0.2)
+    assert len(area) == 0 and len(perimeter) == 0
+    # Zero-area slivers spanning z add length but no area
+    sliver = np.array([[[0, 0, 0], [0, 0, 1], [0, 0, 2]]], dtype=np.float64)
+    perimeter, area = stl_analysis._slice_layers(sliver, 0.0, 2.0, 0.5)
+    assert not area.any() and not perimeter.any()
+
+
+def test_layered_estimate_full_infill_extrudes_whole_volume():
+    perimeter, area = stl_analysis._slice_layers(cube(20.0), 0.0, 20.0, 0.2)
+    est = stl_analysis._layered_estimate(perimeter, area, 0.2, 'PLA', infill=1.0)
+    assert est['layer_count'] == 100
+    assert est['extruded_mm3'] == pytest.approx(8000.0)
+
+
+def test_layered_estimate_hollow_cube_and_sparse_infill():
+    tri = np.concatenate([cube(20.0), cube(10.0, origin=(5, 5, 5), inward=True)])
+    perimeter, area = stl_analysis._slice_layers(tri, 0.0, 20.0, 0.2)
+    full = stl_analysis._layered_estimate(perimeter, area, 0.2, 'PLA', infill=1.0)
+    sparse = stl_analysis._layered_estimate(perimeter, area, 0.2, 'PLA', infill=0.2)
+    assert full['extruded_mm3'] == pytest.approx(7000.0)
+    # Walls and skin stay solid, so sparse infill removes only part of the volume
+    assert stl_analysis.SHELL_FRACTION * 7000.0 < sparse['extruded_mm3'] < full['extruded_mm3']
+    assert sparse['time_seconds'] < full['time_seconds']
+    assert set(sparse['breakdown_minutes']) == {'walls', 'skin_infill', 'travel'}
+
+
+def test_layered_estimate_slower_material_takes_longer():
+    perimeter, area = stl_analysis._slice_layers(cube(20.0), 0.0, 20.0, 0.2)
+    pla = stl_analysis._layered_estimate(perimeter, area, 0.2, 'PLA', 0.2)
+    tpu = stl_analysis._layered_estimate(perimeter, area, 0.2, 'TPU', 0.2)
+    assert tpu['time_seconds'] > pla['time_seconds']
+    assert tpu['extruded_mm3'] == pytest.approx(pla['extruded_mm3'])
+
+
+def test_layered_estimate_empty():
+    est = stl_analysis._layered_estimate(np.zeros(0), np.zeros(0), 0.2, 'PLA', 0.2)
+    assert est == {'time_seconds': 0.0, 'extruded_mm3': 0.0, 'layer_count': 0,
+                   'breakdown_minutes': {}}
+
+
+def test_flat_mesh_falls_back_to_volume_model(tmp_path):
+    write_binary(tmp_path / 'flat.stl', cube(10.0) * [1, 1, 0])
+    result = stl_analysis.analyze_stl(str(tmp_path / 'flat.stl'))
+    assert result['success']
+    assert result['layer_count'] == 0 and result['estimated_weight_grams'] == 0
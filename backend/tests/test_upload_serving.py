@@ -0,0 +1,69 @@
+import pytest
+
+from config import Config
+
+DATA = bytes(range(256)) * 4          # 1 KiB
+
+
+@pytest.fixture
+def uploads(app_client, tmp_path, monkeypatch):
+    from app import app
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    (tmp_path / 'part.stl').write_bytes(DATA)
+    (tmp_path / '.upload-partial.stl').write_bytes(DATA)
+    return app_client
+
+
+def test_full_response_is_cacheable(uploads):
+    r = uploads.get('/api/uploads/part.stl')
+    assert r.status_code == 200
+    assert r.data == DATA
+    assert r.headers['ETag'] and not r.headers['ETag'].startswith('W/')
+    assert r.headers['Cache-Control'] == 'private, max-age=31536000, immutable'
+    assert r.headers['Accept-Ranges'] == 'bytes'
+
+
+def test_if_none_match_gets_304(uploads):
+    etag = uploads.get('/api/uploads/part.stl').headers['ETag']
+    r = uploads.get('/api/uploads/part.stl', headers={'If-None-Match': etag})
+    assert r.status_code == 304
+    assert r.data == b''
+    assert r.headers['ETag'] == etag
+    assert uploads.get('/api/uploads/part.stl',
+                       headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_range_gets_206(uploads):
+    r = uploads.get('/api/uploads/part.stl', headers={'Range': 'bytes=100-199'})
+    assert r.status_code == 206
+    assert r.data == DATA[100:200]
+    assert r.headers['Content-Range'] == f'bytes 100-199/{len(DATA)}'
+    r = uploads.get('/api/uploads/part.stl', headers={'Range': 'bytes=-24'})
+    assert r.status_code == 206 and r.data == DATA[-24:]
+
+
+def test_if_range_with_stale_etag_sends_whole_file(uploads):
+    r = uploads.get('/api/uploads/part.stl',
+                    headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert r.status_code == 200 and r.data == DATA
+
+
+def test_unsatisfiable_range_gets_416(uploads):
+    r = uploads.get('/api/uploads/part.stl', headers={'Range': f'bytes={len(DATA)}-'})
+    assert r.status_code == 416
+    assert r.headers['Content-Range'] == f'bytes */{len(DATA)}'
+
+
+def test_dotfiles_and_missing_files_404(uploads):
+    assert uploads.get('/api/uploads/.upload-partial.stl').status_code == 404
+    assert uploads.get('/api/uploads/missing.stl').status_code == 404
+
+
+def test_x_accel_mode_hands_off_to_proxy(uploads, monkeypatch):
+    monkeypatch.setattr(Config, 'UPLOAD_SENDFILE_MODE', 'x-accel')
+    r = uploads.get('/api/uploads/part.stl')
+    assert r.status_code == 200
+    assert r.data == b''
+    assert r.headers['X-Accel-Redirect'] == '/protected-uploads/part.stl'
+    r = uploads.get('/api/uploads/part.stl', headers={'If-None-Match': r.headers['ETag']})
+    assert r.status_code == 304
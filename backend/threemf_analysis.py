@@ -16,11 +16,16 @@ import re
 import os
 from typing import Dict, Any
 
+from ufp_analysis import read_member_head
+
 try:
     import xml.etree.ElementTree as ET
 except ImportError:
     ET = None  # type: ignore
 
+# Bump when a change here alters results, so cached analyses (analysis_cache) are recomputed
+PARSER_VERSION = 1
+
 
 def _seconds_to_hm(seconds: float) -> dict:
     """Convert seconds to hours + minutes dict."""
@@ -379,7 +384,7 @@ def analyze_3mf(file_path: str) -> Dict[str, Any]:
             if parsed is None or parsed.get('time_seconds') is None:
                 for real, low in zip(names, names_low):
                     if low.endswith('.gcode') or low.endswith('.bgcode'):
-                        head = zf.read(real)[:8192].decode('utf-8', errors='ignore')
+                        head = read_member_head(zf, real, 8192).decode('utf-8', errors='ignore')
                         for line in head.splitlines():
                             line = line.strip()
                             if line.startswith(';TIME:') or line.startswith(';PRINT.TIME:'):
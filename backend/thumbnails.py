@@ -0,0 +1,131 @@
+"""
+Slicer-file thumbnails for list views
+Pulls the preview image slicers already embed and stores it at a few fixed
+sizes, so list pages and the production board can show a picture without
+loading a mesh:
+
+    .ufp            Metadata/thumbnail.png (Cura)
+    .3mf            Metadata/plate_1.png (Bambu / Orca) or Metadata/thumbnail.png (Prusa / Cura)
+    .gcode / .nc …  base64 '; thumbnail begin WxH len' … '; thumbnail end' blocks
+                    (PrusaSlicer, Cura, Orca; PNG / JPG / QOI variants) — largest wins
+
+Archive members are read through ufp_analysis.read_member_head and G-code is
+scanned line by line until the first move command, so nothing is fully
+extracted. Runs once per file in an analysis worker process (see
+analysis_worker.PARSERS); results are stored next to the upload as
+'<stored name>.thumb-v<THUMB_VERSION>-<size>.png' — blob names are content
+hashes, so identical uploads share the cached thumbnails.
+"""
+
+import base64
+import io
+import os
+import re
+import zipfile
+from typing import Any, Dict, Optional
+
+from derived_files import DerivedFiles, write_atomic
+from ufp_analysis import read_member_head
+
+THUMB_VERSION = 1
+
+# Longest edge in px per named size; 'small' is written last and marks completion
+SIZES = {'large': 256, 'small': 96}
+
+THUMBNAIL_EXTS = {'.ufp', '.3mf', '.gcode', '.nc', '.ngc', '.cnc', '.tap'}
+
+_ARCHIVE_CANDIDATES = (
+    'Metadata/plate_1.png',
+    'Metadata/thumbnail.png',
+    'Auxiliaries/.thumbnails/thumbnail_middle.png',
+    'Auxiliaries/.thumbnails/thumbnail_3mf.png',
+)
+_MAX_IMAGE_BYTES    = 8 * 1024 * 1024
+_MAX_HEADER_BYTES   = 16 * 1024 * 1024     # stop scanning G-code after this much
+_GCODE_THUMB_BEGIN  = re.compile(r';\s*thumbnail(?:_(PNG|JPG|QOI))?\s+begin\s+(\d+)x(\d+)', re.IGNORECASE)
+_GCODE_THUMB_END    = re.compile(r';\s*thumbnail(?:_(?:PNG|JPG|QOI))?\s+end', re.IGNORECASE)
+_GCODE_MOVE         = re.compile(r'^[GM]\d', re.IGNORECASE)
+
+_files = DerivedFiles('thumb', THUMB_VERSION, '.png', 'No thumbnail')
+
+is_derived_file = _files.is_derived_file
+source_of       = _files.source_of
+is_current      = _files.is_current
+recent_failure  = _files.recent_failure
+mark_failed     = _files.mark_failed
+
+
+def preview_path(file_path: str, size: str = 'small') -> str:
+    return _files.path(file_path, f'-{size}')
+
+
+def thumbnail_url(stored_name: Optional[str], size: str = 'small') -> Optional[str]:
+    """URL of a stored file's thumbnail for list payloads (None for file types without one)."""
+    if not stored_name or os.path.splitext(stored_name.lower())[1] not in THUMBNAIL_EXTS:
+        return None
+    return f'/api/uploads/{stored_name}/thumbnail?size={size}'
+
+
+def _from_archive(file_path: str) -> Optional[bytes]:
+    with zipfile.ZipFile(file_path, 'r') as zf:
+        members = {info.filename.lstrip('/'): info for info in zf.infolist()}
+        name = next((c for c in _ARCHIVE_CANDIDATES if c in members), None)
+        if name is None:
+            # Any other embedded preview: take the largest PNG under Metadata/
+            pngs = [n for n in members if n.startswith('Metadata/') and n.lower().endswith('.png')]
+            name = max(pngs, key=lambda n: members[n].file_size, default=None)
+        if name is None or members[name].file_size > _MAX_IMAGE_BYTES:
+            return None
+        return read_member_head(zf, members[name].filename, _MAX_IMAGE_BYTES)
+
+
+def _from_gcode(file_path: str) -> Optional[bytes]:
+    best, best_area = None, 0
+    block, area = None, 0
+    read = 0
+    with open(file_path, 'r', errors='ignore') as f:
+        for line in f:
+            read += len(line)
+            if read > _MAX_HEADER_BYTES:
+                break
+            stripped = line.strip()
+            if block is None:
+                m = _GCODE_THUMB_BEGIN.match(stripped)
+                if m:
+                    block, area = [], int(m.group(2)) * int(m.group(3))
+                elif _GCODE_MOVE.match(stripped):
+                    break  # thumbnails live in the header, before the first command
+            elif _GCODE_THUMB_END.match(stripped):
+                if area > best_area:
+                    best, best_area = ''.join(block), area
+                block = None
+            else:
+                block.append(stripped.lstrip(';').strip())
+    return base64.b64decode(best) if best else None
+
+
+def build_thumbnails(file_path: str) -> Dict[str, Any]:
+    """Extract and resize the embedded image. Returns {'success', 'sizes'}."""
+    if os.path.exists(preview_path(file_path)):
+        return {'success': True, 'sizes': list(SIZES)}
+    try:
+        if zipfile.is_zipfile(file_path):
+            data = _from_archive(file_path)
+        else:
+            data = _from_gcode(file_path)
+        if not data:
+            return {'success': False, 'message': 'No embedded thumbnail'}
+
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            img = img.convert('RGBA')
+            for size, edge in SIZES.items():  # 'small' last: marks the set complete
+                copy = img.copy()
+                copy.thumbnail((edge, edge), Image.LANCZOS)
+                out = io.BytesIO()
+                copy.save(out, format='PNG', optimize=True)
+                write_atomic(preview_path(file_path, size), out.getvalue())
+    except Exception as e:
+        return {'success': False, 'message': f'Thumbnail extraction failed: {e}'}
+    return {'success': True, 'sizes': list(SIZES)}
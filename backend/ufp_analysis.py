@@ -13,6 +13,9 @@ import json
 import os
 from typing import Dict, Any
 
+# Bump when a change here alters results, so cached analyses (analysis_cache) are recomputed
+PARSER_VERSION = 1
+
 
 # Keys Cura uses for print time (seconds)
 _TIME_KEYS = [
@@ -185,6 +188,17 @@ def _parse_slicemetadata(data: dict) -> Dict[str, Any]:
     }
 
 
+def read_member_head(zf: zipfile.ZipFile, name: str, limit: int) -> bytes:
+    """Return the first `limit` bytes of a zip member.
+
+    ZipFile.open() inflates lazily, so only the compressed blocks covering the
+    header are decoded — unlike zf.read(name)[:limit], which inflates the whole
+    (often 50–200 MB) embedded G-code first.
+    """
+    with zf.open(name) as member:
+        return member.read(limit)
+
+
 def analyze_ufp(file_path: str) -> Dict[str, Any]:
     """
     Parse a .ufp file and return print time + material estimates.
@@ -249,7 +263,7 @@ def analyze_ufp(file_path: str) -> Dict[str, Any]:
             gcode_filament_mm  = None
             if gcode_path:
                 # Only scan first 4 KB — the comments are at the top of the file
-                gcode_head = zf.read(gcode_path)[:4096].decode('utf-8', errors='ignore')
+                gcode_head = read_member_head(zf, gcode_path, 4096).decode('utf-8', errors='ignore')
                 for line in gcode_head.splitlines():
                     line = line.strip()
                     if line.startswith(';TIME:') or line.startswith(';PRINT.TIME:'):
@@ -0,0 +1,212 @@
+"""
+Streaming upload storage
+Multipart file parts are written straight into UPLOAD_FOLDER while the request
+body is parsed: StreamingUploadRequest hands Werkzeug a HashingUploadWriter as
+the file stream, so there is no spooled temp copy followed by file.save().
+The writer hashes (SHA-256), counts bytes and aborts with 413 as soon as a
+part passes its size limit. save_upload() then checks the magic bytes against
+the expected extension and renames the part to its content-addressed blob
+name (see blob_store) — or drops it if that blob is already on disk.
+"""
+
+import hashlib
+import os
+import struct
+import uuid
+
+from flask import Request, current_app, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config import Config
+import blob_store
+
+_CHUNK_SIZE   = 64 * 1024
+_SNIFF_BYTES  = 4096          # head kept in memory for type detection
+_TMP_PREFIX   = '.upload-'
+
+# Per-extension overrides of Config.MAX_UPLOAD_SIZE_MB (sliced archives embed G-code)
+_UPLOAD_LIMITS_MB = {
+    '.ufp': 100,
+    '.3mf': 200,
+}
+
+# Detected kinds accepted for each extension; anything else is treated as G-code / NC text
+_EXPECTED_KINDS = {
+    '.stl': {'stl_binary', 'stl_ascii'},
+    '.ufp': {'zip'},
+    '.3mf': {'zip'},
+    '.pdf': {'pdf'},
+    '.svg': {'svg'},
+    '.dxf': {'dxf'},
+}
+_TEXT_KINDS = {'text'}
+
+# Whole-request ceiling for MAX_CONTENT_LENGTH: largest per-file limit plus form overhead
+MAX_REQUEST_BYTES = (max([Config.MAX_UPLOAD_SIZE_MB, *_UPLOAD_LIMITS_MB.values()]) + 1) * 1024 * 1024
+
+
+class UploadRejected(ValueError):
+    """Uploaded content does not match the type its extension claims."""
+
+
+def max_upload_bytes(ext: str) -> int:
+    return _UPLOAD_LIMITS_MB.get(ext, Config.MAX_UPLOAD_SIZE_MB) * 1024 * 1024
+
+
+def detect_file_kind(head: bytes, size: int) -> str:
+    """Classify a file from its first bytes (and total size, for binary STL)."""
+    if head.startswith(b'PK\x03\x04'):
+        return 'zip'
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'AutoCAD Binary DXF'):
+        return 'dxf'
+    # Binary STL: 80-byte header, uint32 triangle count, 50 bytes per triangle.
+    # Checked before the text rules because many exporters start the header with "solid".
+    if len(head) >= 84:
+        (count,) = struct.unpack_from('<I', head, 80)
+        if 84 + 50 * count == size:
+            return 'stl_binary'
+    if b'\x00' in head:
+        return 'binary'
+    text = head.lstrip(b'\xef\xbb\xbf').lstrip()
+    if text[:5].lower() == b'solid':
+        return 'stl_ascii'
+    lowered = text.lower()
+    if b'<svg' in lowered:
+        return 'svg'
+    lines = [ln.strip() for ln in text.splitlines()[:64]]
+    if b'SECTION' in lines and b'0' in lines:
+        return 'dxf'
+    return 'text'
+
+
+class HashingUploadWriter:
+    """File-like sink for one multipart file part.
+
+    Writes go to a hidden temp file inside the upload folder (same filesystem,
+    so commit() is a rename), updating the SHA-256 and size as they arrive.
+    """
+
+    def __init__(self, upload_dir: str, ext: str, max_bytes: int):
+        self.path      = os.path.join(upload_dir, f"{_TMP_PREFIX}{uuid.uuid4().hex}{ext}")
+        self.ext       = ext
+        self.max_bytes = max_bytes
+        self.size      = 0
+        self.head      = bytearray()
+        self._sha256   = hashlib.sha256()
+        self._fh       = open(self.path, 'w+b')
+        self._done     = False
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge(f'File exceeds {self.max_bytes // (1024 * 1024)} MB limit')
+        self._sha256.update(data)
+        if len(self.head) < _SNIFF_BYTES:
+            self.head += data[:_SNIFF_BYTES - len(self.head)]
+        return self._fh.write(data)
+
+    # Werkzeug rewinds the stream after parsing; analysis code may read it back
+    def seek(self, offset, whence=0):
+        return self._fh.seek(offset, whence)
+
+    def tell(self):
+        return self._fh.tell()
+
+    def read(self, size=-1):
+        return self._fh.read(size)
+
+    def flush(self):
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+    def commit(self, final_path: str) -> None:
+        self._fh.close()
+        os.replace(self.path, final_path)
+        self.path  = final_path
+        self._done = True
+
+    def discard(self) -> None:
+        """Drop the temp file unless it was committed."""
+        if self._done:
+            return
+        self._done = True
+        self._fh.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class StreamingUploadRequest(Request):
+    """Flask request class whose file parts stream into HashingUploadWriters."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        ext = os.path.splitext((filename or '').lower())[1]
+        writer = HashingUploadWriter(current_app.config['UPLOAD_FOLDER'], ext, max_upload_bytes(ext))
+        if not hasattr(self, '_upload_writers'):
+            self._upload_writers = []
+        self._upload_writers.append(writer)
+        return writer
+
+
+def discard_pending_uploads(exc=None):
+    """teardown_request hook: remove parts the view never committed."""
+    for writer in getattr(request, '_upload_writers', ()):
+        writer.discard()
+
+
+def save_upload(file, ext: str) -> dict:
+    """Store an uploaded FileStorage as blob '<sha256><ext>' in the upload folder.
+
+    Returns {'filename', 'path', 'size', 'sha256', 'kind', 'deduplicated'}.
+    Raises UploadRejected when the magic bytes don't match `ext`, or
+    RequestEntityTooLarge on overflow.
+    """
+    upload_dir = current_app.config['UPLOAD_FOLDER']
+    writer = file.stream if isinstance(file.stream, HashingUploadWriter) else None
+    if writer is None:
+        # Not parsed by StreamingUploadRequest — copy the stream in fixed-size chunks
+        writer = HashingUploadWriter(upload_dir, ext, max_upload_bytes(ext))
+        try:
+            while True:
+                chunk = file.stream.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+        except Exception:
+            writer.discard()
+            raise
+    elif writer.size > max_upload_bytes(ext):
+        writer.discard()
+        raise RequestEntityTooLarge(f'File exceeds {max_upload_bytes(ext) // (1024 * 1024)} MB limit')
+
+    kind = detect_file_kind(bytes(writer.head), writer.size)
+    if kind not in _EXPECTED_KINDS.get(ext, _TEXT_KINDS):
+        writer.discard()
+        raise UploadRejected(f'File content does not look like a {ext} file')
+
+    saved_name = blob_store.blob_name(writer.sha256, ext)
+    final_path = os.path.join(upload_dir, saved_name)
+    deduplicated = os.path.isfile(final_path)
+    if deduplicated:
+        writer.discard()  # identical content already stored
+    else:
+        writer.commit(final_path)
+    blob_store.register(writer.sha256, ext, writer.size)
+    return {
+        'filename':     saved_name,
+        'path':         final_path,
+        'size':         writer.size,
+        'sha256':       writer.sha256,
+        'kind':         kind,
+        'deduplicated': deduplicated,
+    }
@@ -0,0 +1,23 @@
+-- Migration 019: Outbound email queue
+-- Notification emails are written here by the in-process outbox worker and
+-- delivered asynchronously with exponential backoff, so they survive restarts.
+-- Rollback: DROP TABLE email_outbox;
+
+USE DGSpace;
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+    outbox_id       INT AUTO_INCREMENT PRIMARY KEY,
+    to_email        VARCHAR(255) NOT NULL,
+    subject         VARCHAR(500) NOT NULL,
+    html_body       MEDIUMTEXT   NOT NULL,
+    status          ENUM('pending', 'sending', 'sent', 'failed') NOT NULL DEFAULT 'pending',
+    attempts        INT          NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME     NOT NULL,
+    last_error      TEXT         NULL,
+    message_id      VARCHAR(255) NULL     COMMENT 'Id returned by the delivery transport',
+    created_at      TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at      TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    sent_at         DATETIME     NULL,
+
+    INDEX idx_due (status, next_attempt_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,19 @@
+-- Migration 020: Content-addressed upload blobs
+-- Uploads are stored as '<sha256><ext>' so identical files share one copy on disk.
+-- print_requests.stl_file_path / ufp_file_path hold the blob_key; refcount counts
+-- those references and the cleanup job deletes a blob only once it reaches zero.
+-- Rollback: DROP TABLE file_blobs;
+
+USE DGSpace;
+
+CREATE TABLE IF NOT EXISTS file_blobs (
+    blob_key          VARCHAR(80)  NOT NULL PRIMARY KEY COMMENT '<sha256><ext>, also the filename in UPLOAD_FOLDER',
+    sha256            CHAR(64)     NOT NULL,
+    ext               VARCHAR(10)  NOT NULL,
+    size_bytes        BIGINT       NOT NULL,
+    refcount          INT          NOT NULL DEFAULT 0 COMMENT 'print_requests columns pointing at this blob',
+    created_at        TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_uploaded_at  DATETIME     NOT NULL COMMENT 'Most recent upload of this content (purge grace period)',
+
+    INDEX idx_unreferenced (refcount, last_uploaded_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,22 @@
+-- Migration 021: Cached file analysis results
+-- analyze_ufp / analyze_3mf / analyze_stl / G-code time parsing results keyed by
+-- content hash + parser version, so identical uploads are not re-parsed.
+-- Bumping a parser's PARSER_VERSION makes its old rows unreachable; the cleanup
+-- job evicts rows not hit for 30 days.
+-- Rollback: DROP TABLE file_analysis_cache;
+
+USE DGSpace;
+
+CREATE TABLE IF NOT EXISTS file_analysis_cache (
+    sha256          CHAR(64)     NOT NULL,
+    parser          VARCHAR(32)  NOT NULL COMMENT 'ufp, 3mf, stl, gcode_time',
+    parser_version  INT          NOT NULL,
+    params          VARCHAR(64)  NOT NULL DEFAULT '' COMMENT 'Parser arguments that change the result (e.g. STL material/infill)',
+    result_json     MEDIUMTEXT   NOT NULL,
+    hit_count       INT          NOT NULL DEFAULT 0,
+    created_at      TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_hit_at     DATETIME     NOT NULL,
+
+    PRIMARY KEY (sha256, parser, parser_version, params),
+    INDEX idx_last_hit (last_hit_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,15 @@
+-- Migration 022: Indexes for keyset-paginated request lists
+-- The list endpoints page on (created_at, request_id) newest first. InnoDB
+-- secondary indexes already end with the primary key, so idx_created_at serves
+-- the unfiltered admin list; these cover the per-student and per-status lists
+-- so each page is a range scan instead of a filesort over every match.
+-- Rollback: DROP INDEX idx_pr_student_created ON print_requests;
+--           DROP INDEX idx_pr_status_created ON print_requests;
+
+USE DGSpace;
+
+CREATE INDEX idx_pr_student_created
+  ON print_requests (student_email, created_at, request_id);
+
+CREATE INDEX idx_pr_status_created
+  ON print_requests (status, created_at, request_id);
@@ -0,0 +1,27 @@
+-- Migration 023: Indexes for report and notification queries
+-- Date filters now use half-open ranges (created_at >= day AND created_at <
+-- next day, see database.day_range) instead of DATE(created_at), so these
+-- range scans can use an index. Migration 022 already covers (status,
+-- created_at) and (student_email, created_at) for the request lists.
+--
+--   idx_pr_status_updated     "completed this month" statistic
+--   idx_pj_notify             _claim_staff_notifications: printing jobs with an
+--                             expected end time not yet notified
+--   idx_pr_created_report     dashboard summary / by_day / by_material, covering
+--                             so the date range never reads the row itself
+-- Rollback: DROP INDEX idx_pr_status_updated ON print_requests;
+--           DROP INDEX idx_pr_created_report ON print_requests;
+--           DROP INDEX idx_pj_notify ON print_jobs;
+
+USE DGSpace;
+
+CREATE INDEX idx_pr_status_updated
+  ON print_requests (status, updated_at);
+
+CREATE INDEX idx_pr_created_report
+  ON print_requests (created_at, status, material_type, student_email,
+                     ufp_print_time_minutes, slicer_time_minutes,
+                     ufp_material_g, slicer_material_g);
+
+CREATE INDEX idx_pj_notify
+  ON print_jobs (status, staff_notified, print_end_expected);
@@ -0,0 +1,38 @@
+-- Migration 024: Daily request rollup
+-- One row per creation day x status x priority x material x service type, so
+-- the dashboard report and statistics read O(days) rows instead of scanning
+-- print_requests. Kept current by request_stats.DailyRollup (re-aggregates
+-- the day of every changed request) and reconciled nightly by the cleanup job.
+-- NULL dimensions are stored as '' so they can be part of the primary key.
+-- Rollback: DROP TABLE daily_request_stats;
+
+USE DGSpace;
+
+CREATE TABLE IF NOT EXISTS daily_request_stats (
+    day             DATE          NOT NULL,
+    status          VARCHAR(32)   NOT NULL,
+    priority        VARCHAR(16)   NOT NULL,
+    material_type   VARCHAR(32)   NOT NULL,
+    service_type    VARCHAR(16)   NOT NULL,
+    request_count   INT           NOT NULL DEFAULT 0,
+    print_minutes   DECIMAL(14,2) NOT NULL DEFAULT 0 COMMENT 'SUM(COALESCE(ufp_print_time_minutes, slicer_time_minutes))',
+    material_g      DECIMAL(14,2) NOT NULL DEFAULT 0 COMMENT 'SUM(COALESCE(ufp_material_g, slicer_material_g))',
+
+    PRIMARY KEY (day, status, priority, material_type, service_type)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Backfill from existing requests
+INSERT INTO daily_request_stats
+    (day, status, priority, material_type, service_type,
+     request_count, print_minutes, material_g)
+SELECT DATE(created_at), COALESCE(status, ''), COALESCE(priority, ''),
+       COALESCE(material_type, ''), COALESCE(service_type, '3dprint'),
+       COUNT(*),
+       COALESCE(SUM(COALESCE(ufp_print_time_minutes, slicer_time_minutes)), 0),
+       COALESCE(SUM(COALESCE(ufp_material_g, slicer_material_g)), 0)
+FROM print_requests
+GROUP BY 1, 2, 3, 4, 5
+ON DUPLICATE KEY UPDATE
+    request_count = VALUES(request_count),
+    print_minutes = VALUES(print_minutes),
+    material_g    = VALUES(material_g);
@@ -0,0 +1,16 @@
+-- Migration 025: Sparse queue ranks for print_jobs
+-- queue_position becomes a rank spaced 65536 apart (queue_ranks.RANK_GAP)
+-- instead of a dense 1..n index, so a job can be appended, moved or reordered
+-- by writing only its own row. Multiplying the existing positions keeps every
+-- queue's current order.
+-- Rollback: UPDATE print_jobs SET queue_position = GREATEST(1, queue_position DIV 65536);
+--           ALTER TABLE print_jobs MODIFY COLUMN queue_position INT NOT NULL DEFAULT 1
+--               COMMENT 'Position in the printer queue (1 = next up)';
+
+USE DGSpace;
+
+ALTER TABLE print_jobs
+    MODIFY COLUMN queue_position BIGINT NOT NULL DEFAULT 65536
+        COMMENT 'Sparse queue rank; lower runs first, ties by job_id';
+
+UPDATE print_jobs SET queue_position = queue_position * 65536;